@@ -0,0 +1,146 @@
+# src/batch_dispatcher.py
+
+"""
+Despachador de lotes concurrente con presupuesto global de workers.
+
+Sustituye al antiguo esquema de un solo hilo + `processing_lock`, donde solo se
+procesaba un lote a la vez aunque sobraran núcleos. Aquí cada lote declara
+cuántos workers necesita (`cost`) y se ejecuta en su propio hilo en cuanto cabe
+dentro del presupuesto global (`worker_budget`).
+
+Reparto justo (weighted fair share): los lotes en espera se agrupan por
+"dueño" (un cliente o un evento, según quien llame a `submit`). Cada dueño
+acumula un tiempo virtual = workers consumidos / peso, y siempre se despacha
+primero el lote del dueño con menor tiempo virtual. Así un cliente con muchos
+lotes encolados no acapara el servidor frente a otro que pide poco, y un
+cliente con peso 2 recibe el doble de workers que uno con peso 1.
+"""
+
+import collections
+import itertools
+import threading
+import time
+
+
+class _QueuedBatch:
+    def __init__(self, seq, owner, cost, weight, args, label):
+        self.seq = seq
+        self.owner = owner
+        self.cost = cost
+        self.weight = weight
+        self.args = args
+        self.label = label
+        self.enqueued_at = time.time()
+        self.started_at = None
+
+
+class BatchDispatcher:
+    """Ejecuta `run_batch(*args)` para cada lote, varios a la vez, sin exceder el presupuesto."""
+    def __init__(self, run_batch, worker_budget: int, on_error=None):
+        self.run_batch = run_batch
+        self.worker_budget = max(1, int(worker_budget))
+        self.on_error = on_error
+        self._cond = threading.Condition()
+        self._queues: dict = collections.OrderedDict()  # dueño -> deque de _QueuedBatch
+        self._virtual_time: dict = {}                    # dueño -> workers consumidos / peso
+        self._running: dict[int, _QueuedBatch] = {}
+        self._in_use = 0
+        self._seq = itertools.count(1)
+        self._thread = None
+        self.batches_completed = 0
+
+    def submit(self, owner, cost: int, args: tuple, weight: float = 1.0, label: str = ""):
+        """Encola un lote de `owner` que ocupará `cost` workers mientras se ejecute."""
+        cost = min(max(1, int(cost)), self.worker_budget)
+        weight = weight if weight and weight > 0 else 1.0
+        with self._cond:
+            batch = _QueuedBatch(next(self._seq), owner, cost, weight, args, label)
+            if owner not in self._queues:
+                self._queues[owner] = collections.deque()
+                # Un dueño que (re)aparece no hereda crédito atrasado: empieza en
+                # el menor tiempo virtual de los que ya están compitiendo.
+                active_times = [self._virtual_time.get(o, 0.0) for o in self._queues if o != owner]
+                floor = min(active_times) if active_times else 0.0
+                self._virtual_time[owner] = max(self._virtual_time.get(owner, 0.0), floor)
+            self._queues[owner].append(batch)
+            self._cond.notify_all()
+
+    def discard_owner(self, owner) -> list:
+        """
+        Elimina los lotes en espera de `owner` (p. ej. si se desconectó).
+        Devuelve los `args` de cada lote descartado, para liberar lo que tuvieran.
+        """
+        with self._cond:
+            queue = self._queues.pop(owner, None)
+            self._virtual_time.pop(owner, None)
+            return [batch.args for batch in queue] if queue else []
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._dispatch_loop, daemon=True)
+            self._thread.start()
+
+    def _pick_next(self):
+        """Lote candidato: el primero del dueño con menor tiempo virtual (con `_cond` adquirido)."""
+        best_owner = None
+        for owner in self._queues:
+            if best_owner is None or self._virtual_time[owner] < self._virtual_time[best_owner]:
+                best_owner = owner
+        return self._queues[best_owner][0] if best_owner is not None else None
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    batch = self._pick_next()
+                    # Sin "backfill": si el candidato no cabe se espera a que se libere
+                    # presupuesto, para no postergar indefinidamente a los lotes grandes.
+                    if batch is not None and self._in_use + batch.cost <= self.worker_budget:
+                        break
+                    self._cond.wait()
+
+                queue = self._queues[batch.owner]
+                queue.popleft()
+                if not queue:
+                    del self._queues[batch.owner]
+                self._virtual_time[batch.owner] = (
+                    self._virtual_time.get(batch.owner, 0.0) + batch.cost / batch.weight
+                )
+                self._in_use += batch.cost
+                batch.started_at = time.time()
+                self._running[batch.seq] = batch
+
+            threading.Thread(target=self._run, args=(batch,), daemon=True).start()
+
+    def _run(self, batch):
+        try:
+            self.run_batch(*batch.args)
+        except Exception as e:
+            if self.on_error:
+                self.on_error(batch.label, e)
+        finally:
+            with self._cond:
+                self._running.pop(batch.seq, None)
+                self._in_use -= batch.cost
+                self.batches_completed += 1
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """Instantánea del presupuesto y de los lotes en ejecución y en espera."""
+        now = time.time()
+        with self._cond:
+            running = [
+                {"label": b.label, "workers": b.cost, "elapsed_seconds": now - b.started_at}
+                for b in self._running.values()
+            ]
+            queued = [
+                {"label": b.label, "workers": b.cost, "waiting_seconds": now - b.enqueued_at}
+                for q in self._queues.values() for b in q
+            ]
+            return {
+                "worker_budget": self.worker_budget,
+                "workers_in_use": self._in_use,
+                "running": running,
+                "queued": sorted(queued, key=lambda b: -b["waiting_seconds"]),
+                "batches_completed": self.batches_completed,
+            }
@@ -0,0 +1,131 @@
+# src/bench_extractor.py
+
+"""
+Benchmark del extractor: throughput (MB/s) y verificación de salida idéntica.
+
+Compara `parse_file_regex` contra una copia de la versión original
+(`legacy_parse_file_regex`, sin patrones precompilados) sobre los .txt de un
+directorio. Si algún archivo da un resultado distinto, lo informa y termina con
+código 1.
+
+Uso:
+    python -m src.bench_extractor [directorio] [--repeat N]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+from .extractor_regex import parse_file_regex
+
+DEFAULT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'text_files'))
+
+
+def legacy_parse_file_regex(filepath: str, pid: str) -> dict:
+    """Versión original de parse_file_regex (referencia para comparar salida y velocidad)."""
+    try:
+        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+    except Exception as e:
+        return {
+            "pid": pid,
+            "archivo": filepath.split('/')[-1],
+            "nombres": "",
+            "fechas": "",
+            "lugares": "",
+            "num_palabras": 0,
+            "estado": "",
+            "error": f"Error al leer archivo: {str(e)}"
+        }
+
+    nombres = re.findall(r'\b[A-ZÁÉÍÓÚÑÅÄÖ][a-záéíóúñåäö]+(?:\s+[A-ZÁÉÍÓÚÑÅÄÖ][a-záéíóúñåäö]+)+\b', content)
+
+    fechas = re.findall(
+        r'\b(?:\d{1,2}(?:st|nd|rd|th)?(?:\s*(?:de\s+)?(?:enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|octubre|noviembre|diciembre|'
+        r'jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec|maj))?(?:\s*[\.,]?\s*\d{2,4})?)\b',
+        content, flags=re.IGNORECASE)
+
+    fechas.extend(re.findall(r"\b(?:\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4}|\d{4}[/\-]\d{1,2}[/\-]\d{1,2})\b", content))
+
+    ciudades_comunes = [
+        "New York", "Chicago", "Los Angeles", "San Francisco", "Boston",
+        "Minneapolis", "Detroit", "Miami", "Stockholm", "Göteborg", "Malmö",
+        "Uppsala", "Lund", "Karlstad", "Örebro", "Västerås", "Linköping"
+    ]
+    ciudades_regex = r'\b(?:' + '|'.join(re.escape(city) for city in ciudades_comunes) + r')\b'
+    lugares = re.findall(ciudades_regex, content)
+
+    palabras = re.findall(r'\b\w+\b', content)
+    num_palabras = len(palabras)
+
+    return {
+        "Nombres": sorted(set(nombres)) if nombres else [],
+        "Fechas": sorted(set(fechas)) if fechas else [],
+        "Lugares": sorted(set(lugares)) if lugares else [],
+        "ConteoPalabras": num_palabras,
+        "filename": filepath.replace("\\", "/").split("/")[-1],
+        "status": "success",
+        "error": ""
+    }
+
+
+def run_extractor(extractor, paths: list, repeat: int) -> tuple:
+    """Ejecuta `extractor` sobre `paths` `repeat` veces. Devuelve (segundos por pasada, resultados)."""
+    results = None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [extractor(path, pid="bench") for path in paths]
+    return (time.perf_counter() - start) / repeat, results
+
+
+def total_timings(results: list) -> dict:
+    """Suma los "Tiempos" de cada resultado (y los quita, para poder comparar con el original)."""
+    totals = {}
+    for result in results:
+        for field, seconds in result.pop("Tiempos", {}).items():
+            totals[field] = totals.get(field, 0.0) + seconds
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de parse_file_regex (MB/s).")
+    parser.add_argument("directory", nargs="?", default=DEFAULT_DIR)
+    parser.add_argument("--repeat", type=int, default=3, help="Pasadas por extractor (def. 3).")
+    args = parser.parse_args(argv)
+
+    paths = sorted(
+        os.path.join(args.directory, name) for name in os.listdir(args.directory)
+        if name.endswith('.txt')
+    )
+    if not paths:
+        print(f"Sin archivos .txt en '{args.directory}'.")
+        return 1
+    total_mb = sum(os.path.getsize(p) for p in paths) / 2**20
+    print(f"{len(paths)} archivos, {total_mb:.2f} MB, {args.repeat} pasadas por extractor.")
+
+    legacy_seconds, legacy_results = run_extractor(legacy_parse_file_regex, paths, args.repeat)
+    current_seconds, current_results = run_extractor(parse_file_regex, paths, args.repeat)
+    timings = total_timings(current_results)
+
+    mismatches = [
+        os.path.basename(path)
+        for path, old, new in zip(paths, legacy_results, current_results) if old != new
+    ]
+
+    print(f"  original:     {legacy_seconds:7.3f}s  {total_mb / legacy_seconds:7.2f} MB/s")
+    print(f"  precompilado: {current_seconds:7.3f}s  {total_mb / current_seconds:7.2f} MB/s "
+          f"({legacy_seconds / current_seconds:.2f}x)")
+    total_timed = sum(timings.values()) or 1.0
+    for field, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+        print(f"    {field:<14} {seconds:7.3f}s  {100 * seconds / total_timed:5.1f}%")
+    if mismatches:
+        print(f"Salida DISTINTA en {len(mismatches)} archivo(s): {', '.join(mismatches[:10])}")
+        return 1
+    print("Salida idéntica en todos los archivos.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,7 +10,10 @@ import time
 import os
 
 from .process import Process
+from . import protocol
 from .scheduler import AVAILABLE_SCHEDULERS, SchedulerFCFS, SchedulerRR, SchedulerSJF, SchedulerPriorityNP, SchedulerHRRN
+from .sim_engine import (simulate, EVENT_ARRIVAL, EVENT_DISPATCH, EVENT_QUANTUM,
+                         EVENT_PREEMPT, EVENT_COMPLETE)
 
 class ClientApp:
     def __init__(self, root):
@@ -28,6 +31,7 @@ class ClientApp:
         # Variables de estado del cliente
         self.receive_thread = None
         self.client_socket = None
+        self.conn_protocol = None  # Formato acordado con el servidor (ver protocol.py)
         self.connected = False
         self.server_addr = tk.StringVar(value="127.0.0.1")
         self.server_port = tk.StringVar(value="65432")
@@ -56,8 +60,9 @@ class ClientApp:
         self.files_for_simulation_vars = {}
         self.process_params_entries = {}
         self.processes_to_simulate = []
-        self.ready_queue_sim = []
-        self.running_processes_sim = []
+        self.sim_result = None          # Resultado de sim_engine.simulate; la GUI reproduce sus eventos
+        self.sim_event_index = 0        # Próximo evento a reproducir
+        self.running_cpus_sim = {}      # pid -> CPU de los procesos en ejecución durante la reproducción
         self.completed_processes_sim = []
         self.simulation_time_sim = 0
         self.simulation_running_sim = False
@@ -883,6 +888,7 @@ class ClientApp:
             port = int(port_str)
             self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.client_socket.connect((ip, port))
+            self.conn_protocol = protocol.ConnectionProtocol()
             self.connected = True
             self.status_label.config(text=f"Conectado a {ip}:{port}")
 
@@ -934,8 +940,9 @@ class ClientApp:
     def send_message(self, message):
         if self.connected and self.client_socket:
             try:
-                payload = json.dumps(message) + "\n"
-                self.client_socket.sendall(payload.encode('utf-8'))
+                # El lock evita intercalarse con el HELLO que envía el hilo listener
+                with self.conn_protocol.send_lock:
+                    self.client_socket.sendall(self.conn_protocol.encode(message))
             except (BrokenPipeError, ConnectionResetError):
                 self.disconnect_server() # Maneja la desconexión
                 messagebox.showerror("Error de Red", "Conexión perdida con el servidor.")
@@ -944,11 +951,34 @@ class ClientApp:
         else:
             messagebox.showwarning("Envío", "No estás conectado.")
 
+    def negotiate_protocol(self, welcome_payload):
+        """
+        Pide al servidor un framing/codec más eficiente si lo anuncia en el WELCOME.
+
+        Corre en el hilo listener: desde el byte siguiente al HELLO este cliente
+        ya escribe en el framing nuevo (en JSON: el codec acordado es solo el de
+        lo que envía el servidor); la lectura cambia al recibir ACK_HELLO.
+        """
+        choice = protocol.choose_protocol(welcome_payload.get('protocol'))
+        if choice is None:
+            return # Servidor antiguo: se sigue con JSON por líneas
+        framing, codec = choice
+        # Los resultados grandes llegan comprimidos; el decoder los descomprime solo
+        compression = protocol.choose_compression(welcome_payload.get('protocol'))
+        with self.conn_protocol.send_lock:
+            self.client_socket.sendall(self.conn_protocol.encode({
+                "type": "HELLO",
+                "payload": {"framing": framing, "codec": codec, "compression": compression}
+            }))
+            self.conn_protocol.framing = framing
+            self.conn_protocol.codec = protocol.CLIENT_CODEC
+            self.conn_protocol.compression = compression
+
     def listen_to_server(self):
-        buffer = ""
+        decoder = self.conn_protocol.decoder
         while self.connected and self.client_socket:
             try:
-                data = self.client_socket.recv(4096)
+                data = self.client_socket.recv(65536)
                 if not data:
                     if self.connected:
                         self.message_queue.put(
@@ -956,17 +986,27 @@ class ClientApp:
                         )
                     break # Conexión cerrada por el servidor
 
-                buffer += data.decode('utf-8')
+                decoder.feed(data)
 
-                while '\n' in buffer:
-                    message_str, buffer = buffer.split('\n', 1)
-                    if not message_str.strip():
-                        continue
+                while True:
                     try:
-                        message = json.loads(message_str)
-                        self.message_queue.put(message)
-                    except json.JSONDecodeError:
-                        print(f"Error decodificando parte del mensaje: {message_str}")
+                        message = decoder.next_message()
+                    except protocol.MessageTooLarge:
+                        raise
+                    except protocol.ProtocolError as e:
+                        print(f"Error decodificando parte del mensaje: {e}")
+                        continue
+                    if message is None:
+                        break
+                    msg_type = message.get("type")
+                    if msg_type == "WELCOME":
+                        self.negotiate_protocol(message.get("payload", {}))
+                    elif msg_type == "ACK_HELLO":
+                        payload = message.get("payload", {})
+                        if payload.get("status") == "success":
+                            decoder.switch(payload["framing"], payload["codec"])
+                        continue # Mensaje interno del protocolo, no llega a la GUI
+                    self.message_queue.put(message)
 
             except (ConnectionResetError, BrokenPipeError):
                 if self.connected:
@@ -1082,9 +1122,21 @@ class ClientApp:
                 self.status_label.config(
                     text=f"Servidor inició proc. evento '{event}'. Archivos: {num_files}"
                 )
+                # Los resultados de este lote llegarán de nuevo (en streaming o al final)
+                self.clear_server_results()
                 # Mostrar UI para selección de archivos para simulación
                 if self.server_assigned_files:
                     self.display_file_selection_ui()
+
+            elif msg_type == "PROCESSING_RESULT":
+                # Resultado de un archivo (modo streaming): se agrega apenas llega
+                result = payload.get('result', {})
+                self.server_results_for_csv.append(result)
+                self._insert_result_row(result)
+                self.status_label.config(
+                    text=f"Proc. '{payload.get('event')}': "
+                         f"{len(self.server_results_for_csv)}/{payload.get('total', '?')} archivos"
+                )
                     
             elif msg_type == "PROCESSING_COMPLETE":
                 # Procesamiento completo
@@ -1095,9 +1147,25 @@ class ClientApp:
                 )
                 
                 if status == 'success':
-                    self.server_results_for_csv = payload.get('results', [])
-                    self.display_server_results()
+                    if payload.get('streamed'):
+                        # Las filas ya están en la tabla; el mensaje es solo un resumen
+                        self.status_label.config(
+                            text=f"Servidor completó proc. '{event}': "
+                                 f"{payload.get('total', 0)} archivos, "
+                                 f"{payload.get('failed', 0)} con error, "
+                                 f"{payload.get('duration_seconds', 0):.2f}s"
+                        )
+                    else:
+                        self.server_results_for_csv = payload.get('results', [])
+                        self.display_server_results()
                     self.save_csv_button.config(state=tk.NORMAL)
+                    if not self.server_assigned_files and self.server_results_for_csv:
+                        # Reparto 'steal': los archivos de este cliente se conocen al final
+                        self.server_assigned_files = [
+                            r.get("filename") for r in self.server_results_for_csv
+                            if r.get("filename")
+                        ]
+                        self.display_file_selection_ui()
                 else:
                     messagebox.showerror(
                         "Error Procesamiento", 
@@ -1143,7 +1211,8 @@ class ClientApp:
             # Actualizar la variable local inmediatamente para la simulación visual
             self.num_workers_for_sim_display = count
                 
-            config_payload = {"mode": mode, "count": count}
+            # stream: el servidor envía un PROCESSING_RESULT por archivo al terminarlo
+            config_payload = {"mode": mode, "count": count, "stream": True}
             self.send_message({"type": "SET_CONFIG", "payload": config_payload})
         except ValueError:
             messagebox.showerror("Error Config", "Cantidad de workers inválida.")
@@ -1377,8 +1446,9 @@ class ClientApp:
     def start_simulation_visual(self):
         self.processes_to_simulate.clear()
         self.proc_tree_sim.delete(*self.proc_tree_sim.get_children())
-        self.ready_queue_sim.clear()
-        self.running_processes_sim.clear()
+        self.sim_result = None
+        self.sim_event_index = 0
+        self.running_cpus_sim.clear()
         self.completed_processes_sim.clear()
         self.gantt_canvas.delete("all")
         self.simulation_time_sim = 0
@@ -1419,6 +1489,17 @@ class ClientApp:
             self.start_sim_button.config(state=tk.NORMAL)
             return
 
+        # El motor calcula toda la simulación de una vez; la GUI solo reproduce sus eventos.
+        # Los algoritmos no preemptivos se muestran en un solo CPU, como siempre.
+        if self.scheduler_sim is None:
+            self.change_scheduler_sim()
+        non_preemptive = isinstance(self.scheduler_sim, (SchedulerHRRN, SchedulerSJF,
+                                                         SchedulerFCFS, SchedulerPriorityNP))
+        cpus = 1 if non_preemptive else max(1, self.num_workers_for_sim_display)
+        self.sim_result = simulate(self.processes_to_simulate, self.scheduler_sim, cpus)
+        self.processes_by_pid_sim = {p.pid: p for p in self.processes_to_simulate}
+        self.update_gantt_display_sim(0, [])  # Etiquetas de CPUs
+
         if not self.simulation_running_sim:
             self.simulation_running_sim = True
             self.start_sim_button.config(text="Pausar Sim. Visual")
@@ -1427,6 +1508,7 @@ class ClientApp:
 
             # 🔁 Enviar archivos seleccionados al servidor para procesamiento regex
             if hasattr(self, "selected_files_for_processing"):
+                self.clear_server_results()
                 self.send_message({
                     "type": "PROCESS_FILES",
                     "payload": {
@@ -1441,140 +1523,52 @@ class ClientApp:
             self.status_label.config(text="Simulación visual pausada.")
 
     def simulation_step_visual(self):
+        """Reproduce los eventos de `self.sim_result` de un mismo instante por llamada."""
         if not self.simulation_running_sim:
             return
 
-        current_time = self.simulation_time_sim
-        self.status_label.config(text=f"Tiempo Sim: {current_time}")
-
-        # 1. Mover de self.processes_to_simulate a self.ready_queue_sim
-        remaining_to_schedule = []
-        for proc in self.processes_to_simulate:
-            if proc.arrival_time <= current_time:
-                proc.state = "Ready"
-                self.ready_queue_sim.append(proc)
-                self.update_process_table_sim(proc.pid, {"Estado": "Ready"})
-            else:
-                remaining_to_schedule.append(proc)
-        self.processes_to_simulate = remaining_to_schedule
-
-        # 2. Manejar procesos terminados
-        temp_running = []
-        for proc in self.running_processes_sim:
-            if proc.remaining_burst_time <= 0:
-                self.handle_process_completion_sim(proc, current_time)
-            else:
-                temp_running.append(proc)
-        self.running_processes_sim = temp_running
-
-        # 3. Scheduling (Visual)
-        available_threads_sim = (
-            self.num_workers_for_sim_display - len(self.running_processes_sim)
-        )
-
-        if isinstance(self.scheduler_sim, SchedulerHRRN) or isinstance(self.scheduler_sim, SchedulerSJF) or isinstance(self.scheduler_sim, SchedulerFCFS) or isinstance(self.scheduler_sim, SchedulerPriorityNP):
-            # Solo ejecuta un proceso a la vez
-            if not self.running_processes_sim and self.ready_queue_sim:
-                # Si no hay procesos listos, avanza el tiempo al siguiente proceso que llegue
-                arrived = [p for p in self.ready_queue_sim if p.arrival_time <= current_time]
-                if not arrived:
-                    next_arrival = min(p.arrival_time for p in self.ready_queue_sim)
-                    self.simulation_time_sim = next_arrival
-                    self.root.after(self.simulation_update_ms, self.simulation_step_visual)
-                    return
-
-                next_process = self.scheduler_sim.schedule(
-                    self.ready_queue_sim, self.simulation_time_sim,
-                    self.running_processes_sim, 1
-                )
-                if next_process:
-                    next_process.state = "Running"
-                    if next_process.start_time == -1:
-                        next_process.start_time = self.simulation_time_sim
-                    self.running_processes_sim.append(next_process)
-                    self.update_process_table_sim(
-                        next_process.pid,
-                        {"state": "Running", "start": next_process.start_time}
-                    )
-                    # Ejecuta el proceso completo de una vez (no preemptivo)
-                    next_process.remaining_burst_time = 0
-                    for t in range(next_process.start_time, next_process.start_time + next_process.burst_time):
-                        self.update_gantt_display_sim(t, [(next_process.pid, 0)])
-                    self.handle_process_completion_sim(next_process, next_process.start_time + next_process.burst_time)
-                    self.simulation_time_sim = next_process.start_time + next_process.burst_time
-                    self.root.after(self.simulation_update_ms, self.simulation_step_visual)
-                    return
-        else:
-            # --- Algoritmos preemptivos o RR (deja tu código actual aquí) ---
-            while available_threads_sim > 0 and self.ready_queue_sim:
-                next_process = self.scheduler_sim.schedule(
-                    self.ready_queue_sim, current_time,
-                    self.running_processes_sim, available_threads_sim
-                )
-                if next_process:
-                    next_process.state = "Running"
-                    if next_process.start_time == -1:
-                        next_process.start_time = current_time
-                    self.running_processes_sim.append(next_process)
-                    self.update_process_table_sim(
-                        next_process.pid,
-                        {"state": "Running", "start": next_process.start_time}
-                    )
-                    available_threads_sim -= 1
-                else:
-                    break    
-
-
-
-        # 4. Simular ejecución y manejo de RR
-        gantt_current_tick_sim = []
-        processes_to_requeue_rr = []
-
-        for i, proc in enumerate(self.running_processes_sim):
-            proc.remaining_burst_time -= 1
-            gantt_current_tick_sim.append((proc.pid, i)) # i es el "thread simulado"
-            self.update_process_table_sim(
-                proc.pid, {"Restante": proc.remaining_burst_time}
-            )
-
-            if isinstance(self.scheduler_sim, SchedulerRR):
-                if not hasattr(proc, 'ticks_in_current_burst'):
-                    proc.ticks_in_current_burst = 0
-                proc.ticks_in_current_burst +=1
-
-                if (proc.ticks_in_current_burst >= self.scheduler_sim.quantum and
-                        proc.remaining_burst_time > 0):
-                    processes_to_requeue_rr.append(proc)
-
-        # Mover procesos de RR de vuelta a la cola de listos
-        if processes_to_requeue_rr:
-            for proc_rr in processes_to_requeue_rr:
-                self.running_processes_sim.remove(proc_rr)
-                proc_rr.state = "Ready"
-                proc_rr.ticks_in_current_burst = 0 # Resetear contador
-                self.ready_queue_sim.append(proc_rr) # Añadir al final
-                self.update_process_table_sim(proc_rr.pid, {"Estado": "Ready"})
-
-        if gantt_current_tick_sim:
-            self.update_gantt_display_sim(current_time, gantt_current_tick_sim)
-
-        # 5. Incrementar tiempo
-        self.simulation_time_sim += 1
-
-        # 6. Comprobar fin
-        if (not self.processes_to_simulate and
-                not self.ready_queue_sim and
-                not self.running_processes_sim):
+        events = self.sim_result.events
+        if self.sim_event_index >= len(events):
             self.simulation_running_sim = False
             self.start_sim_button.config(
                 text="Sim. Visual Completa", state=tk.DISABLED
             )
             self.status_label.config(
-                text=f"Sim. visual completada en {current_time} ticks."
+                text=f"Sim. visual completada en {self.simulation_time_sim} ticks."
             )
             self.calculate_and_display_averages_sim()
-        else:
-            self.root.after(self.simulation_update_ms, self.simulation_step_visual)
+            return
+
+        event_time = events[self.sim_event_index][0]
+
+        # Gantt: los ticks desde el instante anterior, con los procesos que seguían corriendo
+        running_now = list(self.running_cpus_sim.items())
+        if running_now:
+            for tick in range(self.simulation_time_sim, event_time):
+                self.update_gantt_display_sim(tick, running_now)
+        self.simulation_time_sim = event_time
+        self.status_label.config(text=f"Tiempo Sim: {event_time}")
+
+        while (self.sim_event_index < len(events) and
+               events[self.sim_event_index][0] == event_time):
+            _time, kind, pid, cpu = events[self.sim_event_index]
+            self.sim_event_index += 1
+            process = self.processes_by_pid_sim[pid]
+            if kind == EVENT_ARRIVAL:
+                self.update_process_table_sim(pid, {"state": "Ready"})
+            elif kind == EVENT_DISPATCH:
+                self.running_cpus_sim[pid] = cpu
+                self.update_process_table_sim(
+                    pid, {"state": "Running", "start": process.start_time}
+                )
+            elif kind in (EVENT_QUANTUM, EVENT_PREEMPT):
+                self.running_cpus_sim.pop(pid, None)
+                self.update_process_table_sim(pid, {"state": "Ready"})
+            elif kind == EVENT_COMPLETE:
+                self.running_cpus_sim.pop(pid, None)
+                self.handle_process_completion_sim(process, event_time)
+
+        self.root.after(self.simulation_update_ms, self.simulation_step_visual)
 
     def handle_process_completion_sim(self, process, completion_time):
         process.state = "Terminated"
@@ -1788,6 +1782,40 @@ class ClientApp:
         self.avg_waiting_label.config(text=f"Tiempo de Espera Promedio: {avg_W:.2f}")
 
     # --- Resultados Servidor y CSV ---
+    def clear_server_results(self):
+        """Vacía la tabla y la lista de resultados del servidor."""
+        self.server_results_for_csv = []
+        for item in self.results_tree.get_children():
+            self.results_tree.delete(item)
+
+    def _insert_result_row(self, result):
+        """Agrega a la tabla de resultados la fila de un archivo procesado."""
+        try:
+            pid_server = result.get("pid_server", "N/A")
+            filename = result.get("filename", "")
+            
+            # Datos extraídos del archivo
+            data = result.get("data", {})
+            nombres_raw = data.get("nombres_encontrados", [])
+            lugares_raw = data.get("lugares_encontrados", [])
+            fechas_raw = data.get("dates_found", [])
+            word_count = str(data.get("word_count", 0))
+            
+            nombres = ", ".join(nombres_raw)[:50] + "..." if len(nombres_raw) > 3 else ", ".join(nombres_raw)
+            lugares = ", ".join(lugares_raw)[:50] + "..." if len(lugares_raw) > 3 else ", ".join(lugares_raw)
+            fechas = ", ".join(fechas_raw)[:50] + "..." if len(fechas_raw) > 3 else ", ".join(fechas_raw)
+
+            status = result.get("status", "")
+            error = result.get("error", "")
+            
+            self.results_tree.insert("", "end", values=(
+                pid_server, filename, nombres, lugares, fechas, 
+                word_count, status, error
+            ))
+        
+        except Exception as e:
+            print(f"Error al mostrar resultado: {e}")
+
     def display_server_results(self):
         """Muestra resultados del servidor en la interfaz."""
         if not self.server_results_for_csv:
@@ -1799,31 +1827,7 @@ class ClientApp:
 
         # Agregar cada resultado a la tabla
         for result in self.server_results_for_csv:
-            try:
-                pid_server = result.get("pid_server", "N/A")
-                filename = result.get("filename", "")
-                
-                # Datos extraídos del archivo
-                data = result.get("data", {})
-                nombres_raw = data.get("nombres_encontrados", [])
-                lugares_raw = data.get("lugares_encontrados", [])
-                fechas_raw = data.get("dates_found", [])
-                word_count = str(data.get("word_count", 0))
-                
-                nombres = ", ".join(nombres_raw)[:50] + "..." if len(nombres_raw) > 3 else ", ".join(nombres_raw)
-                lugares = ", ".join(lugares_raw)[:50] + "..." if len(lugares_raw) > 3 else ", ".join(lugares_raw)
-                fechas = ", ".join(fechas_raw)[:50] + "..." if len(fechas_raw) > 3 else ", ".join(fechas_raw)
-
-                status = result.get("status", "")
-                error = result.get("error", "")
-                
-                self.results_tree.insert("", "end", values=(
-                    pid_server, filename, nombres, lugares, fechas, 
-                    word_count, status, error
-                ))
-            
-            except Exception as e:
-                print(f"Error al mostrar resultado: {e}")
+            self._insert_result_row(result)
 
         # Actualizar barra de estado
         self.status_label.config(
@@ -0,0 +1,176 @@
+# src/corpus_index.py
+
+"""
+Índice invertido del corpus: término -> archivos, por campo.
+
+Cada resultado de extracción exitoso que entrega el servidor actualiza el
+índice con los nombres, lugares y fechas del archivo. Así un cliente puede
+preguntar "qué archivos mencionan Stockholm y una fecha de 1998" con un
+mensaje QUERY, sin descargar todos los resultados y recorrerlos.
+
+Los términos se comparan normalizados (`normalize_term`: casefold y espacios
+colapsados). Cada término de una consulta es un dict
+`{"field": ..., "value": ..., "match": "exact" | "contains"}` o la forma corta
+`"campo:valor"`; `field` puede ser `"*"` (cualquier campo indexado). `contains`
+recorre el vocabulario del campo, así que sirve para buscar "1998" dentro de
+"12 mar 1998".
+
+Cada archivo se guarda con su versión `(tamaño, mtime_ns)`. Si llega un
+resultado de otra versión, se descartan todos sus términos anteriores antes de
+agregar los nuevos (un archivo modificado no conserva términos viejos de campos
+que no se volvieron a pedir). Con `version_of` (p. ej. `FileIndex.get`), las
+consultas además descartan al vuelo los archivos que cambiaron o se borraron
+desde que se indexaron.
+"""
+
+import threading
+
+INDEXED_FIELDS = ('nombres', 'lugares', 'fechas')
+MATCH_MODES = ('exact', 'contains')
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def normalize_term(value: str) -> str:
+    return ' '.join(value.split()).casefold()
+
+
+def parse_term(term) -> tuple:
+    """`(campos, valor normalizado, modo)` de un término de consulta; ValueError si es inválido."""
+    if isinstance(term, str):
+        field, sep, value = term.partition(':')
+        if not sep:
+            raise ValueError(f"Término '{term}' inválido: se espera 'campo:valor'.")
+        term = {"field": field, "value": value}
+    if not isinstance(term, dict):
+        raise ValueError("Cada término debe ser un objeto o un texto 'campo:valor'.")
+    field = term.get("field", "*")
+    value = term.get("value")
+    match = term.get("match", "exact")
+    if field == "*":
+        fields = INDEXED_FIELDS
+    elif field in INDEXED_FIELDS:
+        fields = (field,)
+    else:
+        raise ValueError(f"Campo '{field}' no indexado; válidos: {', '.join(INDEXED_FIELDS)} o '*'.")
+    if not isinstance(value, str) or not normalize_term(value):
+        raise ValueError("Cada término necesita un 'value' de texto no vacío.")
+    if match not in MATCH_MODES:
+        raise ValueError(f"Modo '{match}' inválido; válidos: {', '.join(MATCH_MODES)}.")
+    return fields, normalize_term(value), match
+
+
+class CorpusIndex:
+    """Índice invertido en memoria, seguro entre hilos."""
+    def __init__(self, version_of=None):
+        self.version_of = version_of
+        self._lock = threading.Lock()
+        self._postings = {field: {} for field in INDEXED_FIELDS}  # campo -> término -> {archivos}
+        self._docs = {}  # archivo -> (versión, {campo: frozenset(términos)})
+        self.updates = 0
+        self.queries = 0
+
+    # --- Actualización ---
+    def update(self, name: str, version, values: dict):
+        """
+        Indexa `values` (campo -> lista de valores extraídos) para el archivo
+        `name`. Solo se reemplazan los campos presentes, salvo que cambie la versión.
+        """
+        with self._lock:
+            doc = self._docs.get(name)
+            if doc is not None and doc[0] != version:
+                self._remove(name)
+                doc = None
+            terms_by_field = dict(doc[1]) if doc is not None else {}
+            for field, field_values in values.items():
+                if field not in self._postings:
+                    continue
+                new_terms = frozenset(filter(None, map(normalize_term, field_values)))
+                old_terms = terms_by_field.get(field, frozenset())
+                postings = self._postings[field]
+                for term in old_terms - new_terms:
+                    self._discard_posting(postings, term, name)
+                for term in new_terms - old_terms:
+                    postings.setdefault(term, set()).add(name)
+                terms_by_field[field] = new_terms
+            self._docs[name] = (version, terms_by_field)
+            self.updates += 1
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            return self._remove(name)
+
+    def _remove(self, name: str) -> bool:
+        doc = self._docs.pop(name, None)
+        if doc is None:
+            return False
+        for field, terms in doc[1].items():
+            for term in terms:
+                self._discard_posting(self._postings[field], term, name)
+        return True
+
+    @staticmethod
+    def _discard_posting(postings: dict, term: str, name: str):
+        files = postings.get(term)
+        if files is not None:
+            files.discard(name)
+            if not files:
+                del postings[term]
+
+    # --- Consulta ---
+    def _term_files(self, fields, value, match) -> set:
+        files = set()
+        for field in fields:
+            postings = self._postings[field]
+            if match == 'exact':
+                files |= postings.get(value, set())
+            else:
+                for term, term_files in postings.items():
+                    if value in term:
+                        files |= term_files
+        return files
+
+    def query(self, all_terms=(), any_terms=(), offset: int = 0,
+              limit: int = DEFAULT_PAGE_SIZE) -> dict:
+        """
+        Archivos que cumplen todos los `all_terms` y al menos uno de los
+        `any_terms` (si hay), ordenados por nombre y paginados con `offset`/`limit`.
+        """
+        parsed_all = [parse_term(t) for t in all_terms]
+        parsed_any = [parse_term(t) for t in any_terms]
+        if not parsed_all and not parsed_any:
+            raise ValueError("La consulta necesita al menos un término en 'all' o 'any'.")
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError("'offset' debe ser un entero >= 0.")
+        if not isinstance(limit, int) or not 0 < limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"'limit' debe ser un entero entre 1 y {MAX_PAGE_SIZE}.")
+
+        with self._lock:
+            self.queries += 1
+            matched = None
+            # Los términos más selectivos primero: la intersección se achica antes
+            for files in sorted((self._term_files(*t) for t in parsed_all), key=len):
+                matched = files if matched is None else matched & files
+                if not matched:
+                    break
+            if parsed_any and (matched is None or matched):
+                any_files = set().union(*(self._term_files(*t) for t in parsed_any))
+                matched = any_files if matched is None else matched & any_files
+            if self.version_of is not None:
+                stale = {name for name in matched if self.version_of(name) != self._docs[name][0]}
+                for name in stale:
+                    self._remove(name)
+                matched -= stale
+            indexed_files = len(self._docs)
+
+        ordered = sorted(matched)
+        page = ordered[offset:offset + limit]
+        next_offset = offset + limit if offset + limit < len(ordered) else None
+        return {"total": len(ordered), "offset": offset, "limit": limit,
+                "next_offset": next_offset, "files": page, "indexed_files": indexed_files}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"files": len(self._docs),
+                    "terms": {field: len(p) for field, p in self._postings.items()},
+                    "updates": self.updates, "queries": self.queries}
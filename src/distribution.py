@@ -0,0 +1,206 @@
+# src/distribution.py
+
+"""
+Reparto de los archivos de un `trigger` entre los clientes en cola.
+
+- 'count': el reparto original, tajadas contiguas con la misma cantidad de
+  archivos por cliente, sin mirar tamaños.
+- 'size': LPT (longest processing time first) para máquinas de distinta
+  capacidad. Los archivos se recorren de mayor a menor y cada uno va al
+  cliente que lo terminaría antes: el que minimiza
+  (carga asignada + costo del archivo) / workers del cliente. El costo de un
+  archivo es su tamaño en bytes más `FILE_OVERHEAD_BYTES` (abrirlo y
+  despacharlo no es gratis aunque esté vacío).
+- 'steal': sin reparto previo. Los archivos quedan en una `SharedFileQueue` del
+  trigger y el lote de cada cliente toma de a `chunk_size` a medida que sus
+  workers se liberan. Un cliente rápido (p. ej. forks/8) termina procesando más
+  archivos que uno lento (threads/1), y el trigger acaba cuando la cola se vacía.
+
+`task_batches` decide, dentro del lote de un cliente, cuántos archivos viajan en
+cada tarea del pool en modo 'forks', donde cada tarea paga un pickle y una ida y
+vuelta por las colas de ProcessPoolExecutor.
+"""
+
+import collections
+import math
+import threading
+import time
+
+FILE_OVERHEAD_BYTES = 4096
+STEAL_CHUNK_SIZE = 2  # Archivos que toma un lote cada vez que pide trabajo en modo 'steal'
+DISTRIBUTION_MODES = ('count', 'size', 'steal')
+
+# Agrupación de archivos en tareas del pool ('forks')
+TASKS_PER_SLOT = 4  # Tareas por worker como mínimo: deja margen para balancear al final
+TASK_MAX_FILES = 64
+TASK_TARGET_BYTES = 1024 * 1024  # Una tarea se cierra al llegar a este costo
+
+
+def file_cost(size: int) -> int:
+    return size + FILE_OVERHEAD_BYTES
+
+
+def split_by_count(files: list, num_clients: int) -> list:
+    """Tajadas contiguas; los primeros `len(files) % num_clients` clientes reciben uno más."""
+    assignments = []
+    start_idx = 0
+    for i in range(num_clients):
+        files_this_client = len(files) // num_clients
+        if i < len(files) % num_clients:
+            files_this_client += 1
+        assignments.append(files[start_idx:start_idx + files_this_client])
+        start_idx += files_this_client
+    return assignments
+
+
+def split_by_size(entries: list, capacities: list) -> list:
+    """
+    Reparto LPT ponderado por capacidad.
+
+    Args:
+        entries: Lista de `(nombre, tamaño_en_bytes)`.
+        capacities: Workers de cada cliente (mismo orden que el resultado).
+
+    Returns:
+        Una lista de nombres por cliente, cada una de mayor a menor tamaño.
+    """
+    capacities = [max(1, c) for c in capacities]
+    assignments = [[] for _ in capacities]
+    loads = [0] * len(capacities)
+    # Orden estable: a igual tamaño, por nombre, para que el reparto sea reproducible
+    for name, size in sorted(entries, key=lambda e: (-e[1], e[0])):
+        cost = file_cost(size)
+        # Pocos clientes por trigger: la búsqueda lineal es exacta y suficiente
+        best = min(range(len(capacities)),
+                   key=lambda i: ((loads[i] + cost) / capacities[i], i))
+        assignments[best].append(name)
+        loads[best] += cost
+    return assignments
+
+
+def estimated_finish(entries: list, assignments: list, capacities: list) -> list:
+    """Carga relativa de cada cliente (costo asignado / workers), para mostrar el balance."""
+    sizes = dict(entries)
+    return [
+        sum(file_cost(sizes.get(name, 0)) for name in files) / max(1, capacity)
+        for files, capacity in zip(assignments, capacities)
+    ]
+
+
+def task_batches(sizes: list, slots: int) -> list:
+    """
+    Agrupa archivos consecutivos en tareas para un pool con `slots` workers.
+
+    Args:
+        sizes: Tamaño en bytes de cada archivo, en el orden del lote.
+        slots: Workers del lote.
+
+    Returns:
+        Lista de tareas; cada una es una lista de posiciones de `sizes`, en orden.
+
+    Muchos archivos chicos se juntan hasta `TASK_MAX_FILES` por tarea, pero sin
+    bajar de `TASKS_PER_SLOT` tareas por worker, y una tarea se cierra al llegar
+    a `TASK_TARGET_BYTES`: un archivo grande viaja solo.
+    """
+    if not sizes:
+        return []
+    max_files = min(TASK_MAX_FILES,
+                    max(1, math.ceil(len(sizes) / (max(1, slots) * TASKS_PER_SLOT))))
+    batches = []
+    current, current_cost = [], 0
+    for position, size in enumerate(sizes):
+        current.append(position)
+        current_cost += file_cost(size)
+        if len(current) >= max_files or current_cost >= TASK_TARGET_BYTES:
+            batches.append(current)
+            current, current_cost = [], 0
+    if current:
+        batches.append(current)
+    return batches
+
+
+class SharedFileQueue:
+    """
+    Cola de archivos compartida por los lotes de un trigger en modo 'steal'.
+
+    Los archivos salen de mayor a menor (igual que en LPT), así los grandes no
+    quedan para el final. `on_drained(queue)` se llama una vez, cuando todos
+    los archivos fueron tomados y reportados con `file_done`.
+
+    Un lote que termina antes de tiempo (error, cliente desconectado) devuelve
+    con `release` lo que tomó y no entregó, y otro lote lo procesa. Cada uno de
+    los `consumers` lotes llama a `detach` al terminar; si el último se va y
+    quedan archivos, nadie más los va a tomar: se cuentan como abandonados
+    (`abandoned`) para que el trigger termine igual.
+    """
+    def __init__(self, entries: list, chunk_size: int = STEAL_CHUNK_SIZE, on_drained=None,
+                 consumers: int = 1):
+        ordered = sorted(entries, key=lambda e: (-e[1], e[0]))
+        self._pending = collections.deque(name for name, _size in ordered)
+        self.total = len(self._pending)
+        self.chunk_size = max(1, chunk_size)
+        self.on_drained = on_drained
+        self.taken_by = collections.Counter()  # dueño -> archivos tomados
+        self.completed = 0
+        self.abandoned = 0
+        self.started_at = time.time()
+        self.finished_at = None
+        self._consumers = consumers
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Archivos que aún nadie tomó."""
+        with self._lock:
+            return len(self._pending)
+
+    def take(self, owner) -> list:
+        """Hasta `chunk_size` archivos para `owner`; lista vacía si la cola se vació."""
+        with self._lock:
+            chunk = [self._pending.popleft()
+                     for _ in range(min(self.chunk_size, len(self._pending)))]
+            if chunk:
+                self.taken_by[owner] += len(chunk)
+            return chunk
+
+    def iter_chunks(self, owner, keep_taking=None):
+        """
+        Generador que va tomando tandas de hasta `chunk_size` archivos a medida que
+        se consume. Si `keep_taking()` devuelve False (p. ej. el cliente se
+        desconectó), deja de tomar aunque queden archivos.
+        """
+        while keep_taking is None or keep_taking():
+            chunk = self.take(owner)
+            if not chunk:
+                return
+            yield chunk
+
+    def release(self, owner, files: list):
+        """Devuelve al frente de la cola, en su orden, archivos tomados que no se entregaron."""
+        if not files:
+            return
+        with self._lock:
+            self._pending.extendleft(reversed(files))
+            self.taken_by[owner] -= len(files)
+
+    def file_done(self):
+        self._finish(1)
+
+    def detach(self):
+        """Un lote de la cola terminó; si era el último, se abandonan los archivos que queden."""
+        with self._lock:
+            self._consumers -= 1
+            if self._consumers > 0 or not self._pending:
+                return
+            left = len(self._pending)
+            self._pending.clear()
+            self.abandoned += left
+        self._finish(left)
+
+    def _finish(self, count: int):
+        with self._lock:
+            self.completed += count
+            drained = self.completed == self.total
+            if drained:
+                self.finished_at = time.time()
+        if drained and self.on_drained:
+            self.on_drained(self)
@@ -0,0 +1,272 @@
+# src/extraction_cache.py
+
+"""
+Caché persistente de resultados de extracción (SQLite en modo WAL).
+
+Cada entrada guarda el resultado de `parse_file_regex` para una ruta, junto con
+el tamaño y el mtime (en ns) que tenía el archivo y la versión del extractor. Un
+acierto exige que los cuatro coincidan: si el archivo cambió o el extractor se
+actualizó (`EXTRACTOR_VERSION`), la entrada se ignora y se vuelve a extraer.
+
+La caché se usa desde los workers, que pueden ser hilos o procesos creados con
+fork; cada hilo/proceso abre su propia conexión (una conexión SQLite no se
+puede compartir entre procesos). WAL permite que varios lean mientras uno
+escribe, así que un acierto es un SELECT sin transacción de escritura: los
+workers no se turnan el lock de escritor para leer.
+
+Los contadores (aciertos, parciales, fallos) y las marcas de último uso se
+acumulan en memoria en cada proceso y se escriben juntos en la base en `put`,
+en `flush` o cada `STATS_FLUSH_SECONDS` (un hilo por proceso); así suman lo de todos los procesos,
+con hasta ese retraso. El último uso se guarda con resolución de
+`LAST_USED_RESOLUTION` segundos, que alcanza para el LRU: al superar
+`max_bytes` se descartan las entradas usadas hace más tiempo.
+
+Cualquier error de SQLite se trata como un fallo de caché: la extracción nunca
+se detiene por la caché.
+"""
+
+import collections
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    path        TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    version     TEXT NOT NULL,
+    result      TEXT NOT NULL,
+    bytes       INTEGER NOT NULL,
+    last_used   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counters(name, value)
+    VALUES ('hits', 0), ('partial', 0), ('misses', 0), ('evictions', 0);
+"""
+STATS_FLUSH_SECONDS = 5.0     # Cada cuánto un proceso vuelca sus contadores pendientes
+LAST_USED_RESOLUTION = 60     # Segundos: granularidad de `last_used` para el LRU
+
+
+class ExtractionCache:
+    def __init__(self, db_path: str, version: str, max_bytes: int = 256 * 1024 * 1024):
+        self.db_path = db_path
+        self.version = version
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._reset_pending()
+        # Un hijo creado con fork empieza sin pendientes (los del padre los vuelca el
+        # padre) y con un lock nuevo (el heredado pudo quedar tomado por otro hilo)
+        os.register_at_fork(after_in_child=self._reset_pending)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+
+    def _reset_pending(self):
+        self._pending_lock = threading.Lock()
+        self._pending_counts = collections.Counter()
+        self._pending_touches = {}  # ruta -> último uso (redondeado)
+        self._flusher_started = False  # Los hilos no sobreviven al fork: cada proceso lanza el suyo
+
+    def _connect(self) -> sqlite3.Connection:
+        """Conexión propia del hilo actual (y del proceso actual, tras un fork)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # isolation_level=None: las transacciones se abren a mano con BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, filepath: str, required_keys=()):
+        """
+        Busca el resultado cacheado de `filepath`.
+
+        Devuelve `(resultado, clave)`: el resultado es None si no hay acierto, y
+        la clave `(size, mtime_ns)` se pasa luego a `put`. Si el archivo no se
+        puede leer con stat devuelve `(None, None)`. Una entrada a la que le falta
+        alguna de `required_keys` se devuelve igual, pero cuenta como 'partial'
+        (el llamador vuelve a extraer esos campos).
+        """
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None, None
+        key = (st.st_size, st.st_mtime_ns)
+        path = os.path.abspath(filepath)
+
+        try:
+            row = self._connect().execute(
+                "SELECT result FROM entries "
+                "WHERE path = ? AND size = ? AND mtime_ns = ? AND version = ?",
+                (path, key[0], key[1], self.version)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"Caché de extracción no disponible ({e}); se extrae sin caché.")
+            return None, key
+
+        if row is None:
+            self._record('misses')
+            return None, key
+        result = json.loads(row[0])
+        self._record('partial' if any(k not in result for k in required_keys) else 'hits', path)
+        return result, key
+
+    def _record(self, counter: str, path: str = None):
+        """Suma a un contador pendiente y marca el uso de `path`; los vuelca `_flush_loop`."""
+        with self._pending_lock:
+            self._pending_counts[counter] += 1
+            if path is not None:
+                now = time.time()
+                self._pending_touches[path] = now - now % LAST_USED_RESOLUTION
+            start_flusher = not self._flusher_started
+            self._flusher_started = True
+        if start_flusher:
+            threading.Thread(target=self._flush_loop, daemon=True,
+                             name="extraction-cache-flush").start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(STATS_FLUSH_SECONDS)
+            self.flush()
+
+    def _take_pending(self) -> tuple:
+        with self._pending_lock:
+            counts, touches = self._pending_counts, self._pending_touches
+            self._pending_counts = collections.Counter()
+            self._pending_touches = {}
+        return counts, touches
+
+    @staticmethod
+    def _write_pending(conn, counts, touches):
+        """Vuelca contadores y marcas de uso (dentro de una transacción abierta)."""
+        conn.executemany("UPDATE counters SET value = value + ? WHERE name = ?",
+                         [(value, name) for name, value in counts.items() if value])
+        conn.executemany("UPDATE entries SET last_used = MAX(last_used, ?) WHERE path = ?",
+                         [(used, path) for path, used in touches.items()])
+
+    def flush(self):
+        """Escribe en la base los contadores y marcas de uso pendientes de este proceso."""
+        counts, touches = self._take_pending()
+        if not counts and not touches:
+            return
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_pending(conn, counts, touches)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logging.warning(f"No se pudieron guardar las estadísticas de la caché de extracción: {e}")
+
+    def put(self, filepath: str, key, result: dict):
+        """Guarda `result` para `filepath` con la clave devuelta por `get` y aplica el límite LRU."""
+        if key is None:
+            return
+        path = os.path.abspath(filepath)
+        encoded = json.dumps(result)
+        counts, touches = self._take_pending()  # Ya que se toma el lock de escritor
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_pending(conn, counts, touches)
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries"
+                    "(path, size, mtime_ns, version, result, bytes, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (path, key[0], key[1], self.version, encoded, len(encoded), time.time())
+                )
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logging.warning(f"No se pudo guardar en la caché de extracción: {e}")
+
+    def entries(self):
+        """Genera `(ruta, (size, mtime_ns), resultado)` de las entradas de la versión actual."""
+        try:
+            rows = self._connect().execute(
+                "SELECT path, size, mtime_ns, result FROM entries WHERE version = ?",
+                (self.version,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logging.warning(f"No se pudieron leer las entradas de la caché de extracción: {e}")
+            return
+        for path, size, mtime_ns, result in rows:
+            yield path, (size, mtime_ns), json.loads(result)
+
+    def _evict(self, conn):
+        """Borra las entradas menos usadas hasta quedar bajo `max_bytes` (dentro de la transacción)."""
+        total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for path, size in conn.execute(
+                "SELECT path, bytes FROM entries ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE path = ?", (path,))
+            total -= size
+            evicted += 1
+        conn.execute("UPDATE counters SET value = value + ? WHERE name = 'evictions'",
+                     (evicted,))
+
+    def invalidate(self, filepath: str = None) -> int:
+        """
+        Borra la entrada de `filepath`, o todas si es None. Devuelve cuántas se
+        borraron, o None si la base no está disponible.
+        """
+        try:
+            conn = self._connect()
+            if filepath is None:
+                cursor = conn.execute("DELETE FROM entries")
+            else:
+                cursor = conn.execute("DELETE FROM entries WHERE path = ?",
+                                      (os.path.abspath(filepath),))
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logging.warning(f"No se pudo invalidar la caché de extracción: {e}")
+            return None
+
+    def stats(self) -> dict:
+        """
+        Estadísticas de la base, o None si no está disponible. Lo pendiente de
+        otros procesos llega con su próximo volcado.
+        """
+        self.flush()
+        try:
+            conn = self._connect()
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            entries, total_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries"
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"No se pudieron leer las estadísticas de la caché de extracción: {e}")
+            return None
+        lookups = (counters.get('hits', 0) + counters.get('partial', 0)
+                   + counters.get('misses', 0))
+        return {
+            "entries": entries,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": counters.get('hits', 0),
+            "partial": counters.get('partial', 0),
+            "misses": counters.get('misses', 0),
+            "evictions": counters.get('evictions', 0),
+            "hit_ratio": counters.get('hits', 0) / lookups if lookups else 0.0,
+            "version": self.version,
+        }
@@ -1,10 +1,454 @@
+import collections
+import io
+import logging
+import os
 import re
+import threading
+import time
 from typing import Dict
 
-def parse_file_regex(filepath: str, pid: str) -> Dict:
+from .gazetteer import Gazetteer, split_words
+
+# --- Patrones compilados una sola vez por proceso (al importar el módulo) ---
+# Los procesos 'forks' los heredan ya compilados del servidor.
+#
+# Los patrones originales empezaban con \b, y con eso el motor de `re` no puede
+# saltar directo a los caracteres en que una coincidencia puede empezar: prueba
+# el patrón en cada posición del texto. Aquí cada patrón empieza con su primer
+# carácter (dígito, mayúscula...) y el límite de palabra se verifica justo
+# después con un lookbehind: (?<!\w.) = "el carácter anterior al recién leído
+# no es de palabra", lo mismo que \b antes de un carácter de palabra. Las
+# coincidencias son exactamente las mismas (ver src/bench_extractor.py).
+
+# Nombres (ej: John Smith, Anna Karlsson)
+NOMBRES_RE = re.compile(
+    r'[A-ZÁÉÍÓÚÑÅÄÖ](?<!\w.)[a-záéíóúñåäö]+(?:\s+[A-ZÁÉÍÓÚÑÅÄÖ][a-záéíóúñåäö]+)+\b'
+)
+
+# Fechas textuales ("3rd de marzo 2021", "12 jan", "14"). \d(?<!\w\d)\d? equivale
+# a \b\d{1,2} (e intenta las dos cifras primero, igual que el original).
+FECHAS_TEXTO_RE = re.compile(
+    r'\d(?<!\w\d)\d?(?:st|nd|rd|th)?(?:\s*(?:de\s+)?(?:enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|octubre|noviembre|diciembre|'
+    r'jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec|maj))?(?:\s*[\.,]?\s*\d{2,4})?\b',
+    flags=re.IGNORECASE
+)
+
+# Fechas numéricas (12/03/2020, 2020-03-12); equivale a
+# \b(?:\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4}|\d{4}[/\-]\d{1,2}[/\-]\d{1,2})\b
+FECHAS_NUM_RE = re.compile(
+    r"\d(?<!\w\d)(?:\d?[/\-]\d{1,2}[/\-]\d{2,4}|\d{3}[/\-]\d{1,2}[/\-]\d{1,2})\b"
+)
+
+# Lugares: gazetteer (un nombre por línea) buscado con Aho-Corasick. El autómata se
+# arma una vez al importar y lo comparten los hilos y los procesos 'forks'.
+GAZETTEER_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'lugares.txt'))
+
+# Se usa si no se encuentra GAZETTEER_PATH
+CIUDADES_COMUNES = [
+    "New York", "Chicago", "Los Angeles", "San Francisco", "Boston",
+    "Minneapolis", "Detroit", "Miami", "Stockholm", "Göteborg", "Malmö",
+    "Uppsala", "Lund", "Karlstad", "Örebro", "Västerås", "Linköping"
+]
+
+
+def load_places_gazetteer(path: str = GAZETTEER_PATH) -> Gazetteer:
     try:
-        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+        return Gazetteer.from_file(path)
+    except OSError as e:
+        logging.warning(f"No se pudo leer el gazetteer '{path}' ({e}); se usa la lista por defecto.")
+        return Gazetteer(CIUDADES_COMUNES)
+
+
+LUGARES = load_places_gazetteer()
+
+# Subir cuando cambie lo que devuelve parse_file_regex: invalida la caché de extracción.
+# Incluye la huella del gazetteer para que editar la lista también la invalide.
+EXTRACTOR_VERSION = f"3-{LUGARES.fingerprint}"
+
+# --- Extracción por bloques para archivos grandes ---
+# Un archivo de varios GB leído entero (y por N workers 'forks' a la vez) agota la
+# memoria. Desde STREAM_THRESHOLD_BYTES se lee de a STREAM_CHUNK_CHARS caracteres y
+# la memoria queda acotada por el bloque más las coincidencias únicas. El bloque es
+# chico porque su partición en palabras ocupa decenas de veces lo que el texto.
+STREAM_THRESHOLD_BYTES = 64 * 1024 * 1024
+STREAM_CHUNK_CHARS = 1024 * 1024
+# Ventana de solapamiento: una coincidencia que empieza antes del corte se busca con
+# hasta esta cantidad de caracteres por delante. Las más largas (p. ej. una cadena de
+# nombres de 64K caracteres) quedarían truncadas.
+STREAM_OVERLAP_CHARS = 64 * 1024
+
+
+# --- Modo bytes ---
+# El archivo se lee en binario. Contar palabras no necesita decodificar ni crear un
+# objeto por palabra, y en archivos ASCII los patrones marcados `bytes_safe` corren
+# directo sobre los bytes. Lo demás se decodifica una sola vez y usa el camino str.
+
+# Byte -> b'a' si es de palabra ASCII o no ASCII (parte de un carácter UTF-8), b' ' si no
+_WORD_BYTES_TABLE = bytes(
+    0x61 if i >= 0x80 or chr(i).isalnum() or chr(i) == '_' else 0x20 for i in range(256)
+)
+_NON_ASCII_RE = re.compile(rb'[\x80-\xff]+')
+_WORD_RE = re.compile(r'\w+')
+# Espacios de \s en un str ASCII; en bytes, \s no incluye \x1c-\x1f
+_ASCII_STR_SPACE = r'[\t-\r\x1c-\x20]'
+
+
+def count_words_bytes(data: bytes) -> int:
+    """
+    Igual a contar las palabras (\w+) de `data.decode('utf-8', 'ignore')`, sin
+    decodificar ni crear un objeto por palabra.
+
+    Cada corrida de bytes de palabra o no ASCII se cuenta como una palabra
+    (translate + count, en C). Las pocas corridas que contienen bytes no ASCII
+    se decodifican y se cuentan aparte, porque ahí puede haber más de una
+    palabra ("é—x") o ninguna (bytes inválidos). Un carácter UTF-8 nunca queda
+    partido entre corridas: todos sus bytes son no ASCII.
+    """
+    marks = data.translate(_WORD_BYTES_TABLE)
+    count = marks.count(b' a') + (marks[:1] == b'a')
+    if data.isascii():
+        return count
+    run_end = 0
+    for match in _NON_ASCII_RE.finditer(data):
+        if match.start() < run_end:
+            continue  # Misma corrida que el anterior
+        run_start = marks.rfind(b' ', 0, match.start()) + 1
+        run_end = marks.find(b' ', match.end())
+        if run_end < 0:
+            run_end = len(marks)
+        run = data[run_start:run_end].decode('utf-8', 'ignore')
+        count += len(_WORD_RE.findall(run)) - 1
+    return count
+
+
+def ascii_bytes_pattern(pattern: re.Pattern) -> re.Pattern:
+    """
+    Versión bytes de `pattern`, con las mismas coincidencias sobre texto ASCII.
+
+    El patrón debe ser ASCII y usar \s solo fuera de clases de caracteres.
+    """
+    source = pattern.pattern.replace('\\s', _ASCII_STR_SPACE).encode('ascii')
+    return re.compile(source, pattern.flags & re.IGNORECASE)
+
+
+def decode_text(data: bytes) -> str:
+    """Como leer en modo texto: UTF-8 ignorando errores y saltos de línea universales."""
+    text = data.decode('utf-8', 'ignore')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+# --- Registro de extractores ---
+# Cada campo que puede pedir un cliente (SET_CONFIG / PROCESS_FILES "fields") es un
+# extractor registrado. Solo corren las pasadas de los campos pedidos, y cada una se
+# cronometra por separado (ver ExtractorTimings).
+SPLIT_TIMING_KEY = "split_words"  # Tiempo de la partición en palabras, compartida
+
+
+class _StreamBlock:
+    """Un bloque de `extract_from_stream`, tal como lo ve cada extractor."""
+    __slots__ = ('buffer', 'cut', 'offset', 'partes', 'words', 'words_before')
+
+    def __init__(self, buffer, cut, offset, partes, words, words_before):
+        self.buffer = buffer              # Texto del bloque (incluye lo que sigue al corte)
+        self.cut = cut                    # Solo cuentan coincidencias que empiezan antes
+        self.offset = offset              # Posición absoluta de buffer[0]
+        self.partes = partes              # split_words del bloque completo (o None)
+        self.words = words                # Palabras antes del corte
+        self.words_before = words_before  # Palabras de los bloques anteriores
+
+
+class RegexExtractor:
+    """Conjunto de coincidencias de uno o más patrones, cada uno en su propia pasada."""
+    uses_words = False
+
+    def __init__(self, field: str, result_key: str, client_key: str, *patterns,
+                 bytes_safe: bool = False):
+        self.field = field
+        self.result_key = result_key  # Clave en el dict de parse_file_regex
+        self.client_key = client_key  # Clave en "data" del resultado que recibe el cliente
+        self.patterns = patterns
+        # bytes_safe: los patrones admiten ascii_bytes_pattern y corren sobre bytes en archivos ASCII
+        self.bytes_patterns = tuple(map(ascii_bytes_pattern, patterns)) if bytes_safe else None
+        self.empty = []
+
+    def extract(self, content: str, partes) -> set:
+        found = set()
+        for pattern in self.patterns:
+            found.update(pattern.findall(content))
+        return found
+
+    def handles_bytes(self, is_ascii: bool) -> bool:
+        return is_ascii and self.bytes_patterns is not None
+
+    def extract_bytes(self, data: bytes) -> set:
+        found = set()
+        for pattern in self.bytes_patterns:
+            found.update(match.decode('ascii') for match in pattern.findall(data))
+        return found
+
+    def start_stream(self):
+        # Fin (absoluto) de la última coincidencia de cada patrón, como findall sobre el texto entero
+        return set(), [0] * len(self.patterns)
+
+    def feed(self, state, block: _StreamBlock):
+        found, resume = state
+        for i, pattern in enumerate(self.patterns):
+            for match in pattern.finditer(block.buffer, max(resume[i] - block.offset, 0)):
+                if match.start() >= block.cut:
+                    break
+                found.add(match.group())
+                resume[i] = block.offset + match.end()
+
+    def finish(self, state) -> set:
+        return state[0]
+
+
+class GazetteerExtractor:
+    """Nombres de un gazetteer (Aho-Corasick sobre la partición en palabras)."""
+    uses_words = True
+
+    def __init__(self, field: str, result_key: str, client_key: str, gazetteer: Gazetteer):
+        self.field = field
+        self.result_key = result_key
+        self.client_key = client_key
+        self.gazetteer = gazetteer
+        self.empty = []
+
+    def extract(self, content: str, partes) -> set:
+        return set(self.gazetteer.findall_parts(partes))
+
+    def handles_bytes(self, is_ascii: bool) -> bool:
+        return False
+
+    def start_stream(self):
+        return {"found": set(), "resume": 0}  # resume: en palabras absolutas
+
+    def feed(self, state, block: _StreamBlock):
+        start_word = max(state["resume"] - block.words_before, 0)
+        for start, end, name in self.gazetteer.find_parts(block.partes, start_word):
+            if start >= block.words:
+                break
+            state["found"].add(name)
+            state["resume"] = block.words_before + end
+
+    def finish(self, state) -> set:
+        return state["found"]
+
+
+class WordCountExtractor:
+    """Cantidad de palabras (\b\w+\b): una corrida de \w siempre está entre límites."""
+    uses_words = True
+
+    def __init__(self, field: str, result_key: str, client_key: str):
+        self.field = field
+        self.result_key = result_key
+        self.client_key = client_key
+        self.empty = 0
+
+    def extract(self, content: str, partes) -> int:
+        return len(partes) // 2
+
+    def handles_bytes(self, is_ascii: bool) -> bool:
+        return True
+
+    def extract_bytes(self, data: bytes) -> int:
+        return count_words_bytes(data)
+
+    def start_stream(self):
+        return [0]
+
+    def feed(self, state, block: _StreamBlock):
+        state[0] += block.words
+
+    def finish(self, state) -> int:
+        return state[0]
+
+
+EXTRACTORS = {}
+
+
+def register_extractor(extractor):
+    """Agrega (o reemplaza) un extractor. Cambia lo que devuelve parse_file_regex: subir EXTRACTOR_VERSION."""
+    EXTRACTORS[extractor.field] = extractor
+    return extractor
+
+
+# Emails. El lookbehind hace que la parte local solo se intente desde su comienzo
+# (sin él, cada posición dentro de una palabra se recorre hasta el final de la palabra)
+EMAILS_RE = re.compile(r'(?<![\w.+-])[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+
+register_extractor(RegexExtractor("nombres", "Nombres", "nombres_encontrados", NOMBRES_RE))
+register_extractor(RegexExtractor("fechas", "Fechas", "dates_found", FECHAS_TEXTO_RE, FECHAS_NUM_RE,
+                                  bytes_safe=True))
+register_extractor(GazetteerExtractor("lugares", "Lugares", "lugares_encontrados", LUGARES))
+register_extractor(WordCountExtractor("palabras", "ConteoPalabras", "word_count"))
+register_extractor(RegexExtractor("emails", "Emails", "emails_found", EMAILS_RE, bytes_safe=True))
+
+# Los campos que se extraían siempre; emails hay que pedirlo
+DEFAULT_FIELDS = ("nombres", "fechas", "lugares", "palabras")
+
+
+def resolve_fields(fields=None) -> tuple:
+    """
+    Campos a extraer, en el orden del registro. None = DEFAULT_FIELDS.
+
+    Lanza ValueError si `fields` no es una lista de nombres registrados.
+    """
+    if fields is None:
+        return DEFAULT_FIELDS
+    if not isinstance(fields, (list, tuple)) or not all(isinstance(f, str) for f in fields):
+        raise ValueError("'fields' debe ser una lista de nombres de campo.")
+    unknown = [f for f in fields if f not in EXTRACTORS]
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(unknown)} "
+                         f"(disponibles: {', '.join(EXTRACTORS)}).")
+    return tuple(f for f in EXTRACTORS if f in fields)
+
+
+def extract_from_text(content: str, fields=DEFAULT_FIELDS) -> tuple:
+    """
+    Corre los extractores de `fields` sobre un texto ya leído.
+
+    Devuelve `(valores, tiempos)`: campo -> conjunto (o número), y campo -> segundos.
+
+    Los patrones no se combinan en una sola alternación porque sus
+    coincidencias se solapan ("New York" es nombre y lugar; "12/03/2020"
+    contiene fechas textuales), y `findall` con alternación perdería las
+    solapadas. Sí comparten la compilación y cada uno es una sola pasada en C.
+    """
+    extractors = [EXTRACTORS[f] for f in fields]
+    timings = {}
+    partes = None
+    if any(e.uses_words for e in extractors):
+        # Una sola partición en palabras para el gazetteer y el conteo
+        started = time.perf_counter()
+        partes = split_words(content)
+        timings[SPLIT_TIMING_KEY] = time.perf_counter() - started
+    values = {}
+    for extractor in extractors:
+        started = time.perf_counter()
+        values[extractor.field] = extractor.extract(content, partes)
+        timings[extractor.field] = time.perf_counter() - started
+    return values, timings
+
+
+def extract_from_bytes(data: bytes, fields=DEFAULT_FIELDS) -> tuple:
+    """
+    Como `extract_from_text(decode_text(data), fields)`, con los mismos resultados.
+
+    Los extractores que pueden (`handles_bytes`) trabajan sobre los bytes; el
+    resto recibe el texto decodificado una sola vez. Si igual hace falta la
+    partición en palabras (gazetteer), el conteo sale de ella sin costo extra.
+    """
+    is_ascii = data.isascii()
+    if is_ascii and b'\r' in data:
+        # Saltos de línea universales, como en modo texto (en ASCII, reemplazar bytes es exacto)
+        data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    extractors = [EXTRACTORS[f] for f in fields]
+    str_extractors = [e for e in extractors if not e.handles_bytes(is_ascii)]
+    if any(e.uses_words for e in str_extractors):
+        # La partición se hace igual: todo lo que use palabras va por str
+        str_extractors = [e for e in extractors if e.uses_words or e in str_extractors]
+    bytes_extractors = [e for e in extractors if e not in str_extractors]
+
+    values, timings = {}, {}
+    if str_extractors:
+        started = time.perf_counter()
+        text = decode_text(data)
+        timings["decode"] = time.perf_counter() - started
+        values, str_timings = extract_from_text(text, [e.field for e in str_extractors])
+        timings.update(str_timings)
+    for extractor in bytes_extractors:
+        started = time.perf_counter()
+        values[extractor.field] = extractor.extract_bytes(data)
+        timings[extractor.field] = time.perf_counter() - started
+    return {f: values[f] for f in fields}, timings
+
+
+def _safe_cut(buffer: str, target: int) -> int:
+    """Último espacio en blanco antes de `target`, o -1. Ninguna coincidencia empieza en un blanco."""
+    if target <= 0:
+        return -1
+    return max(buffer.rfind(' ', 0, target), buffer.rfind('\n', 0, target))
+
+
+def extract_from_stream(f, fields=DEFAULT_FIELDS, chunk_chars: int = STREAM_CHUNK_CHARS,
+                        overlap_chars: int = STREAM_OVERLAP_CHARS) -> tuple:
+    """
+    Igual que `extract_from_text(f.read(), fields)`, pero leyendo `f` de a `chunk_chars`.
+
+    Cada bloque se corta en un blanco a `overlap_chars` o más del final, y lo
+    que sigue al corte pasa al bloque siguiente. En cada bloque se aceptan solo
+    las coincidencias que empiezan antes del corte, buscándolas en el bloque
+    completo, así que una coincidencia que cruza el corte no se pierde. Cada
+    patrón recuerda dónde terminó su última coincidencia (como `findall` sobre
+    el texto entero) para no contar dos veces lo que ya consumió. Las palabras
+    se cuentan solo hasta el corte; como el corte cae en un blanco, ninguna
+    palabra queda partida.
+    """
+    extractors = [EXTRACTORS[f] for f in fields]
+    uses_words = any(e.uses_words for e in extractors)
+    states = [e.start_stream() for e in extractors]
+    timings = dict.fromkeys(([SPLIT_TIMING_KEY] if uses_words else []) + list(fields), 0.0)
+    carry = ''
+    offset = 0  # Posición absoluta de buffer[0]
+    words_before = 0
+
+    while True:
+        data = f.read(chunk_chars)
+        buffer = carry + data
+        if not data:
+            cut = len(buffer)
+        else:
+            cut = _safe_cut(buffer, len(buffer) - overlap_chars)
+            if cut <= 0:
+                carry = buffer  # Sin blancos en el bloque: seguir leyendo
+                continue
+
+        partes, words = None, 0
+        if uses_words:
+            started = time.perf_counter()
+            partes = split_words(buffer[:cut])
+            words = len(partes) // 2
+            if data:
+                # Palabras posteriores al corte, para reconocer lugares que lo cruzan
+                resto = split_words(buffer[cut:])
+                partes[-1] += resto[0]
+                partes.extend(resto[1:])
+            timings[SPLIT_TIMING_KEY] += time.perf_counter() - started
+
+        block = _StreamBlock(buffer, cut, offset, partes, words, words_before)
+        for extractor, state in zip(extractors, states):
+            started = time.perf_counter()
+            extractor.feed(state, block)
+            timings[extractor.field] += time.perf_counter() - started
+        words_before += words
+
+        if not data:
+            break
+        carry = buffer[cut:]
+        offset += cut
+
+    values = {e.field: e.finish(state) for e, state in zip(extractors, states)}
+    return values, timings
+
+
+def parse_file_regex(filepath: str, pid: str, fields=DEFAULT_FIELDS) -> Dict:
+    """
+    Extrae los campos `fields` (ver EXTRACTORS) de un archivo.
+
+    El resultado trae una clave por campo pedido (Nombres, Fechas, ...) y en
+    "Tiempos" los segundos de cada extractor.
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            if os.fstat(f.fileno()).st_size >= STREAM_THRESHOLD_BYTES:
+                text_stream = io.TextIOWrapper(f, encoding='utf-8', errors='ignore')
+                values, timings = extract_from_stream(text_stream, fields)
+            else:
+                values, timings = extract_from_bytes(f.read(), fields)
     except Exception as e:
         return {
             "pid": pid,
@@ -17,43 +461,42 @@ def parse_file_regex(filepath: str, pid: str) -> Dict:
             "error": f"Error al leer archivo: {str(e)}"
         }
 
-    # --- Nombres (ej: John Smith, Anna Karlsson) ---
-    nombres = re.findall(r'\b[A-ZÁÉÍÓÚÑÅÄÖ][a-záéíóúñåäö]+(?:\s+[A-ZÁÉÍÓÚÑÅÄÖ][a-záéíóúñåäö]+)+\b', content)
+    # --- Debug ---
+    # print(f"[DEBUG] Procesado: {filepath}")
+    # print(f"[DEBUG] Valores: {values}")
+    # print(f"[DEBUG] Tiempos: {timings}")
 
-    # --- Fechas (igual que antes) ---
-    fechas = re.findall(
-        r'\b(?:\d{1,2}(?:st|nd|rd|th)?(?:\s*(?:de\s+)?(?:enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|octubre|noviembre|diciembre|'
-        r'jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec|maj))?(?:\s*[\.,]?\s*\d{2,4})?)\b',
-        content, flags=re.IGNORECASE)
+    result = {}
+    for field, value in values.items():
+        result[EXTRACTORS[field].result_key] = sorted(value) if isinstance(value, set) else value
+    result.update({
+        "filename": filepath.replace("\\", "/").split("/")[-1],
+        "status": "success",
+        "error": "",
+        "Tiempos": timings,
+    })
+    return result
 
-    fechas.extend(re.findall(r"\b(?:\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4}|\d{4}[/\-]\d{1,2}[/\-]\d{1,2})\b", content))
 
-    # --- Lugares/Ciudades ---
-    ciudades_comunes = [
-        "New York", "Chicago", "Los Angeles", "San Francisco", "Boston",
-        "Minneapolis", "Detroit", "Miami", "Stockholm", "Göteborg", "Malmö",
-        "Uppsala", "Lund", "Karlstad", "Örebro", "Västerås", "Linköping"
-    ]
-    ciudades_regex = r'\b(?:' + '|'.join(re.escape(city) for city in ciudades_comunes) + r')\b'
-    lugares = re.findall(ciudades_regex, content)
+class ExtractorTimings:
+    """Tiempo acumulado por extractor (lo suma el servidor con los "Tiempos" de cada archivo)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seconds = collections.Counter()
+        self._calls = collections.Counter()
 
-    # --- Conteo de palabras ---
-    palabras = re.findall(r'\b\w+\b', content)
-    num_palabras = len(palabras)
+    def add(self, timings: dict):
+        with self._lock:
+            for field, seconds in timings.items():
+                self._seconds[field] += seconds
+                self._calls[field] += 1
 
-    # --- Debug ---
-    # print(f"[DEBUG] Procesado: {filepath}")
-    # print(f"[DEBUG] Nombres: {nombres}")
-    # print(f"[DEBUG] Fechas: {fechas}")
-    # print(f"[DEBUG] Lugares: {lugares}")
-    # print(f"[DEBUG] Palabras: {num_palabras}")
-
-    return {
-        "Nombres": sorted(set(nombres)) if nombres else [],
-        "Fechas": sorted(set(fechas)) if fechas else [],
-        "Lugares": sorted(set(lugares)) if lugares else [],
-        "ConteoPalabras": num_palabras,
-        "filename": filepath.replace("\\", "/").split("/")[-1],
-        "status": "success",
-        "error": ""
-    }
+    def stats(self) -> dict:
+        """Campo -> {"seconds", "calls", "share"}, de mayor a menor tiempo."""
+        with self._lock:
+            total = sum(self._seconds.values())
+            return {
+                field: {"seconds": seconds, "calls": self._calls[field],
+                        "share": seconds / total if total else 0.0}
+                for field, seconds in self._seconds.most_common()
+            }
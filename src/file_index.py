@@ -0,0 +1,226 @@
+# src/file_index.py
+
+"""
+Índice en memoria de los archivos de un directorio (nombre, tamaño, mtime).
+
+Se construye una vez al arrancar con `os.scandir` y luego lo mantiene al día un
+hilo en segundo plano:
+
+- 'inotify' (Linux): el kernel avisa de cada archivo creado, modificado, movido
+  o borrado, y solo se vuelve a hacer `stat` de ese archivo. Se usa vía ctypes,
+  sin dependencias externas.
+- 'polling' (resto de sistemas, o si inotify falla): cada `poll_interval`
+  segundos se recorre el directorio y se compara contra el índice.
+
+Así `trigger` y `PROCESS_FILES` no listan el directorio ni hacen un `stat`
+por archivo en cada llamada.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import threading
+import time
+
+# Constantes de <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+INOTIFY_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len (seguido del nombre)
+
+
+def _load_inotify():
+    """Devuelve la libc con inotify, o None si no está disponible."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1  # Verificar que existan los símbolos
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class FileIndex:
+    """Nombre -> (tamaño, mtime_ns) de los archivos de `directory` que terminan en `suffix`."""
+    def __init__(self, directory: str, suffix: str = '.txt', poll_interval: float = 2.0):
+        self.directory = directory
+        self.suffix = suffix
+        self.poll_interval = poll_interval
+        self.backend = None
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple] = {}
+        self._sorted_names = None  # Caché de `files()`; se invalida con cada cambio
+        self._thread = None
+        self.updates = 0
+        self.rescans = 0
+        self.last_change = None
+
+    # --- Consulta ---
+    def files(self) -> list:
+        """Nombres indexados, ordenados."""
+        with self._lock:
+            if self._sorted_names is None:
+                self._sorted_names = sorted(self._entries)
+            return list(self._sorted_names)
+
+    def entries(self) -> list:
+        """Lista de `(nombre, tamaño, mtime_ns)`, ordenada por nombre."""
+        with self._lock:
+            return [(name, *self._entries[name]) for name in sorted(self._entries)]
+
+    def get(self, name: str):
+        """`(tamaño, mtime_ns)` de `name`, o None si no está indexado."""
+        with self._lock:
+            return self._entries.get(name)
+
+    def __contains__(self, name) -> bool:
+        with self._lock:
+            return name in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "files": len(self._entries),
+                "bytes": sum(size for size, _ in self._entries.values()),
+                "updates": self.updates,
+                "rescans": self.rescans,
+                "last_change": self.last_change,
+            }
+
+    # --- Mantenimiento ---
+    def _scan(self) -> dict:
+        entries = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(self.suffix):
+                    continue
+                try:
+                    if entry.is_file():
+                        st = entry.stat()
+                        entries[entry.name] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    continue # Borrado entre el listado y el stat
+        return entries
+
+    def rescan(self):
+        """Recorre el directorio completo y reemplaza el índice si algo cambió."""
+        entries = self._scan()
+        with self._lock:
+            self.rescans += 1
+            if entries != self._entries:
+                self._entries = entries
+                self._sorted_names = None
+                self.updates += 1
+                self.last_change = time.time()
+
+    def _refresh(self, name: str):
+        """Vuelve a hacer stat de un solo archivo tras un aviso de inotify."""
+        if not name.endswith(self.suffix):
+            return
+        path = os.path.join(self.directory, name)
+        try:
+            st = os.stat(path)
+            value = (st.st_size, st.st_mtime_ns) if os.path.isfile(path) else None
+        except OSError:
+            value = None
+        with self._lock:
+            if self._entries.get(name) == value:
+                return
+            if value is None:
+                del self._entries[name]
+            else:
+                self._entries[name] = value
+            self._sorted_names = None
+            self.updates += 1
+            self.last_change = time.time()
+
+    def start(self):
+        """Construye el índice y lanza el hilo que lo mantiene al día."""
+        if self._thread is not None:
+            return
+        inotify_fd = self._open_inotify()
+        # Primero el watch y luego el recorrido: un cambio durante el recorrido
+        # genera un evento y no se pierde.
+        self.rescan()
+        if inotify_fd is not None:
+            self.backend = 'inotify'
+            target, args = self._inotify_loop, (inotify_fd,)
+        else:
+            self.backend = 'polling'
+            target, args = self._poll_loop, ()
+        self._thread = threading.Thread(target=target, args=args, daemon=True)
+        self._thread.start()
+
+    def _open_inotify(self):
+        libc = _load_inotify()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(IN_CLOEXEC)
+        if fd < 0:
+            return None
+        wd = libc.inotify_add_watch(fd, os.fsencode(self.directory), WATCH_MASK)
+        if wd < 0:
+            os.close(fd)
+            return None
+        return fd
+
+    def _inotify_loop(self, fd):
+        while True:
+            try:
+                data = os.read(fd, 64 * 1024)
+            except OSError:
+                break
+            offset = 0
+            changed = set()
+            overflow = watch_gone = False
+            while offset + INOTIFY_EVENT.size <= len(data):
+                _wd, mask, _cookie, name_len = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = data[offset:offset + name_len].rstrip(b'\0')
+                offset += name_len
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    watch_gone = True
+                elif name:
+                    changed.add(os.fsdecode(name))
+            if overflow:
+                self.rescan() # Se perdieron eventos: recorrido completo
+            else:
+                for name in changed:
+                    self._refresh(name)
+            if watch_gone:
+                break
+        # El directorio desapareció o se movió: seguir por sondeo
+        os.close(fd)
+        self.backend = 'polling'
+        self._poll_loop()
+
+    def _poll_loop(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.rescan()
+            except OSError:
+                continue # Directorio inaccesible por ahora; reintentar
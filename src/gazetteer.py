@@ -0,0 +1,171 @@
+# src/gazetteer.py
+
+"""
+Gazetteer de lugares con búsqueda Aho-Corasick.
+
+Un gazetteer es una lista de nombres (ciudades, regiones...) que se buscan tal
+cual en el texto. Con una alternación de regex, compilar y buscar cuesta más
+cuanto más larga es la lista. Aquí se arma una sola vez un autómata
+Aho-Corasick, y la búsqueda recorre el texto una vez: cuesta según el largo del
+texto y no según la cantidad de nombres.
+
+El autómata no avanza por caracteres sino por palabras (corridas de \w). El
+texto se parte una sola vez con `split_words` y, como una palabra nunca se
+corta, un nombre solo puede coincidir con palabras completas: "Lund" no aparece
+en "Lundberg" (los mismos límites que \b...\b). Lo que hay entre las palabras
+de un nombre ("Los Angeles", "Saint-Denis") se compara exacto solo cuando el
+autómata ya encontró un candidato, así que "Los Angeles" no coincide con
+"Los  Angeles". Recorrer palabras en vez de caracteres son además unas cinco
+veces menos pasos en Python.
+
+Si dos nombres se solapan ("York" y "New York"), gana el que empieza antes y,
+entre los que empiezan igual, el más largo; las coincidencias no se solapan.
+
+Formato del archivo: UTF-8, un nombre por línea. Las líneas vacías y las que
+empiezan con '#' se ignoran.
+"""
+
+import hashlib
+import re
+
+WORD_SPLIT_RE = re.compile(r'(\w+)')
+
+
+def split_words(text: str) -> list:
+    """
+    `[separador, palabra, separador, ..., palabra, separador]`: las palabras
+    quedan en los índices impares y `len(partes) // 2` es la cantidad de palabras.
+    """
+    return WORD_SPLIT_RE.split(text)
+
+
+def read_gazetteer_file(path: str) -> list:
+    """Nombres de un archivo de gazetteer, en el orden del archivo y sin repetidos."""
+    names = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            name = line.strip()
+            if name and not name.startswith('#'):
+                names[name] = None
+    return list(names)
+
+
+class Gazetteer:
+    """Autómata Aho-Corasick sobre palabras. Se construye una vez y es de solo lectura."""
+    def __init__(self, names):
+        self.names = list(dict.fromkeys(n.strip() for n in names if n and n.strip()))
+        # Nodo 0 = raíz. _goto[nodo]: palabra -> nodo hijo; _fail[nodo]: enlace de fallo;
+        # _out[nodo]: entradas que terminan en el nodo, más largas primero. Cada entrada es
+        # (palabras, nombre, separadores internos, prefijo no-palabra, sufijo no-palabra).
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for name in self.names:
+            self._add(name)
+        self._build_failure_links()
+
+    @classmethod
+    def from_file(cls, path: str) -> 'Gazetteer':
+        return cls(read_gazetteer_file(path))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash corto del contenido; cambia si cambia la lista (sirve para invalidar cachés)."""
+        digest = hashlib.sha1('\n'.join(sorted(self.names)).encode('utf-8'))
+        return digest.hexdigest()[:12]
+
+    def stats(self) -> dict:
+        return {"names": len(self.names), "nodes": len(self._goto)}
+
+    # --- Construcción ---
+    def _add(self, name: str):
+        parts = split_words(name)
+        words = parts[1::2]
+        if not words:
+            return  # Sin ninguna palabra no hay límites que respetar; se ignora
+        node = 0
+        for word in words:
+            child = self._goto[node].get(word)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][word] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = child
+        entry = (len(words), name, tuple(parts[2:-1:2]), parts[0], parts[-1])
+        self._out[node] = tuple(sorted(self._out[node] + (entry,), reverse=True))
+
+    def _build_failure_links(self):
+        """Recorrido en anchura: el fallo de un nodo es el sufijo propio más largo que está en el trie."""
+        queue = list(self._goto[0].values())
+        for node in queue:  # La lista crece mientras se recorre
+            for word, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(word, 0)
+                self._fail[child] = target if target != child else 0
+                if self._out[self._fail[child]]:
+                    self._out[child] = tuple(sorted(
+                        self._out[child] + self._out[self._fail[child]], reverse=True))
+
+    # --- Búsqueda ---
+    def finditer_parts(self, parts: list):
+        """
+        Genera `(inicio, fin, nombre)` de todas las coincidencias en `parts`
+        (salida de `split_words`); inicio y fin son índices de palabra, fin exclusivo.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        root = goto[0]
+        state = 0
+        for i, word in enumerate(parts[1::2]):
+            if state == 0:
+                # Camino rápido: la mayoría de las palabras no empiezan ningún nombre
+                state = root.get(word, 0)
+                if state == 0:
+                    continue
+            else:
+                while True:
+                    nxt = goto[state].get(word)
+                    if nxt is not None:
+                        state = nxt
+                        break
+                    if state == 0:
+                        break
+                    state = fail[state]
+            for length, name, gaps, lead, trail in out[state]:
+                start = i + 1 - length
+                # Separadores exactos entre palabras y alrededor del nombre
+                if length > 1 and tuple(parts[2 * start + 2:2 * i + 1:2]) != gaps:
+                    continue
+                if lead and not parts[2 * start].endswith(lead):
+                    continue
+                if trail and not parts[2 * i + 2].startswith(trail):
+                    continue
+                yield start, i + 1, name
+
+    def find_parts(self, parts: list, start: int = 0) -> list:
+        """
+        `(inicio, fin, nombre)` sin solapamientos (el más a la izquierda y más largo
+        gana), considerando solo coincidencias que empiezan en la palabra `start` o después.
+        """
+        candidates = sorted(self.finditer_parts(parts), key=lambda m: (m[0], -m[1]))
+        found = []
+        last_end = start
+        for match in candidates:
+            if match[0] >= last_end:
+                found.append(match)
+                last_end = match[1]
+        return found
+
+    def findall_parts(self, parts: list) -> list:
+        """Nombres encontrados, sin solapamientos (el más a la izquierda y más largo gana)."""
+        return [name for _start, _end, name in self.find_parts(parts)]
+
+    def findall(self, text: str) -> list:
+        return self.findall_parts(split_words(text))
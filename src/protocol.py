@@ -0,0 +1,361 @@
+# src/protocol.py
+
+"""
+Codificación de los mensajes entre servidor y clientes.
+
+Hay dos formatos de transporte ("framings"):
+
+- 'line': un objeto JSON en UTF-8 terminado en '\\n'. Es el formato original y
+  el que usa toda conexión al empezar.
+- 'frame': cabecera de 5 bytes (longitud del cuerpo como entero big-endian de
+  4 bytes + 1 byte de flags) seguida del cuerpo codificado con el codec acordado.
+  No hay que buscar '\\n' ni decodificar texto para saber dónde acaba un mensaje.
+
+Compresión: en 'frame', un cuerpo de al menos `COMPRESSION_THRESHOLD` bytes se
+comprime con zlib o lzma (si así se acordó y el resultado es más chico) y el
+byte de flags indica el algoritmo. El receptor descomprime sin que la capa de
+arriba se entere.
+
+Negociación: el WELCOME (siempre en 'line') anuncia `PROTOCOL_CAPABILITIES`. Un
+cliente que quiera otro formato envía HELLO {"framing": ..., "codec": ...} y desde
+el byte siguiente al HELLO ya escribe en el formato pedido. El HELLO puede incluir
+"compression": "zlib" | "lzma" (solo con framing 'frame'). El servidor responde
+ACK_HELLO todavía en 'line' y a partir de ahí envía en el formato acordado. Un
+cliente que nunca envía HELLO sigue en 'line' con JSON, como antes.
+
+El codec acordado es el de los mensajes del servidor. El cliente escribe sus
+frames siempre en `CLIENT_CODEC` (JSON): `marshal.loads` no es seguro ante
+datos maliciosos (una entrada armada a propósito puede tirar el proceso), así
+que el servidor nunca decodifica marshal de un socket.
+"""
+
+import json
+import lzma
+import marshal
+import struct
+import threading
+import zlib
+
+FRAME_HEADER = struct.Struct('!IB')  # Longitud del cuerpo, flags
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024  # Límite de un mensaje (línea o frame) recibido
+MARSHAL_VERSION = 4                  # Formato fijo: ambos extremos deben poder leerlo
+MAX_NESTING = 64                     # Profundidad máxima aceptada por el codec marshal
+
+FRAMINGS = ('line', 'frame')
+CLIENT_CODEC = 'json'  # Codec de lo que envía el cliente, sea cual sea el acordado
+
+COMPRESSION_THRESHOLD = 16 * 1024    # Cuerpos más chicos se envían sin comprimir
+FLAG_ZLIB = 0x01
+FLAG_LZMA = 0x02
+COMPRESSION_FLAGS = {'zlib': FLAG_ZLIB, 'lzma': FLAG_LZMA}
+
+
+class ProtocolError(ValueError):
+    """Mensaje mal formado. La conexión puede seguir leyendo el siguiente mensaje."""
+
+
+class MessageTooLarge(ProtocolError):
+    """El mensaje supera el límite; el flujo ya no es confiable y hay que cerrar."""
+
+
+_PLAIN_SCALARS = frozenset((str, int, float, bool, type(None)))
+
+
+def _check_plain(obj):
+    """
+    Verifica que `obj` solo contenga tipos del modelo de datos JSON.
+
+    marshal puede reconstruir objetos de código y otros tipos internos; lo que
+    llega por el codec 'marshal' solo se acepta si contiene dict (con claves
+    str), list, tuple, str, int, float, bool y None. Recorrido iterativo con
+    `type(...)` exacto: es la parte cara de decodificar con marshal.
+    """
+    stack = [(obj, 0)]
+    while stack:
+        current, depth = stack.pop()
+        kind = type(current)
+        if kind in _PLAIN_SCALARS:
+            continue
+        if depth > MAX_NESTING:
+            raise ProtocolError("Mensaje demasiado anidado.")
+        if kind is dict:
+            for key in current:
+                if type(key) is not str:
+                    raise ProtocolError(f"Clave no permitida: {type(key).__name__}")
+            children = current.values()
+        elif kind is list or kind is tuple:
+            children = current
+        else:
+            raise ProtocolError(f"Tipo no permitido: {kind.__name__}")
+        for child in children:
+            if type(child) not in _PLAIN_SCALARS:
+                stack.append((child, depth + 1))
+
+
+class JsonCodec:
+    name = 'json'
+
+    def encode(self, obj) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, data) -> dict:
+        try:
+            return json.loads(bytes(data).decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ProtocolError(f"JSON inválido: {e}") from e
+
+
+class MarshalCodec:
+    """
+    marshal restringido a tipos JSON: mucho más rápido que json en CPython.
+
+    Solo para mensajes del servidor al cliente (ver `CLIENT_CODEC`).
+    """
+    name = 'marshal'
+
+    def encode(self, obj) -> bytes:
+        # Lo que se envía lo arma el propio programa; solo se valida al recibir
+        return marshal.dumps(obj, MARSHAL_VERSION)
+
+    def decode(self, data) -> dict:
+        try:
+            obj = marshal.loads(data)
+        except (EOFError, ValueError, TypeError) as e:
+            raise ProtocolError(f"marshal inválido: {e}") from e
+        _check_plain(obj)
+        return obj
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), MarshalCodec())}
+
+
+def _compress_zlib(body):
+    return zlib.compress(body, 6)
+
+
+def _compress_lzma(body):
+    # preset 1: bastante más rápido que el 6 por defecto y casi la misma razón en texto
+    return lzma.compress(body, preset=1)
+
+
+def _decompress_zlib(body, max_size):
+    decompressor = zlib.decompressobj()
+    data = decompressor.decompress(body, max_size + 1)
+    if len(data) > max_size or decompressor.unconsumed_tail:
+        raise MessageTooLarge("Mensaje descomprimido mayor que el máximo permitido.")
+    return data
+
+
+def _decompress_lzma(body, max_size):
+    decompressor = lzma.LZMADecompressor()
+    data = decompressor.decompress(body, max_length=max_size + 1)
+    if len(data) > max_size:
+        raise MessageTooLarge("Mensaje descomprimido mayor que el máximo permitido.")
+    return data
+
+
+COMPRESSORS = {'zlib': _compress_zlib, 'lzma': _compress_lzma}
+DECOMPRESSORS = {FLAG_ZLIB: _decompress_zlib, FLAG_LZMA: _decompress_lzma}
+
+# Lo que el servidor anuncia en el WELCOME
+PROTOCOL_CAPABILITIES = {
+    "framings": list(FRAMINGS),
+    "codecs": list(CODECS),
+    "compression": list(COMPRESSORS),
+    "compression_threshold": COMPRESSION_THRESHOLD,
+}
+
+
+def encode_message(message, framing='line', codec='json', flags=0) -> bytes:
+    """Serializa `message` listo para `sendall` (sin comprimir)."""
+    if framing == 'line':
+        return (json.dumps(message) + "\n").encode('utf-8')
+    body = CODECS[codec].encode(message)
+    return FRAME_HEADER.pack(len(body), flags) + body
+
+
+def negotiate(requested: dict) -> tuple:
+    """
+    Valida el payload de un HELLO y devuelve `(framing, codec, compression)`.
+
+    `compression` es None si no se pidió.
+
+    Raises:
+        ProtocolError: Si pide un framing, codec o compresión que no existe.
+    """
+    if not isinstance(requested, dict):
+        raise ProtocolError("HELLO sin payload.")
+    framing = requested.get('framing', 'line')
+    codec = requested.get('codec', 'json')
+    if framing not in FRAMINGS:
+        raise ProtocolError(f"Framing no soportado: {framing}")
+    if codec not in CODECS:
+        raise ProtocolError(f"Codec no soportado: {codec}")
+    if framing == 'line' and codec != 'json':
+        raise ProtocolError("El framing 'line' solo admite el codec 'json'.")
+    compression = requested.get('compression')
+    if compression is not None:
+        if compression not in COMPRESSORS:
+            raise ProtocolError(f"Compresión no soportada: {compression}")
+        if framing != 'frame':
+            raise ProtocolError("La compresión requiere el framing 'frame'.")
+    return framing, codec, compression
+
+
+def choose_protocol(capabilities: dict, preferred=(('frame', 'marshal'), ('frame', 'json'))):
+    """Lado cliente: primera combinación de `preferred` que el servidor anuncia, o None."""
+    if not isinstance(capabilities, dict):
+        return None
+    framings = capabilities.get('framings', [])
+    codecs = capabilities.get('codecs', [])
+    for framing, codec in preferred:
+        if framing in framings and codec in codecs and codec in CODECS:
+            return framing, codec
+    return None
+
+
+def choose_compression(capabilities: dict, preferred=('zlib', 'lzma')):
+    """Lado cliente: primer algoritmo de `preferred` que el servidor anuncia, o None."""
+    if not isinstance(capabilities, dict):
+        return None
+    offered = capabilities.get('compression', [])
+    for name in preferred:
+        if name in offered and name in COMPRESSORS:
+            return name
+    return None
+
+
+class CompressionStats:
+    """Totales de compresión por algoritmo (thread-safe), para la consola."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}  # algoritmo -> [mensajes, bytes originales, bytes enviados]
+
+    def record(self, algorithm, raw_size, wire_size):
+        with self._lock:
+            totals = self._totals.setdefault(algorithm, [0, 0, 0])
+            totals[0] += 1
+            totals[1] += raw_size
+            totals[2] += wire_size
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [
+                {"algorithm": algorithm, "messages": messages,
+                 "raw_bytes": raw, "wire_bytes": wire,
+                 "ratio": raw / wire if wire else 0.0}
+                for algorithm, (messages, raw, wire) in sorted(self._totals.items())
+            ]
+
+
+class MessageDecoder:
+    """
+    Separa los mensajes de un flujo de bytes, en 'line' o en 'frame'.
+
+    Los bytes recibidos se acumulan en un `bytearray` y se avanza un índice de
+    lectura en lugar de volver a partir el buffer entero tras cada `recv`. Los
+    mensajes se extraen de a uno con `next_message()`, así un HELLO puede
+    cambiar el formato (`switch`) antes de decodificar los bytes que le siguen.
+    """
+    def __init__(self, framing='line', codec='json', max_message_size=MAX_MESSAGE_SIZE):
+        self.max_message_size = max_message_size
+        self._buffer = bytearray()
+        self._pos = 0          # Inicio del próximo mensaje sin leer
+        self._scan_from = 0    # Hasta dónde ya se buscó '\n' sin encontrarlo
+        self.switch(framing, codec)
+
+    def switch(self, framing, codec='json'):
+        self.framing = framing
+        self.codec = CODECS[codec]
+        self._scan_from = self._pos
+
+    def feed(self, data):
+        # Compactar aquí (una vez por recv) y no en cada mensaje extraído
+        if self._pos:
+            del self._buffer[:self._pos]
+            self._scan_from -= self._pos
+            self._pos = 0
+        self._buffer += data
+
+    def next_message(self):
+        """
+        Devuelve el siguiente mensaje completo, o None si faltan bytes.
+
+        Raises:
+            ProtocolError: El mensaje no se pudo decodificar (ya se descartó).
+            MessageTooLarge: El mensaje excede `max_message_size`.
+        """
+        if self.framing == 'line':
+            return self._next_line()
+        return self._next_frame()
+
+    def _next_line(self):
+        while True:
+            end = self._buffer.find(b'\n', self._scan_from)
+            if end == -1:
+                self._scan_from = len(self._buffer)
+                if self._scan_from - self._pos > self.max_message_size:
+                    raise MessageTooLarge("Línea mayor que el máximo permitido.")
+                return None
+            start, self._pos = self._pos, end + 1
+            self._scan_from = self._pos
+            line = bytes(self._buffer[start:end]).strip()
+            if line:
+                # Una línea es siempre JSON, sea cual sea el codec acordado
+                return CODECS['json'].decode(line)
+
+    def _next_frame(self):
+        available = len(self._buffer) - self._pos
+        if available < FRAME_HEADER.size:
+            return None
+        length, flags = FRAME_HEADER.unpack_from(self._buffer, self._pos)
+        if length > self.max_message_size:
+            raise MessageTooLarge(f"Frame de {length} bytes mayor que el máximo permitido.")
+        if available < FRAME_HEADER.size + length:
+            return None
+        start = self._pos + FRAME_HEADER.size
+        self._pos = self._scan_from = start + length
+        body = bytes(self._buffer[start:self._pos])
+        if flags:
+            decompress = DECOMPRESSORS.get(flags)
+            if decompress is None:
+                raise ProtocolError(f"Flags de frame desconocidos: {flags:#04x}")
+            try:
+                body = decompress(body, self.max_message_size)
+            except (zlib.error, lzma.LZMAError) as e:
+                raise ProtocolError(f"Cuerpo comprimido inválido: {e}") from e
+        return self.codec.decode(body)
+
+
+class ConnectionProtocol:
+    """
+    Formato acordado con un cliente concreto, con su lock de envío.
+
+    El lock serializa los `sendall` de los distintos hilos que escriben a la
+    misma conexión (hilo del cliente, lotes del despachador, consola) y hace
+    atómico el cambio de formato tras el ACK_HELLO.
+    """
+    def __init__(self, max_message_size=MAX_MESSAGE_SIZE,
+                 compress_threshold=COMPRESSION_THRESHOLD):
+        self.framing = 'line'
+        self.codec = 'json'
+        self.compression = None
+        self.compress_threshold = compress_threshold
+        # (algoritmo, bytes originales, bytes enviados) del último encode comprimido;
+        # se lee con send_lock tomado, justo después de `encode`.
+        self.last_compression = None
+        self.send_lock = threading.Lock()
+        self.decoder = MessageDecoder(max_message_size=max_message_size)
+
+    def encode(self, message) -> bytes:
+        self.last_compression = None
+        if self.framing == 'line':
+            return encode_message(message, self.framing, self.codec)
+        body = CODECS[self.codec].encode(message)
+        flags = 0
+        if self.compression and len(body) >= self.compress_threshold:
+            compressed = COMPRESSORS[self.compression](body)
+            if len(compressed) < len(body):
+                self.last_compression = (self.compression, len(body), len(compressed))
+                body, flags = compressed, COMPRESSION_FLAGS[self.compression]
+        return FRAME_HEADER.pack(len(body), flags) + body
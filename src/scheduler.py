@@ -7,21 +7,182 @@ Cada algoritmo debe poder decidir qué proceso(s) de la cola 'Ready'
 deberían ejecutarse a continuación, basándose en sus propias reglas.
 """
 
-from typing import List, Optional
+import heapq
+import itertools
+from collections import deque
+from typing import Callable, Iterator, List, Optional, Union
 # Asumiendo que process.py está en el mismo directorio (src/)
 from .process import Process
 
+# --- Colas Ready ---
+class ReadyQueue:
+    """
+    Cola Ready propia de un scheduler (ver `SchedulerBase.new_ready_queue`).
+
+    Además de push/pop admite lo que se usaba de la lista original (`append`,
+    `clear`, `len`, iteración, valor de verdad), así que puede reemplazarla donde
+    se usaba una lista.
+    """
+    def push(self, process: Process):
+        raise NotImplementedError
+
+    def pop(self) -> Optional[Process]:
+        """Quita y devuelve el siguiente proceso según la política de la cola, o None si está vacía."""
+        raise NotImplementedError
+
+    def peek(self) -> Optional[Process]:
+        """El proceso que devolvería `pop`, sin quitarlo."""
+        raise NotImplementedError
+
+    def remove(self, process: Process) -> bool:
+        raise NotImplementedError
+
+    def update(self, process: Process):
+        """Reubica `process` si cambió su clave (p. ej. remaining_burst_time en SRTF)."""
+
+    def clear(self):
+        raise NotImplementedError
+
+    def append(self, process: Process):
+        self.push(process)
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __iter__(self) -> Iterator[Process]:
+        raise NotImplementedError
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+
+class FifoReadyQueue(ReadyQueue):
+    """Cola FIFO sobre un deque: push y pop en O(1)."""
+    def __init__(self):
+        self._queue = deque()
+
+    def push(self, process: Process):
+        self._queue.append(process)
+
+    def pop(self) -> Optional[Process]:
+        return self._queue.popleft() if self._queue else None
+
+    def peek(self) -> Optional[Process]:
+        return self._queue[0] if self._queue else None
+
+    def remove(self, process: Process) -> bool:
+        try:
+            self._queue.remove(process)
+        except ValueError:
+            return False
+        return True
+
+    def clear(self):
+        self._queue.clear()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __iter__(self) -> Iterator[Process]:
+        return iter(self._queue)
+
+
+class HeapReadyQueue(ReadyQueue):
+    """
+    Cola de prioridad sobre un heap: push y pop en O(log n), menor `key` primero.
+
+    Los empates salen en orden de llegada a la cola, igual que con `sort` estable
+    sobre una lista. `remove` y `update` marcan la entrada vieja como borrada
+    (se descarta al llegar al tope) y el heap se compacta si acumula demasiadas.
+    """
+    def __init__(self, key: Callable[[Process], tuple]):
+        self.key = key
+        self._heap = []
+        self._entries = {}  # id(proceso) -> [clave, orden, proceso]; proceso None = borrada
+        self._order = itertools.count()
+
+    def push(self, process: Process, _order: Optional[int] = None):
+        if id(process) in self._entries:
+            self.update(process)
+            return
+        entry = [self.key(process), next(self._order) if _order is None else _order, process]
+        self._entries[id(process)] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _discard_removed(self):
+        heap = self._heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+
+    def pop(self) -> Optional[Process]:
+        self._discard_removed()
+        if not self._heap:
+            return None
+        process = heapq.heappop(self._heap)[2]
+        del self._entries[id(process)]
+        return process
+
+    def peek(self) -> Optional[Process]:
+        self._discard_removed()
+        return self._heap[0][2] if self._heap else None
+
+    def remove(self, process: Process) -> bool:
+        entry = self._entries.pop(id(process), None)
+        if entry is None:
+            return False
+        entry[2] = None
+        if len(self._heap) > 2 * len(self._entries) + 16:
+            self._heap = [e for e in self._heap if e[2] is not None]
+            heapq.heapify(self._heap)
+        return True
+
+    def update(self, process: Process):
+        entry = self._entries.get(id(process))
+        if entry is None or entry[0] == self.key(process):
+            return
+        self.remove(process)
+        self.push(process, _order=entry[1])  # Conserva su lugar entre empates
+
+    def clear(self):
+        self._heap.clear()
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Process]:
+        """En orden de llegada a la cola (no de prioridad)."""
+        return (entry[2] for entry in list(self._entries.values()))
+
+
 # --- Clase Base (Opcional pero útil para definir interfaz) ---
 class SchedulerBase:
-    """Clase base abstracta para los schedulers (opcional)."""
-    def schedule(self, ready_queue: List[Process], current_time: int, running_processes: List[Process], available_threads: int) -> Optional[Process]:
+    """
+    Clase base de los schedulers.
+
+    Cada scheduler define `key` (menor clave = se ejecuta primero; None = FIFO)
+    y crea su propia cola con `new_ready_queue()`; `preemptive` indica al motor
+    de simulación (`sim_engine`) si debe desalojar. `schedule` acepta esa cola
+    (O(log n) por selección) o, por compatibilidad, una lista común.
+    """
+    key: Optional[Callable[[Process], tuple]] = None
+    preemptive = False  # True: el motor desaloja al que está en ejecución si llega uno con mejor clave
+
+    def new_ready_queue(self) -> ReadyQueue:
+        """Cola Ready con el respaldo adecuado para este algoritmo (heap o deque)."""
+        if self.key is None:
+            return FifoReadyQueue()
+        return HeapReadyQueue(self.key)
+
+    def schedule(self, ready_queue: Union[ReadyQueue, List[Process]], current_time: int, running_processes: List[Process], available_threads: int) -> Optional[Process]:
         """
         Selecciona el siguiente proceso a ejecutar desde la cola Ready.
 
         Args:
-            ready_queue (List[Process]): La lista de procesos en estado Ready.
-                                         IMPORTANTE: Esta lista PUEDE ser modificada por el método
-                                         (ej. si el scheduler saca el proceso seleccionado).
+            ready_queue (ReadyQueue | List[Process]): Los procesos en estado Ready.
+                                         IMPORTANTE: el proceso seleccionado se quita de la cola.
+                                         Con una lista se busca en una sola pasada (O(n));
+                                         con la cola de `new_ready_queue` cuesta O(log n).
             current_time (int): El tiempo actual de la simulación.
             running_processes (List[Process]): Lista de procesos actualmente en ejecución.
             available_threads (int): Número de 'CPUs' o 'threads' simulados que están libres.
@@ -32,7 +193,15 @@ class SchedulerBase:
                                Nota: Devuelve solo UN proceso. El bucle principal llamará
                                de nuevo si hay más threads libres.
         """
-        raise NotImplementedError("El método 'schedule' debe ser implementado por las subclases.")
+        if not ready_queue:
+            return None
+        if isinstance(ready_queue, ReadyQueue):
+            return ready_queue.pop()
+        # Lista (interfaz original): el primero con menor clave, como sort estable + pop(0)
+        if self.key is None:
+            return ready_queue.pop(0)
+        selected = min(ready_queue, key=self.key)
+        return ready_queue.pop(ready_queue.index(selected))
 
     def __str__(self):
         return self.__class__.__name__ # Devuelve el nombre de la clase como representación
@@ -40,88 +209,42 @@ class SchedulerBase:
 # --- Implementaciones Específicas de Algoritmos ---
 
 class SchedulerFCFS(SchedulerBase):
-    """Algoritmo de Scheduling First-Come, First-Served (FCFS)."""
-    def schedule(self, ready_queue: List[Process], current_time: int, running_processes: List[Process], available_threads: int) -> Optional[Process]:
-        """
-        Selecciona el proceso que llegó primero a la cola Ready.
-
-        Args:
-            ready_queue: Lista de procesos Ready. Se modificará si se selecciona un proceso.
-            current_time: Tiempo actual (no usado directamente por FCFS simple).
-            running_processes: Procesos en ejecución (no usado por FCFS simple).
-            available_threads: Threads libres (implícitamente > 0 si se llama a este método).
-
-        Returns:
-            El proceso con el menor `arrival_time` en la `ready_queue`, o None si está vacía.
-        """
-        if not ready_queue:
-            return None
+    """
+    Algoritmo de Scheduling First-Come, First-Served (FCFS).
 
-        # Encuentra el proceso con el menor tiempo de llegada
-        # Si hay empates, se podría desempatar por PID, pero FCFS puro no lo requiere.
-        # Python min() es estable, así que si ya estaban ordenados por llegada, mantendrá el orden relativo.
-        # O podemos ordenar explícitamente para asegurarnos:
-        ready_queue.sort(key=lambda p: p.arrival_time)
+    Selecciona el proceso con el menor `arrival_time`; los empates, en orden de
+    llegada a la cola.
+    """
+    key = staticmethod(lambda p: (p.arrival_time,))
 
-        # Seleccionar y quitar el primero de la cola
-        process_to_run = ready_queue.pop(0)
-        return process_to_run
 
 class SchedulerSJF(SchedulerBase):
     """
     Algoritmo de Scheduling Shortest Job First (SJF) - Versión No Preemptiva.
     (Shortest Remaining Time First - SRTF - sería la versión preemptiva).
-    """
-    def schedule(self, ready_queue: List[Process], current_time: int, running_processes: List[Process], available_threads: int) -> Optional[Process]:
-        """
-        Selecciona el proceso en la cola Ready con el menor `burst_time` total.
 
-        Args:
-            ready_queue: Lista de procesos Ready. Se modificará si se selecciona un proceso.
-            current_time: Tiempo actual (no usado por SJF No Preemptivo).
-            running_processes: Procesos en ejecución (no usado por SJF No Preemptivo).
-            available_threads: Threads libres.
-
-        Returns:
-            El proceso con el menor `burst_time` en la `ready_queue`, o None si está vacía.
-        """
-        if not ready_queue:
-            return None
-
-        ready_queue.sort(key=lambda p: (p.burst_time, p.arrival_time))
-        return ready_queue.pop(0)
+    Selecciona el proceso con el menor `burst_time` total; desempata por `arrival_time`.
+    """
+    key = staticmethod(lambda p: (p.burst_time, p.arrival_time))
 
 
 class SchedulerSRTF(SchedulerBase):
     """
     Algoritmo de Scheduling Shortest Remaining Time First (SRTF) - Versión Preemptiva de SJF.
-    """
-    def schedule(self, ready_queue: List[Process], current_time: int, running_processes: List[Process], available_threads: int) -> Optional[Process]:
-        """
-        Selecciona el proceso en la cola Ready con el menor tiempo de ráfaga restante (remaining_burst_time).
-        Si hay empate, desempata por arrival_time.
-
-        Args:
-            ready_queue: Lista de procesos Ready. Se modificará si se selecciona un proceso.
-            current_time: Tiempo actual.
-            running_processes: Procesos en ejecución.
-            available_threads: Threads libres.
-
-        Returns:
-            El proceso con el menor remaining_burst_time en la ready_queue, o None si está vacía.
-        """
-        if not ready_queue:
-            return None
 
-        # Ordena por remaining_burst_time y luego por arrival_time para desempatar
-        ready_queue.sort(key=lambda p: (p.remaining_burst_time, p.arrival_time))
-        return ready_queue.pop(0)
+    Selecciona el proceso con el menor `remaining_burst_time`; desempata por
+    `arrival_time`. Si cambia el tiempo restante de un proceso que está en la
+    cola, hay que avisar con `ready_queue.update(proceso)`.
+    """
+    key = staticmethod(lambda p: (p.remaining_burst_time, p.arrival_time))
+    preemptive = True
 
 
 class SchedulerRR(SchedulerBase):
     """
     Algoritmo de Scheduling Round Robin (RR).
-    Requiere un Quantum (timeslice).
+    Requiere un Quantum (timeslice). La cola Ready es FIFO: los procesos que
+    agotan su quantum o llegan nuevos se añaden al final.
     """
     def __init__(self, quantum: int = 2):
         """
@@ -137,32 +260,18 @@ class SchedulerRR(SchedulerBase):
         # de vuelta a Ready generalmente se hace en el bucle principal de la simulación,
         # no dentro del método schedule directamente.
 
-    def schedule(self, ready_queue: List[Process], current_time: int, running_processes: List[Process], available_threads: int) -> Optional[Process]:
-        """
-        Selecciona el siguiente proceso de la cola Ready (tratada como FIFO).
-
-        Args:
-            ready_queue: Lista de procesos Ready. Se asume que los procesos que
-                         expiraron su quantum o llegaron nuevos se añaden al final.
-                         Se modificará si se selecciona un proceso.
-            current_time: Tiempo actual.
-            running_processes: Procesos en ejecución.
-            available_threads: Threads libres.
-
-        Returns:
-            El primer proceso en la `ready_queue`, o None si está vacía.
-        """
-        if not ready_queue:
-            return None
-
-        return ready_queue.pop(0)
-
     def __str__(self):
         return f"{self.__class__.__name__}(Quantum={self.quantum})"
 
 
 class SchedulerHRRN(SchedulerBase):
-    """High Response Ratio Next (HRRN) Scheduler."""
+    """
+    High Response Ratio Next (HRRN) Scheduler.
+
+    El response ratio de todos los procesos cambia con el tiempo, así que no hay
+    una clave fija para un heap: se recorre la cola (O(n)) y se quita el de mayor
+    ratio. En la cola propia (FIFO) los empates se resuelven por orden de llegada.
+    """
     def schedule(self, ready_queue, current_time, running_processes, available_threads):
         if not ready_queue:
             return None
@@ -173,25 +282,24 @@ class SchedulerHRRN(SchedulerBase):
             response_ratio = (wait_time + process.burst_time) / process.burst_time
             process.response_ratio = response_ratio
 
-        # Ordenar por mayor Response Ratio
-        ready_queue.sort(key=lambda p: p.response_ratio, reverse=True)
+        if not isinstance(ready_queue, ReadyQueue):
+            # Lista (interfaz original): el orden que deja el sort decide los empates
+            # de las llamadas siguientes, así que se conserva tal cual
+            ready_queue.sort(key=lambda p: p.response_ratio, reverse=True)
+            return ready_queue.pop(0)
 
-        # Seleccionar el proceso con mayor Response Ratio
-        selected_process = ready_queue.pop(0)
+        # Seleccionar el proceso con mayor Response Ratio (el primero, si hay empate)
+        selected_process = max(ready_queue, key=lambda p: p.response_ratio)
+        ready_queue.remove(selected_process)
         return selected_process
     def __str__(self):
         return "SchedulerHRRN"
 
 class SchedulerPriorityNP(SchedulerBase):
-    """Scheduler de Prioridad No Preemptiva (menor número = mayor prioridad)."""
-    def schedule(self, ready_queue, current_time, running_processes, available_threads):
-        if not ready_queue:
-            return None
-        # Selecciona el de mayor prioridad (menor número), desempata por llegada
-        ready_queue.sort(key=lambda p: (p.priority, p.arrival_time))
-        return ready_queue.pop(0)
-    
-    
+    """Scheduler de Prioridad No Preemptiva (menor número = mayor prioridad); desempata por llegada."""
+    key = staticmethod(lambda p: (p.priority, p.arrival_time))
+
+
 # --- Diccionario para acceder fácilmente a los schedulers por nombre ---
 AVAILABLE_SCHEDULERS = {
     "FCFS": SchedulerFCFS,
@@ -2,16 +2,26 @@
 
 import socket
 import threading
-import json
+import asyncio
 import os
 import collections
-import concurrent.futures
 import time
 import re
 import math
 import sys # Para sys.stdout.flush()
+import select
 import logging
-from .extractor_regex import parse_file_regex as parse_file
+from .extractor_regex import (parse_file_regex as parse_file, EXTRACTOR_VERSION,
+                              EXTRACTORS, DEFAULT_FIELDS, resolve_fields, ExtractorTimings)
+from .worker_pools import WorkerPoolManager, TaskTimedOut, TaskFailed
+from .batch_dispatcher import BatchDispatcher
+from . import protocol
+from .extraction_cache import ExtractionCache
+from .corpus_index import CorpusIndex, INDEXED_FIELDS
+from .sketches import CorpusSummary, resolve_summary_config, SUMMARY_FIELDS
+from .file_index import FileIndex
+from . import distribution
+from . import shm_transport
 
 # --- Configuración del Logger ---
 LOG_FILENAME = 'server_processing.log'
@@ -25,6 +35,14 @@ logging.basicConfig(
 # --- Configuración ---
 HOST = '127.0.0.1'
 PORT = 65432
+LISTEN_BACKLOG = 1024  # Conexiones pendientes de accept(); el modo asyncio puede recibir miles
+# Modo del núcleo de red: 'threads' (un hilo por cliente) o 'asyncio' (un solo event loop).
+# Se activa con: python -m src.server --async
+SERVER_CORE = 'asyncio' if '--async' in sys.argv else 'threads'
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024  # Tamaño máximo de un mensaje recibido (línea o frame)
+RECV_BUFFER_SIZE = 65536
+FILE_INDEX_POLL_INTERVAL = 2.0  # Segundos entre recorridos si no hay inotify
+DEFAULT_DISTRIBUTION = 'size'  # Reparto de archivos en trigger: 'count' o 'size' (LPT por bytes y workers)
 import os
 
 TEXT_FILES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'text_files'))
@@ -41,11 +59,22 @@ if not os.path.isdir(TEXT_FILES_DIR):
 else:
     print(f"[DEBUG] Carpeta ya existe.")
 
-# Ahora sí, carga los archivos
-text_files = [f for f in os.listdir(TEXT_FILES_DIR) if f.endswith('.txt')]
-print(f"[DEBUG] Archivos encontrados: {text_files}")
-
-DEFAULT_CLIENT_CONFIG = {'mode': 'threads', 'count': 1}
+# Índice en memoria de los .txt; un hilo lo mantiene al día (inotify o sondeo)
+file_index = FileIndex(TEXT_FILES_DIR, suffix='.txt', poll_interval=FILE_INDEX_POLL_INTERVAL)
+file_index.start()
+print(f"[DEBUG] Archivos encontrados: {len(file_index)} (índice: {file_index.backend})")
+
+# fields=None: los campos por defecto del extractor (DEFAULT_FIELDS)
+DEFAULT_CLIENT_CONFIG = {'mode': 'threads', 'count': 1, 'weight': 1, 'stream': False,
+                         'fields': None, 'summary': None}
+POOL_IDLE_TIMEOUT = 300  # Segundos sin uso antes de cerrar un pool de workers
+BATCH_WORKER_BUDGET = os.cpu_count() or 4  # Workers simultáneos entre todos los lotes
+BATCH_FAIR_SHARE = 'client'  # Reparto justo entre lotes en espera: por 'client' o por 'event'
+EXTRACTION_CACHE_PATH = 'extraction_cache.db'  # None desactiva la caché de extracción
+EXTRACTION_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Límite de la caché; se descartan las entradas LRU
+FILE_TIMEOUT_SECONDS = 60  # Límite por archivo (una tarea con N archivos: N veces); None = sin límite
+DEFAULT_QUERY_PAGE_SIZE = 100  # Archivos por página de QUERY si el cliente no indica 'limit'
+RESULT_TRANSPORT = 'shm'  # 'forks': resultados por memoria compartida ('shm') o por la tubería ('pipe')
 
 # --- Estado del Servidor (Protegido por Locks) ---
 state_lock = threading.Lock()
@@ -54,11 +83,28 @@ client_configs: dict = {}
 client_queues: dict[str, collections.deque] = {}
 clients: dict = {}
 client_ids: dict = {}  # Mapeo socket -> ID del cliente
+client_protocols: dict = {}  # Mapeo socket -> protocol.ConnectionProtocol (formato acordado)
+compression_stats = protocol.CompressionStats()
+extractor_timings = ExtractorTimings()  # Segundos por extractor, sumados de todos los lotes
+# Se crea antes de los pools: los procesos 'forks' la heredan y abren su propia conexión
+extraction_cache = (
+    ExtractionCache(EXTRACTION_CACHE_PATH, EXTRACTOR_VERSION, EXTRACTION_CACHE_MAX_BYTES)
+    if EXTRACTION_CACHE_PATH else None
+)
+# Término -> archivos; lo actualiza cada resultado entregado y lo consulta QUERY
+corpus_index = CorpusIndex(version_of=file_index.get)
+if extraction_cache:
+    for _path, _key, _result in extraction_cache.entries():
+        if file_index.get(os.path.basename(_path)) == _key and _result.get("status") == "success":
+            corpus_index.update(os.path.basename(_path), _key, {
+                f: _result[EXTRACTORS[f].result_key]
+                for f in INDEXED_FIELDS if EXTRACTORS[f].result_key in _result
+            })
+    print(f"[DEBUG] Índice del corpus: {corpus_index.stats()['files']} archivos desde la caché")
 next_client_id = 1  # ID para el próximo cliente que se conecte
 
-processing_lock = threading.Lock()
-client_batch_processing_queue = collections.deque()
-new_batch_event = threading.Event()
+# Pools de workers persistentes (uno por modo), compartidos por todos los lotes
+worker_pools = WorkerPoolManager(idle_timeout=POOL_IDLE_TIMEOUT, max_workers=BATCH_WORKER_BUDGET)
 
 # --- Funciones auxiliares para manejo de clientes ---
 def get_client_id(client_socket):
@@ -112,8 +158,8 @@ def show_client_subscriptions():
 server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 server_socket.bind((HOST, PORT))
-server_socket.listen()
-print(f"Servidor escuchando en {HOST}:{PORT}")
+server_socket.listen(LISTEN_BACKLOG)
+print(f"Servidor escuchando en {HOST}:{PORT} (núcleo: {SERVER_CORE})")
 print(f"Buscando archivos de texto en: ./{TEXT_FILES_DIR}/")
 
 if not os.path.isdir(TEXT_FILES_DIR):
@@ -143,9 +189,25 @@ def send_to_client(client_socket, message):
         ).start()
         return
 
+    conn_protocol = client_protocols.get(client_socket)
+    if conn_protocol is None: # Aún no registrado o ya desconectado
+        conn_protocol = protocol.ConnectionProtocol()
+
     try:
-        payload = json.dumps(message) + "\n"
-        client_socket.sendall(payload.encode('utf-8'))
+        # Con el lock, los mensajes de distintos hilos no se intercalan en el socket
+        with conn_protocol.send_lock:
+            data = conn_protocol.encode(message)
+            compression_info = conn_protocol.last_compression
+            client_socket.sendall(data)
+
+        if compression_info:
+            algorithm, raw_size, wire_size = compression_info
+            compression_stats.record(algorithm, raw_size, wire_size)
+            server_log(
+                f"{message.get('type')} para cliente {client_ids.get(client_socket, '?')} "
+                f"comprimido con {algorithm}: {raw_size / 1024:.1f} KB -> "
+                f"{wire_size / 1024:.1f} KB ({raw_size / wire_size:.1f}x)"
+            )
 
     except (BrokenPipeError, ConnectionResetError):
         # No usar server_log aquí, ya que handle_disconnect lo hará
@@ -172,6 +234,7 @@ def handle_disconnect(client_socket):
             addr_disconnected = clients.pop(client_socket, None)
             client_id_disconnected = client_ids.pop(client_socket, None)
             client_configs.pop(client_socket, None)
+            client_protocols.pop(client_socket, None)
             processed_disconnect = True
 
             for event_name in list(events.keys()):
@@ -191,6 +254,14 @@ def handle_disconnect(client_socket):
                         print(f"\nError removiendo de cola '{event_name}': {e}")
         # else: El cliente ya fue procesado por otro hilo de desconexión
 
+    if processed_disconnect:
+        # Los lotes que aún esperaban turno ya no tienen a quién responder
+        for batch_args in batch_dispatcher.discard_owner(client_socket):
+            assigned_files = batch_args[1]
+            if isinstance(assigned_files, distribution.SharedFileQueue):
+                # Ese lote ya no va a tomar nada; la cola no debe esperarlo para terminar
+                assigned_files.detach()
+
     if processed_disconnect and addr_disconnected:
         server_log(f"Cliente {client_id_disconnected} ({addr_disconnected}) desconectado o removido.")
 
@@ -201,8 +272,56 @@ def handle_disconnect(client_socket):
         pass # El socket podría ya estar cerrado, es un error esperado
 
 
+def empty_client_data(fields) -> dict:
+    """`data` de un resultado con error: los campos pedidos, vacíos."""
+    return {EXTRACTORS[f].client_key: EXTRACTORS[f].empty for f in fields}
+
+
+def timeout_result(filepath, seconds, fields) -> dict:
+    """Resultado de un archivo cuya tarea superó el tiempo límite (el worker fue abandonado)."""
+    filename = os.path.basename(filepath)
+    server_log(f"Tiempo límite ({seconds:.0f}s) excedido procesando {filename}; resultado abandonado.")
+    return {
+        "pid_server": "N/A",
+        "filename": filename,
+        "data": empty_client_data(fields),
+        "status": "timeout",
+        "error": f"Tiempo límite de {seconds:.0f}s excedido."
+    }
+
+
+def pool_failure_result(filepath, error, fields) -> dict:
+    """Resultado de un archivo cuya tarea no se pudo correr porque el pool 'forks' murió."""
+    filename = os.path.basename(filepath)
+    server_log(f"El pool de workers se rompió procesando {filename}: {error!r}.")
+    return {
+        "pid_server": "N/A",
+        "filename": filename,
+        "data": empty_client_data(fields),
+        "status": "error",
+        "error": f"El pool de workers se rompió: {error}"
+    }
+
+
+def index_result(res_item: dict, version):
+    """
+    Actualiza el índice del corpus con un resultado exitoso (en el proceso
+    principal). `version` es el `(tamaño, mtime_ns)` que tenía el archivo al
+    extraerse: si cambió antes de la entrega, `CorpusIndex.query` lo descarta.
+    """
+    if version is None:
+        return  # No se pudo leer con stat: el archivo ya no está
+    name = res_item["filename"]
+    data = res_item.get("data") or {}
+    corpus_index.update(name, tuple(version), {
+        f: data[EXTRACTORS[f].client_key]
+        for f in INDEXED_FIELDS if EXTRACTORS[f].client_key in data
+    })
+
+
 def process_single_file_wrapper(arg_tuple):
-    filepath, processing_mode = arg_tuple
+    filepath, processing_mode, fields = arg_tuple
+    fields = fields or DEFAULT_FIELDS
     filename_base = os.path.basename(filepath)
 
     pid_label = ""
@@ -233,13 +352,44 @@ def process_single_file_wrapper(arg_tuple):
         # Tu función parse_file podría tener sus propios prints.
         # Si quieres que esos también vayan al log, necesitarías modificarla
         # para que acepte un logger o use el logger global.
-        raw_result_from_extractor = parse_file(filepath, pid=descriptive_worker_id)
-        
+        extractors = [EXTRACTORS[field] for field in fields]
+        cached_result, cache_key = (
+            extraction_cache.get(filepath, [e.result_key for e in extractors])
+            if extraction_cache else (None, None)
+        )
+        if not extraction_cache:
+            try:
+                st = os.stat(filepath)
+                cache_key = (st.st_size, st.st_mtime_ns)  # Sin caché, solo como versión
+            except OSError:
+                pass
+        # La entrada cacheada puede venir de un cliente que pidió otros campos
+        missing_fields = tuple(
+            e.field for e in extractors
+            if cached_result is None or e.result_key not in cached_result
+        )
+        extraction_timings = None
+        if not missing_fields:
+            raw_result_from_extractor = cached_result
+            logging.info(f"[{descriptive_worker_id}] Caché: acierto para {filename_base}")
+        else:
+            raw_result_from_extractor = parse_file(filepath, pid=descriptive_worker_id,
+                                                   fields=missing_fields)
+            extraction_timings = raw_result_from_extractor.pop("Tiempos", None)
+            if raw_result_from_extractor.get("status") == "success":
+                if cached_result is not None:
+                    # Mismo archivo y versión: se suman los campos recién extraídos
+                    raw_result_from_extractor = {**cached_result, **raw_result_from_extractor}
+                if extraction_cache:
+                    extraction_cache.put(filepath, cache_key, raw_result_from_extractor)
+
         # Ejemplo de log de detalles del extractor al ARCHIVO DE LOG
-        logging.info(f"[{descriptive_worker_id}] Datos extraídos de {filename_base}: "
-                     f"Emails: {len(raw_result_from_extractor.get('Emails', []))}, "
-                     f"Fechas: {len(raw_result_from_extractor.get('Fechas', []))}, "
-                     f"Palabras: {raw_result_from_extractor.get('ConteoPalabras', 0)}")
+        counts = ", ".join(
+            f"{e.result_key}: {len(value) if isinstance(value, list) else value}"
+            for e in extractors
+            for value in (raw_result_from_extractor.get(e.result_key, e.empty),)
+        )
+        logging.info(f"[{descriptive_worker_id}] Datos extraídos de {filename_base}: {counts}")
 
 
         status_from_extractor = raw_result_from_extractor.get("status",
@@ -256,19 +406,24 @@ def process_single_file_wrapper(arg_tuple):
             # --- Fin mensaje de fin a CONSOLA ---
             logging.info(f"[{descriptive_worker_id}] Finalizado procesamiento de {final_filename} con ÉXITO.")
 
+            # Solo los campos pedidos, con las claves que espera el cliente
             data_for_client = {
-                "emails_found": raw_result_from_extractor.get("Emails", []),
-                "dates_found": raw_result_from_extractor.get("Fechas", []),
-                "word_count": raw_result_from_extractor.get("ConteoPalabras", 0)
+                e.client_key: raw_result_from_extractor.get(e.result_key, e.empty)
+                for e in extractors
             }
-            
+
             final_result_for_server = {
                 "pid_server": descriptive_worker_id,
                 "filename": final_filename,
                 "data": data_for_client,
                 "status": "success",
-                "error": "" 
+                "error": ""
             }
+            if extraction_timings:
+                # Lo consume process_client_batch (estadísticas); no viaja al cliente
+                final_result_for_server["timings"] = extraction_timings
+            # Versión leída antes de extraer; la usa index_result y tampoco viaja al cliente
+            final_result_for_server["version"] = list(cache_key) if cache_key else None
         else: # Error ocurrió dentro de parse_file
             # --- Mensaje de fin a CONSOLA (con error del extractor) ---
             print(f"\n[{pid_label}: {worker_id_str}] Error durante extracción para {final_filename} (ver log).")
@@ -279,7 +434,7 @@ def process_single_file_wrapper(arg_tuple):
             final_result_for_server = {
                 "pid_server": descriptive_worker_id,
                 "filename": final_filename,
-                "data": {"emails_found": [], "dates_found": [], "word_count": 0},
+                "data": empty_client_data(fields),
                 "status": "error",
                 "error": error_from_extractor
             }
@@ -297,138 +452,333 @@ def process_single_file_wrapper(arg_tuple):
         return {
             "pid_server": descriptive_worker_id,
             "filename": filename_base,
-            "data": {"emails_found": [], "dates_found": [], "word_count": 0},
+            "data": empty_client_data(fields),
             "status": "error",
             "error": f"Error inesperado en wrapper: {str(e)}"
         }
 
-def manage_client_batch_processing():
-    """
-    Hilo trabajador que toma lotes de client_batch_processing_queue
-    y los procesa uno a la vez.
+def process_file_batch_wrapper(arg_tuple):
     """
-    while True:
-        new_batch_event.wait()
-
-        client_socket, assigned_files, event_name, config = (None,) * 4
-
-        with state_lock:
-            if client_batch_processing_queue:
-                item = client_batch_processing_queue.popleft()
-                client_socket, assigned_files, event_name, config = item
-            else:
-                new_batch_event.clear()
-                continue
-
-        client_addr_log, is_client_valid = "Dirección Desconocida", False
-        with state_lock:
-            if client_socket in clients:
-                client_addr_log = str(clients[client_socket])
-                is_client_valid = True
-            else:
-                server_log(
-                    f"Cliente para lote de '{event_name}' ya no conectado. Lote descartado."
-                )
+    Procesa varios archivos en una sola tarea del pool. Devuelve
+    `(resultados, resumen)`: los resultados en el mismo orden, cada uno con la
+    forma de `process_single_file_wrapper`, y el resumen parcial de la tarea
+    (`CorpusSummary.to_dict`) si el cliente pidió 'summary', o None.
 
-        if not is_client_valid or not assigned_files:
+    En modo 'forks' amortiza el pickle y el viaje por las colas del pool entre
+    todos los archivos de la tarea (ver `distribution.task_batches`).
+    """
+    filepaths, processing_mode, fields, summary_config = arg_tuple
+    results = [process_single_file_wrapper((filepath, processing_mode, fields))
+               for filepath in filepaths]
+    if not summary_config:
+        return results, None
+    summary = CorpusSummary.from_config(summary_config)
+    words_key = EXTRACTORS['palabras'].client_key
+    for res_item in results:
+        if res_item.get("status") != "success":
             continue
+        data = res_item["data"]
+        summary.add_file({f: data[EXTRACTORS[f].client_key]
+                          for f in SUMMARY_FIELDS if EXTRACTORS[f].client_key in data},
+                         data.get(words_key, 0))
+        if not summary_config['per_file']:
+            res_item["data"] = {}  # Solo el resumen: no viajan las listas de cada archivo
+    return results, summary.to_dict()
 
-        with processing_lock:
-            start_time_batch = time.time()
-            results = []
-            # Para almacenar los PIDs/IDs de los workers que participaron en este lote
-            worker_identifiers_used = set() # Usamos un set para evitar duplicados
 
-            try:
-                send_to_client(client_socket, {
-                    "type": "START_PROCESSING",
-                    "payload": {"event": event_name, "files": assigned_files}
-                })
+def process_file_batch_shm(arg_tuple):
+    """Como `process_file_batch_wrapper`, pero devuelve un handle de `shm_transport`."""
+    return shm_transport.pack_results(process_file_batch_wrapper(arg_tuple))
 
-                num_workers = config.get('count', DEFAULT_CLIENT_CONFIG['count'])
-                processing_mode = config.get('mode', DEFAULT_CLIENT_CONFIG['mode'])
-                if num_workers < 1:
-                    num_workers = 1
 
-                full_paths = [
-                    os.path.join(TEXT_FILES_DIR, f) for f in assigned_files
-                ]
+def process_client_batch(client_socket, assigned_files, event_name, config, announce=True):
+    """
+    Procesa un lote de archivos para un cliente usando su configuración.
 
-                executor_cls = None
-                if processing_mode == 'threads':
-                    executor_cls = concurrent.futures.ThreadPoolExecutor
-                elif processing_mode == 'forks':
-                    executor_cls = concurrent.futures.ProcessPoolExecutor
-                else:
-                    raise ValueError(f"Modo de proc. inválido: {processing_mode}")
-
-                with executor_cls(max_workers=num_workers) as executor:
-                    map_input = [(fp, processing_mode) for fp in full_paths]
-                    
-                    # executor.map devuelve un iterador. Lo convertimos a lista
-                    # para asegurar que todos los trabajos se completen antes de continuar.
-                    # Esto también nos permite acceder a los resultados para obtener los PIDs.
-                    map_results_list = list(executor.map(process_single_file_wrapper, map_input))
-                    
-                    results.extend(map_results_list)
-
-                    # Recopilar los PIDs/IDs de los workers de los resultados
-                    for res_item in map_results_list:
-                        if "pid_server" in res_item:
-                            worker_identifiers_used.add(res_item["pid_server"])
-
-
-                duration = time.time() - start_time_batch
-                server_log( # ESTA ES LA LÍNEA QUE MENCIONASTE
-                    f"Lote para {client_addr_log} ({event_name}) "
-                    f"completado en {duration:.2f}s."
-                )
+    La llama `batch_dispatcher` desde un hilo propio, así que pueden correr varios
+    lotes a la vez (dentro de BATCH_WORKER_BUDGET). Con `announce=False` no se
+    envía START_PROCESSING (caso de PROCESS_FILES, donde el cliente ya sabe
+    qué archivos pidió).
 
-                # --- IMPRIMIR LOS WORKERS UTILIZADOS ---
-                if worker_identifiers_used:
-                    # El log ya imprime una nueva línea antes.
-                    # Ajustamos el mensaje para que sea más legible.
-                    # server_log(f"    Workers utilizados para este lote: {sorted(list(worker_identifiers_used))}")
-                    print(f"    Workers utilizados para este lote ({processing_mode}):")
-                    for worker_id_str in sorted(list(worker_identifiers_used)):
-                        print(f"      - {worker_id_str}")
-                    sys.stdout.flush() # Asegurar que se imprima
-                # --- FIN DE IMPRIMIR WORKERS ---
+    `assigned_files` es una lista de nombres o, en un trigger con reparto
+    'steal', la `SharedFileQueue` del trigger: el lote va tomando archivos de
+    ella a medida que sus workers se liberan.
+    """
+    client_addr_log, is_client_valid = "Dirección Desconocida", False
+    with state_lock:
+        if client_socket in clients:
+            client_addr_log = str(clients[client_socket])
+            is_client_valid = True
+        else:
+            server_log(
+                f"Cliente para lote de '{event_name}' ya no conectado. Lote descartado."
+            )
+
+    shared_queue = (assigned_files
+                    if isinstance(assigned_files, distribution.SharedFileQueue) else None)
+    if not is_client_valid or (shared_queue is None and not assigned_files):
+        if shared_queue is not None:
+            shared_queue.detach()  # Este lote no va a tomar nada; los demás siguen
+        return
 
+    start_time_batch = time.time()
+    results = []
+    # 'steal': archivos que este lote tomó de la cola (en orden de índice) e índices entregados
+    taken_files = []
+    delivered_indexes = set()
+    client_id = get_client_id(client_socket)  # Antes de que una desconexión lo borre
+    # Para almacenar los PIDs/IDs de los workers que participaron en este lote
+    worker_identifiers_used = set() # Usamos un set para evitar duplicados
 
+    try:
+        if announce:
+            start_payload = {"event": event_name, "files": assigned_files}
+            if shared_queue is not None:
+                # Los archivos de este cliente se conocen recién al procesarlos
+                start_payload = {"event": event_name, "files": [],
+                                 "distribution": "steal", "total": shared_queue.total}
+            send_to_client(client_socket, {
+                "type": "START_PROCESSING",
+                "payload": start_payload
+            })
+
+        num_workers = config.get('count', DEFAULT_CLIENT_CONFIG['count'])
+        processing_mode = config.get('mode', DEFAULT_CLIENT_CONFIG['mode'])
+        # Nunca más workers que el presupuesto global que reparte batch_dispatcher
+        num_workers = min(max(1, num_workers), BATCH_WORKER_BUDGET)
+
+        if shared_queue is not None:
+            def still_connected():
+                # Un cliente desconectado deja de tomar: lo que quede es para los demás
+                with state_lock:
+                    return client_socket in clients
+
+            # Generador: cada tanda se toma de la cola recién cuando hay un slot libre
+            file_chunks = shared_queue.iter_chunks(client_id, still_connected)
+            total_files = shared_queue.total # Total del trigger, no de este cliente
+        else:
+            if processing_mode == 'forks':
+                # Varios archivos chicos por tarea para amortizar el costo de IPC
+                sizes = [(file_index.get(f) or (0, 0))[0] for f in assigned_files]
+                file_chunks = [[assigned_files[i] for i in batch]
+                               for batch in distribution.task_batches(sizes, num_workers)]
+            else:
+                # Con hilos no hay IPC que amortizar: un archivo por tarea
+                file_chunks = [[f] for f in assigned_files]
+            total_files = len(assigned_files)
+
+        # Índice (dentro del lote) del primer archivo de cada tarea, en orden de envío
+        task_first_index = []
+
+        # 'steal' con hilos: cada tanda tomada de la cola se envía de a un archivo
+        split_chunks = shared_queue is not None and processing_mode != 'forks'
+
+        def task_input():
+            next_index = 0
+            for chunk in file_chunks:
+                if shared_queue is not None:
+                    # Toda la tanda cuenta como tomada: lo que no se llegue a enviar
+                    # tampoco se entrega, y el `finally` lo devuelve a la cola
+                    taken_files.extend(chunk)
+                for task in ([[f] for f in chunk] if split_chunks else [chunk]):
+                    task_first_index.append(next_index)
+                    next_index += len(task)
+                    yield ([os.path.join(TEXT_FILES_DIR, f) for f in task], processing_mode,
+                           fields, summary_config)
+
+        stream_results = config.get('stream', DEFAULT_CLIENT_CONFIG['stream'])
+        fields = config.get('fields') or DEFAULT_FIELDS
+        summary_config = config.get('summary')
+        # Memoria fija: se unen los resúmenes parciales de cada tarea
+        batch_summary = CorpusSummary.from_config(summary_config) if summary_config else None
+        failed_files = 0
+        processed_files = 0
+        timed_out_files = 0
+        indexed_results = []
+        use_shm = processing_mode == 'forks' and RESULT_TRANSPORT == 'shm'
+        if use_shm:
+            task_fn, on_abandoned = process_file_batch_shm, shm_transport.discard_results
+        else:
+            task_fn, on_abandoned = process_file_batch_wrapper, None
+
+        def task_seconds(task):
+            return FILE_TIMEOUT_SECONDS * len(task[0]) if FILE_TIMEOUT_SECONDS else None
+
+        def deliver(index, res_item):
+            nonlocal processed_files, failed_files, timed_out_files
+            processed_files += 1
+            if shared_queue is not None:
+                delivered_indexes.add(index)
+            timings = res_item.pop("timings", None)
+            if timings:
+                extractor_timings.add(timings)
+            version = res_item.pop("version", None)
+            if shared_queue is not None:
+                shared_queue.file_done()
+            if res_item.get("status") == "timeout":
+                timed_out_files += 1
+            elif "pid_server" in res_item:
+                worker_identifiers_used.add(res_item["pid_server"])
+            if res_item.get("status") != "success":
+                failed_files += 1
+            else:
+                index_result(res_item, version)
+            if stream_results:
+                # Un PROCESSING_RESULT por archivo apenas termina su tarea; el servidor no
+                # acumula la lista completa de resultados del lote.
                 send_to_client(client_socket, {
-                    "type": "PROCESSING_COMPLETE",
-                    "payload": {"event": event_name, "status": "success",
-                                "results": results, "duration_seconds": duration}
+                    "type": "PROCESSING_RESULT",
+                    "payload": {"event": event_name, "index": index,
+                                "total": total_files, "result": res_item}
                 })
+            else:
+                indexed_results.append((index, res_item))
+
+        def handle_task(first_index, task_results, retry):
+            if isinstance(task_results, TaskTimedOut):
+                paths = task_results.item[0]
+                if retry is not None and len(paths) > 1:
+                    # No se sabe cuál se trabó: se reintentan de a uno al final del lote
+                    retry.extend((first_index + offset, path) for offset, path in enumerate(paths))
+                    return
+                for offset, path in enumerate(paths):
+                    deliver(first_index + offset,
+                            timeout_result(path, task_results.seconds / len(paths), fields))
+                return
+            if isinstance(task_results, TaskFailed):
+                for offset, path in enumerate(task_results.item[0]):
+                    deliver(first_index + offset,
+                            pool_failure_result(path, task_results.error, fields))
+                return
+            if use_shm:
+                task_results = shm_transport.unpack_results(task_results)
+            task_results, partial_summary = task_results
+            if partial_summary is not None:
+                batch_summary.merge_dict(partial_summary)
+            for offset, res_item in enumerate(task_results):
+                deliver(first_index + offset, res_item)
+
+        # El pool es persistente; el lease limita este lote a sus num_workers slots
+        with worker_pools.lease(processing_mode, num_workers) as lease:
+            retry = []  # (índice, ruta) de archivos de tareas vencidas con varios archivos
+            for task_index, task_results in lease.imap_unordered(
+                    task_fn, task_input(), on_abandoned=on_abandoned, timeout=task_seconds):
+                handle_task(task_first_index[task_index], task_results, retry)
+            if retry:
+                server_log(f"Lote para {client_addr_log} ({event_name}): reintentando de a uno "
+                           f"{len(retry)} archivos de tareas que excedieron el tiempo límite.")
+                single_tasks = [([path], processing_mode, fields, summary_config)
+                                for _index, path in retry]
+                for retry_index, task_results in lease.imap_unordered(
+                        task_fn, single_tasks, on_abandoned=on_abandoned, timeout=task_seconds):
+                    handle_task(retry[retry_index][0], task_results, None)
+        # Sin streaming se responde en el orden del lote, como antes
+        indexed_results.sort(key=lambda item: item[0])
+        results.extend(res_item for _index, res_item in indexed_results)
+
+        duration = time.time() - start_time_batch
+        server_log(
+            f"Lote para {client_addr_log} ({event_name}) "
+            f"completado en {duration:.2f}s ({processed_files} archivos"
+            + (f", {timed_out_files} por tiempo límite" if timed_out_files else "") + ")."
+        )
 
-            except Exception as e:
-                server_log(f"Error en procesamiento de lote para {client_addr_log}: {e}")
-                try:
-                    send_to_client(client_socket, {
-                        "type": "PROCESSING_COMPLETE",
-                        "payload": {"event": event_name, "status": "failure",
-                                    "message": str(e), "results": []}
-                    })
-                except:
-                    pass
-            # El processing_lock se libera automáticamente
+        # --- IMPRIMIR LOS WORKERS UTILIZADOS ---
+        if worker_identifiers_used:
+            # El log ya imprime una nueva línea antes.
+            print(f"    Workers utilizados para este lote ({processing_mode}):")
+            for worker_id_str in sorted(list(worker_identifiers_used)):
+                print(f"      - {worker_id_str}")
+            sys.stdout.flush() # Asegurar que se imprima
+        # --- FIN DE IMPRIMIR WORKERS ---
+
+        complete_payload = {"event": event_name, "status": "success",
+                            "results": results, "duration_seconds": duration}
+        if batch_summary is not None:
+            complete_payload["summary"] = batch_summary.report(summary_config['terms'])
+        if stream_results:
+            # Resumen: los resultados ya viajaron en los PROCESSING_RESULT
+            complete_payload.update({"streamed": True, "total": processed_files,
+                                     "failed": failed_files})
+        send_to_client(client_socket, {
+            "type": "PROCESSING_COMPLETE",
+            "payload": complete_payload
+        })
 
-# --- Hilo Manejador de Cliente ---
-def handle_client(client_socket, addr):
-    """Maneja la comunicación con un cliente conectado."""
+    except Exception as e:
+        server_log(f"Error en procesamiento de lote para {client_addr_log}: {e}")
+        try:
+            send_to_client(client_socket, {
+                "type": "PROCESSING_COMPLETE",
+                "payload": {"event": event_name, "status": "failure",
+                            "message": str(e), "results": []}
+            })
+        except:
+            pass
+    finally:
+        if shared_queue is not None:
+            # Lo tomado y no entregado (lote cortado por un error) vuelve a la cola
+            undelivered = [name for index, name in enumerate(taken_files)
+                           if index not in delivered_indexes]
+            if undelivered:
+                server_log(f"Lote para {client_addr_log} ({event_name}): {len(undelivered)} "
+                           f"archivos sin entregar vuelven a la cola compartida.")
+            shared_queue.release(client_id, undelivered)
+            shared_queue.detach()
+
+
+def enqueue_client_batch(client_socket, assigned_files, event_name, config, announce=True):
+    """Entrega un lote al despachador, con el dueño y peso que marca BATCH_FAIR_SHARE."""
+    client_id = get_client_id(client_socket)
+    owner = event_name if BATCH_FAIR_SHARE == 'event' else client_socket
+    batch_dispatcher.submit(
+        owner,
+        cost=config.get('count', DEFAULT_CLIENT_CONFIG['count']),
+        weight=config.get('weight', 1),
+        args=(client_socket, assigned_files, event_name, config, announce),
+        label=(f"Cliente {client_id} / '{event_name}' (cola compartida)"
+               if isinstance(assigned_files, distribution.SharedFileQueue)
+               else f"Cliente {client_id} / '{event_name}' ({len(assigned_files)} archivos)")
+    )
+
+
+def log_steal_trigger_drained(event_name, shared_queue):
+    """Resumen de un trigger 'steal' cuando el último archivo de la cola terminó."""
+    per_client = ", ".join(
+        f"cliente {cid}: {count}" for cid, count in sorted(shared_queue.taken_by.items(),
+                                                           key=lambda kv: str(kv[0]))
+    )
+    server_log(
+        f"Trigger '{event_name}' (steal) completado: {shared_queue.total} archivos en "
+        f"{shared_queue.finished_at - shared_queue.started_at:.2f}s ({per_client})"
+        + (f"; {shared_queue.abandoned} sin procesar (ningún cliente pudo tomarlos)"
+           if shared_queue.abandoned else "") + "."
+    )
+
+
+# Despachador concurrente de lotes (reemplaza al antiguo processing_lock global)
+batch_dispatcher = BatchDispatcher(
+    process_client_batch, BATCH_WORKER_BUDGET,
+    on_error=lambda label, e: server_log(f"Error inesperado en lote {label}: {e}")
+)
+
+
+# --- Manejo de Mensajes de Cliente (común a ambos núcleos) ---
+def register_client(client_socket, addr):
+    """Registra un cliente recién conectado, le asigna ID y le envía el WELCOME."""
     global next_client_id
-    
-    # Asignar ID al cliente
-    client_id = next_client_id
-    next_client_id += 1
-    
+
     with state_lock:
+        # Asignar ID al cliente
+        client_id = next_client_id
+        next_client_id += 1
         clients[client_socket] = addr
         client_ids[client_socket] = client_id
         if client_socket not in client_configs:
             client_configs[client_socket] = DEFAULT_CLIENT_CONFIG.copy()
-    
+        # Umbral de compresión: el de protocol.COMPRESSION_THRESHOLD, que anuncia el WELCOME
+        client_protocols[client_socket] = protocol.ConnectionProtocol(MAX_MESSAGE_SIZE)
+
     server_log(f"Cliente {client_id} conectado desde {addr}")
 
     # Enviar mensaje de bienvenida con ID asignado
@@ -436,15 +786,247 @@ def handle_client(client_socket, addr):
         "type": "WELCOME",
         "payload": {
             "server_info": {"version": "1.0"},
-            "client_id": client_id
+            "client_id": client_id,
+            # Formatos que el cliente puede pedir con HELLO (ver protocol.py)
+            "protocol": protocol.PROTOCOL_CAPABILITIES
         }
     })
+    return client_id
+
+
+def handle_client_message(client_socket, client_id, addr, message):
+    """
+    Atiende un mensaje JSON ya decodificado de un cliente.
+
+    Lo usan tanto el hilo por cliente (`handle_client`) como el núcleo asyncio
+    (`handle_client_async`); `client_socket` puede ser un socket real o un
+    `AsyncClientConnection`, ya que aquí solo se usa a través de `send_to_client`
+    y como clave de las estructuras de estado.
+    """
+    command = message.get("type")
+    payload = message.get("payload")
 
-    buffer = ""
+    if command == "HELLO":
+        conn_protocol = client_protocols.get(client_socket)
+        try:
+            framing, codec, compression = protocol.negotiate(payload)
+        except protocol.ProtocolError as e:
+            send_to_client(client_socket, {
+                "type": "ACK_HELLO",
+                "payload": {"status": "error", "message": str(e),
+                            "framing": conn_protocol.framing if conn_protocol else "line",
+                            "codec": conn_protocol.codec if conn_protocol else "json"}
+            })
+            return
+        if conn_protocol is None:
+            return
+        # El cliente ya escribe en el framing nuevo desde el byte siguiente al HELLO,
+        # siempre en JSON: nunca se decodifica marshal recibido de un cliente
+        conn_protocol.decoder.switch(framing, protocol.CLIENT_CODEC)
+        with conn_protocol.send_lock:
+            # El ACK_HELLO viaja aún en el formato anterior; lo siguiente, en el nuevo
+            client_socket.sendall(conn_protocol.encode({
+                "type": "ACK_HELLO",
+                "payload": {"status": "success", "framing": framing, "codec": codec,
+                            "compression": compression}
+            }))
+            conn_protocol.framing, conn_protocol.codec = framing, codec
+            conn_protocol.compression = compression
+        server_log(
+            f"Cliente {client_id} usa framing '{framing}' con codec '{codec}'"
+            f" (compresión: {compression or 'ninguna'})."
+        )
+
+    elif command == "SET_CONFIG":
+        if (isinstance(payload, dict) and
+                'mode' in payload and 'count' in payload):
+            mode = payload['mode']
+            count = payload['count']
+            weight = payload.get('weight', 1)
+            stream = payload.get('stream', False)
+            try:
+                fields = payload.get('fields')
+                if fields is not None:
+                    fields = list(resolve_fields(fields))
+                summary = resolve_summary_config(payload.get('summary'))
+            except ValueError as e:
+                send_to_client(client_socket, {
+                    "type": "ACK_CONFIG",
+                    "payload": {"status": "error", "message": str(e)}
+                })
+                return
+            if (mode in ['threads', 'forks'] and
+                    isinstance(count, int) and count > 0 and
+                    isinstance(weight, (int, float)) and weight > 0 and
+                    isinstance(stream, bool)):
+                with state_lock:
+                    client_configs[client_socket] = {
+                        'mode': mode, 'count': count, 'weight': weight,
+                        'stream': stream, 'fields': fields, 'summary': summary
+                    }
+                cfg = client_configs[client_socket]
+                send_to_client(client_socket, {
+                    "type": "ACK_CONFIG",
+                    "payload": {"status": "success", "config": cfg}
+                })
+            else:
+                send_to_client(client_socket, {
+                    "type": "ACK_CONFIG",
+                    "payload": {"status": "error",
+                                "message": "Modo/cantidad/peso inválido."}
+                })
+        else:
+            send_to_client(client_socket, {
+                "type": "ACK_CONFIG",
+                "payload": {"status": "error",
+                            "message": "Payload SET_CONFIG inválido."}
+            })
+
+    elif command == "SUB":
+        event_name = payload
+        if isinstance(event_name, str) and event_name:
+            with state_lock:
+                if event_name not in events:
+                    events[event_name] = set()
+                events[event_name].add(client_socket)
+
+                if event_name not in client_queues:
+                    client_queues[event_name] = collections.deque()
+                if client_socket not in client_queues[event_name]:
+                    client_queues[event_name].append(client_socket)
+
+            # Mostrar mensaje de suscripción
+            server_log(f"Cliente {client_id} suscrito a evento '{event_name}'")
+            send_to_client(client_socket,
+                           {"type": "ACK_SUB", "payload": event_name})
+        else:
+            send_to_client(client_socket,
+                           {"type": "ERROR", "payload": "SUB inválido."})
+
+    elif command == "UNSUB":
+        event_name = payload
+        if isinstance(event_name, str) and event_name:
+            with state_lock:
+                if event_name in events:
+                    events[event_name].discard(client_socket)
+                if event_name in client_queues:
+                    new_q = collections.deque(
+                        [s for s in client_queues[event_name]
+                         if s != client_socket]
+                    )
+                    client_queues[event_name] = new_q
+
+            # Mostrar mensaje de desuscripción
+            server_log(f"Cliente {client_id} desuscrito de evento '{event_name}'")
+            send_to_client(client_socket,
+                           {"type": "ACK_UNSUB", "payload": event_name})
+        else:
+             send_to_client(client_socket,
+                            {"type": "ERROR", "payload": "UNSUB inválido."})
+
+    elif command == "PROCESS_FILES":
+        event_name = payload.get("event", "sin_evento")
+        files = payload.get("files", [])
+
+        if not files:
+            send_to_client(client_socket, {
+                "type": "PROCESSING_COMPLETE",
+                "payload": {
+                    "event": event_name,
+                    "status": "success",
+                    "message": "No files provided.",
+                    "results": []
+                }
+            })
+            return
+
+        valid_files = [f for f in files if isinstance(f, str) and f in file_index]
+        if not valid_files:
+            send_to_client(client_socket, {
+                "type": "PROCESSING_COMPLETE",
+                "payload": {
+                    "event": event_name,
+                    "status": "success",
+                    "message": "None of the requested files exist.",
+                    "results": []
+                }
+            })
+            return
+
+        with state_lock:
+            config = dict(client_configs.get(client_socket, DEFAULT_CLIENT_CONFIG))
+        if payload.get("fields") is not None:
+            # Campos solo para este pedido; la configuración del cliente no cambia
+            try:
+                config['fields'] = list(resolve_fields(payload["fields"]))
+            except ValueError as e:
+                send_to_client(client_socket, {
+                    "type": "PROCESSING_COMPLETE",
+                    "payload": {"event": event_name, "status": "failure",
+                                "message": str(e), "results": []}
+                })
+                return
+        # Pasa por el despachador como cualquier lote: respeta el presupuesto
+        # global y no bloquea al hilo/corrutina que lee los mensajes del cliente.
+        enqueue_client_batch(client_socket, valid_files, event_name, config, announce=False)
+
+    elif command == "QUERY":
+        if not isinstance(payload, dict):
+            send_to_client(client_socket, {
+                "type": "QUERY_RESULT",
+                "payload": {"status": "error", "message": "Payload QUERY inválido."}
+            })
+            return
+        try:
+            page = corpus_index.query(payload.get("all") or (), payload.get("any") or (),
+                                      offset=payload.get("offset", 0),
+                                      limit=payload.get("limit", DEFAULT_QUERY_PAGE_SIZE))
+        except (ValueError, TypeError) as e:
+            send_to_client(client_socket, {
+                "type": "QUERY_RESULT",
+                "payload": {"status": "error", "message": str(e)}
+            })
+            return
+        send_to_client(client_socket, {
+            "type": "QUERY_RESULT",
+            "payload": {"status": "success", **page}
+        })
+
+
+# --- Hilo Manejador de Cliente ---
+def dispatch_decoded_messages(client_socket, client_id, addr, decoder):
+    """
+    Atiende todos los mensajes completos que haya en `decoder`.
+
+    Se extraen de a uno porque un HELLO cambia el formato de los bytes que le
+    siguen. Devuelve False si el flujo quedó inservible y hay que cerrar.
+    """
+    while True:
+        try:
+            message = decoder.next_message()
+        except protocol.MessageTooLarge as e:
+            server_log(f"Mensaje demasiado grande de cliente {client_id} ({addr}): {e}")
+            return False
+        except protocol.ProtocolError as e:
+            server_log(f"Mensaje inválido de {addr}: {e}")
+            continue
+        if message is None:
+            return True
+        try:
+            handle_client_message(client_socket, client_id, addr, message)
+        except Exception as e:
+            server_log(f"Error procesando msg de {addr}: {e}")
+
+
+def handle_client(client_socket, addr):
+    """Maneja la comunicación con un cliente conectado."""
+    client_id = register_client(client_socket, addr)
+
+    decoder = client_protocols[client_socket].decoder
     try:
         while True:
             try:
-                data = client_socket.recv(4096)
+                data = client_socket.recv(RECV_BUFFER_SIZE)
             except ConnectionResetError:
                 server_log(f"Conexión reseteada por cliente {client_id} ({addr}).")
                 break
@@ -456,151 +1038,131 @@ def handle_client(client_socket, addr):
                 server_log(f"Cliente {client_id} ({addr}) cerró conexión.")
                 break
 
-            buffer += data.decode('utf-8')
+            decoder.feed(data)
+            if not dispatch_decoded_messages(client_socket, client_id, addr, decoder):
+                break
+    finally:
+        handle_disconnect(client_socket)
 
-            while '\n' in buffer:
-                message_str, buffer = buffer.split('\n', 1)
-                if not message_str.strip():
-                    continue
 
-                try:
-                    message = json.loads(message_str)
-                    command = message.get("type")
-                    payload = message.get("payload")
-
-                    if command == "SET_CONFIG":
-                        if (isinstance(payload, dict) and
-                                'mode' in payload and 'count' in payload):
-                            mode = payload['mode']
-                            count = payload['count']
-                            if (mode in ['threads', 'forks'] and
-                                    isinstance(count, int) and count > 0):
-                                with state_lock:
-                                    client_configs[client_socket] = {
-                                        'mode': mode, 'count': count
-                                    }
-                                cfg = client_configs[client_socket]
-                                send_to_client(client_socket, {
-                                    "type": "ACK_CONFIG",
-                                    "payload": {"status": "success", "config": cfg}
-                                })
-                            else:
-                                send_to_client(client_socket, {
-                                    "type": "ACK_CONFIG",
-                                    "payload": {"status": "error",
-                                                "message": "Modo/cantidad inválido."}
-                                })
-                        else:
-                            send_to_client(client_socket, {
-                                "type": "ACK_CONFIG",
-                                "payload": {"status": "error",
-                                            "message": "Payload SET_CONFIG inválido."}
-                            })
-
-                    elif command == "SUB":
-                        event_name = payload
-                        if isinstance(event_name, str) and event_name:
-                            with state_lock:
-                                if event_name not in events:
-                                    events[event_name] = set()
-                                events[event_name].add(client_socket)
-
-                                if event_name not in client_queues:
-                                    client_queues[event_name] = collections.deque()
-                                if client_socket not in client_queues[event_name]:
-                                    client_queues[event_name].append(client_socket)
-                            
-                            # Mostrar mensaje de suscripción
-                            server_log(f"Cliente {client_id} suscrito a evento '{event_name}'")
-                            send_to_client(client_socket,
-                                           {"type": "ACK_SUB", "payload": event_name})
-                        else:
-                            send_to_client(client_socket,
-                                           {"type": "ERROR", "payload": "SUB inválido."})
-
-                    elif command == "UNSUB":
-                        event_name = payload
-                        if isinstance(event_name, str) and event_name:
-                            with state_lock:
-                                if event_name in events:
-                                    events[event_name].discard(client_socket)
-                                if event_name in client_queues:
-                                    new_q = collections.deque(
-                                        [s for s in client_queues[event_name]
-                                         if s != client_socket]
-                                    )
-                                    client_queues[event_name] = new_q
-                            
-                            # Mostrar mensaje de desuscripción
-                            server_log(f"Cliente {client_id} desuscrito de evento '{event_name}'")
-                            send_to_client(client_socket,
-                                           {"type": "ACK_UNSUB", "payload": event_name})
-                        else:
-                             send_to_client(client_socket,
-                                            {"type": "ERROR", "payload": "UNSUB inválido."})
-
-                    elif command == "PROCESS_FILES":
-                        event_name = payload.get("event", "sin_evento")
-                        files = payload.get("files", [])
-
-                        if not files:
-                            send_to_client(client_socket, {
-                                "type": "PROCESSING_COMPLETE",
-                                "payload": {
-                                    "event": event_name,
-                                    "status": "success",
-                                    "message": "No files provided.",
-                                    "results": []
-                                }
-                            })
-                            continue
-
-                        try:
-                            full_paths = [
-                                os.path.join(TEXT_FILES_DIR, f) for f in files
-                                if os.path.isfile(os.path.join(TEXT_FILES_DIR, f))
-                            ]
-
-                            num_workers = client_configs.get(client_socket, {}).get('count', 2)
-                            mode = client_configs.get(client_socket, {}).get('mode', 'threads')
-
-                            executor_cls = (
-                                concurrent.futures.ThreadPoolExecutor
-                                if mode == 'threads'
-                                else concurrent.futures.ProcessPoolExecutor
-                            )
-
-                            with executor_cls(max_workers=num_workers) as executor:
-                                map_input = [(fp,) for fp in full_paths]
-                                map_results = list(executor.map(process_single_file_wrapper, map_input))
-
-                            send_to_client(client_socket, {
-                                "type": "PROCESSING_COMPLETE",
-                                "payload": {
-                                    "event": event_name,
-                                    "status": "success",
-                                    "results": map_results,
-                                    "duration_seconds": 0
-                                }
-                            })
-
-                        except Exception as e:
-                            send_to_client(client_socket, {
-                                "type": "PROCESSING_COMPLETE",
-                                "payload": {
-                                    "event": event_name,
-                                    "status": "failure",
-                                    "message": str(e),
-                                    "results": []
-                                }
-                            })
-
-                except json.JSONDecodeError:
-                    server_log(f"JSON inválido de {addr}: '{message_str}'")
-                except Exception as e:
-                    server_log(f"Error procesando msg de {addr}: {e}")
+# --- Núcleo asyncio (python -m src.server --async) ---
+class AsyncClientConnection:
+    """
+    Adapta una conexión de `asyncio.start_server` a la interfaz mínima de socket
+    (`sendall`, `fileno`, `close`) que usan `send_to_client` y `handle_disconnect`.
+
+    Los envíos pueden venir de cualquier hilo (p. ej. el hilo de lotes); se
+    encolan en el event loop con `call_soon_threadsafe` y una corrutina escritora
+    por conexión los vacía respetando el control de flujo (`drain`).
+    """
+    def __init__(self, writer, loop):
+        self.writer = writer
+        self.loop = loop
+        self.outgoing = asyncio.Queue()
+        self.closed = False
+        sock = writer.get_extra_info('socket')
+        self._fileno = sock.fileno() if sock is not None else 0
+
+    def fileno(self):
+        if self.closed or self.writer.is_closing():
+            return -1
+        return self._fileno
+
+    def sendall(self, data):
+        if self.closed:
+            raise BrokenPipeError("Conexión asyncio cerrada.")
+        self._call_in_loop(self.outgoing.put_nowait, data)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._call_in_loop(self.outgoing.put_nowait, None) # Sentinela para el escritor
+
+    def _call_in_loop(self, func, *args):
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self.loop:
+            func(*args)
+        else:
+            self.loop.call_soon_threadsafe(func, *args)
+
+    async def writer_loop(self):
+        """Corrutina escritora: envía los mensajes encolados hasta recibir el sentinela."""
+        try:
+            while True:
+                data = await self.outgoing.get()
+                if data is None:
+                    break
+                self.writer.write(data)
+                await self.writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.closed = True
+            self.writer.close()
+
+
+async def handle_client_async(reader, writer):
+    """Corrutina lectora por conexión; equivalente asíncrono de `handle_client`."""
+    loop = asyncio.get_running_loop()
+    addr = writer.get_extra_info('peername')
+    conn = AsyncClientConnection(writer, loop)
+    writer_task = loop.create_task(conn.writer_loop())
+    client_id = register_client(conn, addr)
+    decoder = client_protocols[conn].decoder
+
+    try:
+        while True:
+            try:
+                data = await reader.read(RECV_BUFFER_SIZE)
+            except (ConnectionError, OSError) as e:
+                server_log(f"Conexión perdida con cliente {client_id} ({addr}): {e}")
+                break
+
+            if not data:
+                server_log(f"Cliente {client_id} ({addr}) cerró conexión.")
+                break
+
+            # Ningún mensaje bloquea: PROCESS_FILES solo encola el lote en
+            # batch_dispatcher, que lo procesa en los pools de workers.
+            decoder.feed(data)
+            if not dispatch_decoded_messages(conn, client_id, addr, decoder):
+                break
     finally:
-        handle_disconnect(client_socket)
+        handle_disconnect(conn)
+        await writer_task
+
+
+async def serve_async():
+    """Atiende a todos los clientes desde un único event loop sobre `server_socket`."""
+    server = await asyncio.start_server(
+        handle_client_async, sock=server_socket
+    )
+    async with server:
+        await server.serve_forever()
+
+
+def read_console_line(prompt):
+    """
+    Equivalente a input() que no retiene el lock de sys.stdin mientras espera.
+
+    input() bloquea sosteniendo el lock interno de sys.stdin; un hijo creado con
+    fork en ese momento (ProcessPoolExecutor en modo 'forks') lo hereda tomado y
+    se queda colgado al cerrar su stdin. Esperando con select() hasta que haya
+    una línea, el lock solo se toma durante la lectura.
+    """
+    if os.name != 'posix':
+        return input(prompt)
+    sys.stdout.write(prompt)
+    sys.stdout.flush()
+    select.select([sys.stdin], [], [])
+    line = sys.stdin.readline()
+    if not line:
+        raise EOFError
+    return line
 
 
 def print_help():
@@ -608,10 +1170,15 @@ def print_help():
     print("  help                          - Muestra esta ayuda.")
     print("  add <nombre_evento>           - Crea un nuevo evento.")
     print("  remove <nombre_evento>        - Elimina un evento y su cola.")
-    print("  trigger <nombre_evento>       - Dispara un evento para los clientes en cola.")
+    print("  trigger <nombre_evento> [count|size|steal]")
+    print("                                - Dispara un evento para los clientes en cola.")
+    print("                                  count: mismo nro. de archivos por cliente;")
+    print("                                  size: por bytes y workers de cada cliente (def.);")
+    print("                                  steal: cola compartida, cada cliente toma al liberarse.")
     print("  list                          - Muestra estado de eventos, colas y clientes.")
     print("  clients                       - Muestra clientes y sus eventos suscritos.")
     print("  status                        - Muestra si el servidor está Ocupado o Idle.")
+    print("  invalidate [archivo]          - Vacía la caché de extracción (o solo ese archivo).")
     print("  exit                          - Cierra el servidor y notifica a los clientes.")
     print("-----------------------------\n")
 
@@ -622,9 +1189,9 @@ def server_commands():
 
     while True:
         try:
-            # El prompt se imprime por input(). Si un log interfiere,
+            # El prompt se imprime por read_console_line(). Si un log interfiere,
             # el usuario presiona Enter para "ver" el prompt de nuevo.
-            cmd_input = input("Server> ").strip()
+            cmd_input = read_console_line("Server> ").strip()
 
             if not cmd_input:
                 continue
@@ -692,20 +1259,89 @@ def server_commands():
                     print("-------------------------")
 
             elif command == "status":
-                is_worker_busy, q_len = False, 0
-                with state_lock:
-                    if client_batch_processing_queue:
-                        is_worker_busy = True
-                        q_len = len(client_batch_processing_queue)
-
-                if is_worker_busy or processing_lock.locked():
-                    print(f"Estado: Ocupado (Procesando o con {q_len} lotes en cola)")
+                dispatch = batch_dispatcher.stats()
+                if dispatch["running"] or dispatch["queued"]:
+                    print(f"Estado: Ocupado ({len(dispatch['running'])} lotes en ejecución, "
+                          f"{len(dispatch['queued'])} en cola)")
                 else:
                     print("Estado: Idle")
+                print(f"Workers en uso: {dispatch['workers_in_use']}/{dispatch['worker_budget']} "
+                      f"(reparto justo por {BATCH_FAIR_SHARE}; "
+                      f"{dispatch['batches_completed']} lotes completados)")
+
+                print("\nLotes en ejecución:")
+                if not dispatch["running"]: print("  (Ninguno)")
+                for b in dispatch["running"]:
+                    print(f"- {b['label']}: {b['workers']} workers, "
+                          f"{b['elapsed_seconds']:.1f}s en ejecución")
+
+                print("\nLotes en cola:")
+                if not dispatch["queued"]: print("  (Ninguno)")
+                for b in dispatch["queued"]:
+                    print(f"- {b['label']}: pide {b['workers']} workers, "
+                          f"esperando {b['waiting_seconds']:.1f}s")
+
+                pool_stats = worker_pools.stats()
+                print("\nPools de workers:")
+                if not pool_stats: print("  (Ninguno activo)")
+                for ps in pool_stats:
+                    print(f"- {ps['mode']}: {ps['workers']} workers, "
+                          f"{ps['in_flight']} tareas en vuelo, {ps['leases']} lotes usándolo, "
+                          f"{ps['tasks_completed']} tareas completadas, "
+                          f"inactivo hace {ps['idle_seconds']:.0f}s "
+                          f"(pools creados: {ps['pools_created']}, "
+                          f"reciclados por tiempo límite: {ps['recycled']})")
+
+                index = file_index.stats()
+                print(f"\nÍndice de archivos ({index['backend']}): {index['files']} archivos, "
+                      f"{index['bytes'] / 2**20:.1f} MB, {index['updates']} actualizaciones")
+                corpus = corpus_index.stats()
+                print(f"Índice del corpus: {corpus['files']} archivos, términos " +
+                      ", ".join(f"{field}: {n}" for field, n in corpus['terms'].items()) +
+                      f"; {corpus['updates']} actualizaciones, {corpus['queries']} consultas")
+
+                if extraction_cache:
+                    cache = extraction_cache.stats()
+                    if cache is None:
+                        print("\nCaché de extracción: base no disponible (ver log).")
+                    else:
+                        print(f"\nCaché de extracción (versión {cache['version']}): "
+                              f"{cache['entries']} entradas, "
+                              f"{cache['bytes'] / 2**20:.1f}/{cache['max_bytes'] / 2**20:.0f} MB, "
+                              f"{cache['hits']} aciertos, {cache['partial']} parciales, "
+                              f"{cache['misses']} fallos "
+                              f"({cache['hit_ratio']:.0%}), {cache['evictions']} descartes LRU")
+
+                transport = shm_transport.transport_stats.stats()
+                print(f"\nResultados 'forks' ({RESULT_TRANSPORT}): "
+                      f"{transport['segments']} segmentos de memoria compartida "
+                      f"({transport['segment_bytes'] / 1024:.1f} KB), "
+                      f"{transport['inline']} en línea ({transport['inline_bytes'] / 1024:.1f} KB), "
+                      f"{transport['discarded']} descartados")
+
+                print("\nTiempo por extractor (archivos extraídos, sin aciertos de caché):")
+                timing_stats = extractor_timings.stats()
+                if not timing_stats: print("  (Sin extracciones todavía)")
+                for field, ts in timing_stats.items():
+                    print(f"- {field}: {ts['seconds']:.2f}s en {ts['calls']} archivos "
+                          f"({ts['share']:.0%})")
+
+                print(f"\nCompresión (mensajes 'frame' >= {protocol.COMPRESSION_THRESHOLD // 1024} KB):")
+                comp_stats = compression_stats.snapshot()
+                if not comp_stats: print("  (Ningún mensaje comprimido)")
+                for cs in comp_stats:
+                    print(f"- {cs['algorithm']}: {cs['messages']} mensajes, "
+                          f"{cs['raw_bytes'] / 1024:.1f} KB -> {cs['wire_bytes'] / 1024:.1f} KB "
+                          f"(razón {cs['ratio']:.1f}x)")
 
             elif command == "trigger" and len(parts) > 1:
                 event_name = parts[1]
-                print(f"Disparando evento '{event_name}'...")
+                distribution_mode = parts[2].lower() if len(parts) > 2 else DEFAULT_DISTRIBUTION
+                if distribution_mode not in distribution.DISTRIBUTION_MODES:
+                    print(f"Reparto '{distribution_mode}' inválido. "
+                          f"Opciones: {', '.join(distribution.DISTRIBUTION_MODES)}.")
+                    continue
+                print(f"Disparando evento '{event_name}' (reparto: {distribution_mode})...")
 
                 active_clients_for_event = []
                 with state_lock:
@@ -727,15 +1363,7 @@ def server_commands():
                     print(f"Sin clientes válidos activos para procesar '{event_name}'.")
                     continue
 
-                try:
-                    all_files = [
-                        f for f in os.listdir(TEXT_FILES_DIR)
-                        if f.endswith(".txt") and
-                        os.path.isfile(os.path.join(TEXT_FILES_DIR, f))
-                    ]
-                except Exception as e:
-                    print(f"Error listando archivos para '{event_name}': {e}")
-                    continue
+                all_files = file_index.files()
 
                 if not all_files:
                     print(f"Sin archivos .txt en '{TEXT_FILES_DIR}' para '{event_name}'.")
@@ -747,21 +1375,38 @@ def server_commands():
                         })
                     continue
 
-                num_clients = len(active_clients_for_event)
-                total_files = len(all_files)
-                start_idx = 0
-                batches_created = 0
+                with state_lock: # Última config de cada cliente
+                    client_cfgs = [client_configs.get(sock) for sock in active_clients_for_event]
+                # Workers efectivos de cada cliente (process_client_batch los limita al presupuesto)
+                capacities = [
+                    min(max(1, cfg.get('count', 1)), BATCH_WORKER_BUDGET) if cfg else 1
+                    for cfg in client_cfgs
+                ]
 
-                for i, client_sock in enumerate(active_clients_for_event):
-                    # Distribuir archivos
-                    files_this_client = total_files // num_clients
-                    if i < (total_files % num_clients):
-                        files_this_client += 1
+                if distribution_mode == 'steal':
+                    entries = [(name, size) for name, size, _mtime in file_index.entries()]
+                    shared_queue = distribution.SharedFileQueue(
+                        entries,
+                        on_drained=lambda q, ev=event_name: log_steal_trigger_drained(ev, q),
+                        consumers=sum(1 for cfg in client_cfgs if cfg)
+                    )
+                    # Todos los lotes comparten la cola; cada uno recibe lo que alcance a tomar
+                    assignments = [shared_queue] * len(active_clients_for_event)
+                elif distribution_mode == 'size':
+                    entries = [(name, size) for name, size, _mtime in file_index.entries()]
+                    assignments = distribution.split_by_size(entries, capacities)
+                    loads = distribution.estimated_finish(entries, assignments, capacities)
+                    for sock, files, capacity, load in zip(
+                            active_clients_for_event, assignments, capacities, loads):
+                        print(f"  Cliente {client_ids.get(sock, '?')}: {len(files)} archivos, "
+                              f"{capacity} workers, carga estimada {load / 2**20:.2f} MB/worker")
+                else:
+                    assignments = distribution.split_by_count(all_files, len(active_clients_for_event))
 
-                    end_idx = start_idx + files_this_client
-                    assigned_files = all_files[start_idx:end_idx]
-                    start_idx = end_idx
+                batches_created = 0
 
+                for client_sock, assigned_files, client_cfg in zip(
+                        active_clients_for_event, assignments, client_cfgs):
                     if not assigned_files: # Si un cliente no obtiene archivos
                         send_to_client(client_sock, {
                             "type": "PROCESSING_COMPLETE",
@@ -771,31 +1416,34 @@ def server_commands():
                         })
                         continue
 
-                    client_cfg = None
-                    with state_lock: # Obtener la última config del cliente
-                        client_cfg = client_configs.get(client_sock)
-
                     if client_cfg:
-                        batch = (client_sock, assigned_files, event_name, client_cfg)
-                        with state_lock: # Proteger la cola de lotes
-                            client_batch_processing_queue.append(batch)
+                        enqueue_client_batch(client_sock, assigned_files, event_name, client_cfg)
                         batches_created += 1
                     else:
                         print(
                             f"Cliente {clients.get(client_sock)} ya no tiene config. Lote descartado."
                         )
 
-                if batches_created > 0:
-                    new_batch_event.set() # Notificar al hilo trabajador
                 print(
                     f"{batches_created} lotes para '{event_name}' añadidos a cola de procesamiento."
                 )
 
+            elif command == "invalidate":
+                if not extraction_cache:
+                    print("La caché de extracción está desactivada.")
+                else:
+                    target = parts[1] if len(parts) > 1 else None
+                    removed = extraction_cache.invalidate(
+                        os.path.join(TEXT_FILES_DIR, target) if target else None)
+                    if removed is None:
+                        print("No se pudo invalidar: la base de la caché no está disponible (ver log).")
+                    elif target:
+                        print(f"Caché: {removed} entrada(s) de '{target}' eliminada(s).")
+                    else:
+                        print(f"Caché de extracción vaciada ({removed} entradas).")
+
             elif command == "exit":
                 print("Cerrando servidor...")
-                new_batch_event.set() # Despertar al hilo trabajador
-                time.sleep(0.5) # Dar tiempo a que reaccione
-
                 with state_lock:
                     client_list = list(clients.keys())
 
@@ -815,8 +1463,6 @@ def server_commands():
 
         except EOFError: # Ctrl+D
             print("\nCerrando servidor por EOF...")
-            new_batch_event.set()
-            time.sleep(0.5)
             with state_lock:
                 client_list = list(clients.keys())
             for sock in client_list:
@@ -836,13 +1482,15 @@ def server_commands():
 command_thread = threading.Thread(target=server_commands, daemon=True)
 command_thread.start()
 
-batch_worker_thread = threading.Thread(
-    target=manage_client_batch_processing, daemon=True
+batch_dispatcher.start()
+
+worker_pools.start_reaper(
+    on_trim=lambda modes: server_log(f"Pools inactivos cerrados: {', '.join(modes)}")
 )
-batch_worker_thread.start()
 
 # --- Bucle Principal para Aceptar Clientes ---
-try:
+def serve_threads():
+    """Núcleo clásico: un hilo `handle_client` por cada conexión aceptada."""
     while True:
         try:
             client_sock, client_addr = server_socket.accept()
@@ -858,10 +1506,15 @@ try:
             print(f"Error inesperado en bucle de aceptación: {e}")
             time.sleep(1) # Prevenir spinning rápido en errores continuos
 
+
+try:
+    if SERVER_CORE == 'asyncio':
+        asyncio.run(serve_async())
+    else:
+        serve_threads()
+
 except KeyboardInterrupt:
     print("\nCerrando servidor por KeyboardInterrupt...")
-    new_batch_event.set() # Notificar al worker para que pueda salir si está esperando
-    time.sleep(0.5)
     with state_lock:
         client_list = list(clients.keys())
     for sock in client_list:
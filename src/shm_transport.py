@@ -0,0 +1,109 @@
+# src/shm_transport.py
+
+"""
+Transporte de resultados por memoria compartida (modo 'forks').
+
+Sin esto, los resultados de cada tarea vuelven al servidor pickleados por la
+tubería de ProcessPoolExecutor, y el hilo que la atiende en el proceso
+principal deserializa cada dict y cada lista de nombres y fechas.
+
+Con `pack_results`, el worker codifica la lista de resultados de la tarea con
+marshal (más compacto y rápido que pickle para dicts de str/int/listas) y la
+escribe en un segmento `multiprocessing.shared_memory`. Por la tubería solo
+viaja el handle `('shm', nombre, tamaño)`. `unpack_results`, en el servidor,
+lee el segmento, lo libera y decodifica todo con un solo `marshal.loads`.
+
+Los resultados chicos (menos de `SHM_MIN_BYTES`) viajan igual codificados con
+marshal pero dentro del handle: crear un segmento cuesta más que copiarlos.
+
+El segmento pasa a ser del servidor apenas el worker lo escribe: el worker lo
+quita del resource_tracker (si no, al terminar el worker se avisaría de una
+"fuga" y se borraría un segmento que el servidor todavía no leyó).
+"""
+
+import marshal
+import threading
+from multiprocessing import resource_tracker, shared_memory
+
+SHM_MIN_BYTES = 16 * 1024
+
+
+class TransportStats:
+    """Contadores del lado del servidor (lo que llegó por cada vía)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.segments = 0
+        self.segment_bytes = 0
+        self.inline = 0
+        self.inline_bytes = 0
+        self.discarded = 0
+
+    def record(self, kind: str, size: int):
+        with self._lock:
+            if kind == 'shm':
+                self.segments += 1
+                self.segment_bytes += size
+            else:
+                self.inline += 1
+                self.inline_bytes += size
+
+    def record_discarded(self):
+        with self._lock:
+            self.discarded += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"segments": self.segments, "segment_bytes": self.segment_bytes,
+                    "inline": self.inline, "inline_bytes": self.inline_bytes,
+                    "discarded": self.discarded}
+
+
+transport_stats = TransportStats()
+
+
+def pack_results(results) -> tuple:
+    """(En el worker) Codifica `results` y devuelve el handle que viaja por la tubería."""
+    encoded = marshal.dumps(results)
+    if len(encoded) < SHM_MIN_BYTES:
+        return ('inline', encoded)
+    segment = shared_memory.SharedMemory(create=True, size=len(encoded))
+    try:
+        segment.buf[:len(encoded)] = encoded
+        name = segment.name
+    except BaseException:
+        segment.close()
+        segment.unlink()
+        raise
+    segment.close()
+    # Desde ahora lo libera el servidor (unpack_results/discard_results)
+    resource_tracker.unregister(segment._name, 'shared_memory')
+    return ('shm', name, len(encoded))
+
+
+def _take_segment(name: str, size: int) -> bytes:
+    segment = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(segment.buf[:size])
+    finally:
+        segment.close()
+        segment.unlink()  # También lo quita del resource_tracker del servidor
+
+
+def unpack_results(handle: tuple):
+    """(En el servidor) Lo que se pasó a `pack_results`; libera el segmento."""
+    if handle[0] == 'inline':
+        encoded = handle[1]
+    else:
+        encoded = _take_segment(handle[1], handle[2])
+    transport_stats.record(handle[0], len(encoded))
+    return marshal.loads(encoded)
+
+
+def discard_results(handle: tuple):
+    """Libera el segmento de un handle que nadie va a leer (lote abandonado)."""
+    if handle[0] == 'shm':
+        try:
+            _take_segment(handle[1], handle[2])
+        except FileNotFoundError:
+            pass
+    transport_stats.record_discarded()
@@ -0,0 +1,318 @@
+# src/sim_engine.py
+
+"""
+Motor de simulación de scheduling por eventos discretos, sin interfaz gráfica.
+
+En vez de avanzar de a un tick, el reloj salta al próximo evento: una llegada,
+el fin de la ráfaga de un proceso o el fin de un quantum (RR). En cada instante
+se procesan, en este orden:
+
+1. Los procesos que terminan su ráfaga (quedan completos) o su quantum (vuelven
+   al final de la cola Ready).
+2. Las llegadas, en orden de llegada (los empates, en el orden de la lista).
+3. Se asignan procesos a los CPUs libres (el de menor número primero) con
+   `scheduler.schedule(...)` sobre la cola propia del scheduler
+   (`new_ready_queue`), así cada selección cuesta O(log n).
+4. Si el scheduler es preemptivo (`preemptive`, p. ej. SRTF), se desaloja al
+   proceso en ejecución con peor clave mientras haya en la cola uno mejor.
+
+`simulate` recibe objetos `Process` y cualquier scheduler de
+`AVAILABLE_SCHEDULERS`, y devuelve un `SimulationResult` con la línea de tiempo
+(tramos `(pid, cpu, inicio, fin)`), la lista de eventos y las métricas. Los
+`Process` quedan con sus tiempos (inicio, fin, turnaround, espera) calculados.
+`simulate_stream` hace lo mismo con procesos que llegan de un iterable (por
+ejemplo, millones generados por `workload`) sin guardarlos, y devuelve solo
+las métricas.
+"""
+
+import heapq
+from typing import Iterable, Iterator, List
+
+from .process import Process
+from .scheduler import AVAILABLE_SCHEDULERS, SchedulerBase, SchedulerRR
+
+EVENT_ARRIVAL = 'arrival'
+EVENT_DISPATCH = 'dispatch'
+EVENT_QUANTUM = 'quantum'    # RR: agotó su quantum y vuelve a la cola
+EVENT_PREEMPT = 'preempt'    # Desalojado por un proceso con mejor clave
+EVENT_COMPLETE = 'complete'
+
+
+class SimulationResult:
+    """Resultado de `simulate`: procesos, línea de tiempo, eventos y métricas."""
+    def __init__(self, scheduler: str, cpus: int, processes: List[Process], timeline: list,
+                 events: list, busy_time, preemptions: int, dispatches: int):
+        self.scheduler = scheduler
+        self.cpus = cpus
+        self.processes = processes
+        self.timeline = timeline        # [(pid, cpu, inicio, fin)], ordenada por inicio y CPU
+        self.events = events            # [(tiempo, tipo, pid, cpu)], en orden cronológico
+        self.busy_time = busy_time
+        self.preemptions = preemptions  # Quantum vencido o desalojo
+        self.dispatches = dispatches
+
+    @property
+    def metrics(self) -> dict:
+        processes = self.processes
+        count = len(processes)
+        if not count:
+            return {"processes": 0}
+        first_arrival = min(p.arrival_time for p in processes)
+        end_time = max(p.completion_time for p in processes)
+        makespan = end_time - first_arrival
+        responses = [p.start_time - p.arrival_time for p in processes]
+        return {
+            "scheduler": self.scheduler,
+            "cpus": self.cpus,
+            "processes": count,
+            "end_time": end_time,
+            "makespan": makespan,
+            "avg_turnaround": sum(p.turnaround_time for p in processes) / count,
+            "avg_waiting": sum(p.waiting_time for p in processes) / count,
+            "max_waiting": max(p.waiting_time for p in processes),
+            "avg_response": sum(responses) / count,
+            "throughput": count / makespan if makespan else float(count),
+            "cpu_utilization": self.busy_time / (self.cpus * makespan) if makespan else 1.0,
+            "preemptions": self.preemptions,
+            "dispatches": self.dispatches,
+        }
+
+
+def make_scheduler(name: str, quantum: int = 2) -> SchedulerBase:
+    """Instancia un scheduler de `AVAILABLE_SCHEDULERS` por nombre."""
+    try:
+        scheduler_class = AVAILABLE_SCHEDULERS[name]
+    except KeyError:
+        raise ValueError(f"Scheduler '{name}' desconocido; válidos: "
+                         f"{', '.join(AVAILABLE_SCHEDULERS)}.") from None
+    if scheduler_class is SchedulerRR:
+        return scheduler_class(quantum=quantum)
+    return scheduler_class()
+
+
+def reset_process(process: Process):
+    """Deja el proceso como recién creado, para poder simular la misma carga varias veces."""
+    process.remaining_burst_time = process.burst_time
+    process.start_time = -1
+    process.completion_time = -1
+    process.waiting_time = 0
+    process.turnaround_time = 0
+    process.state = "New"
+
+
+def simulate(processes: List[Process], scheduler: SchedulerBase, cpus: int = 1,
+             record_timeline: bool = True, record_events: bool = True,
+             reset: bool = True) -> SimulationResult:
+    """
+    Simula `processes` con `scheduler` en `cpus` CPUs.
+
+    Args:
+        processes: Procesos a simular. Se modifican (estado y tiempos finales).
+        scheduler: Instancia de un scheduler (ver `make_scheduler`).
+        cpus: Cantidad de CPUs simulados.
+        record_timeline / record_events: Con False no se guardan (cargas grandes
+            donde solo interesan las métricas).
+        reset: Reinicia los tiempos de cada proceso antes de simular.
+
+    Returns:
+        SimulationResult con la línea de tiempo, los eventos y las métricas.
+    """
+    if cpus < 1:
+        raise ValueError("cpus debe ser >= 1.")
+    for process in processes:
+        if process.burst_time <= 0:
+            raise ValueError(f"Ráfaga de P{process.pid} debe ser positiva.")
+        if reset:
+            reset_process(process)
+
+    arrivals = sorted(processes, key=lambda p: p.arrival_time)  # Estable: empates en orden de lista
+    timeline = [] if record_timeline else None
+    events = [] if record_events else None
+    busy_time, preemptions, dispatches = _run(iter(arrivals), scheduler, cpus, timeline, events)
+    if timeline is not None:
+        timeline.sort(key=lambda segment: (segment[2], segment[1]))
+    return SimulationResult(str(scheduler), cpus, list(processes), timeline, events,
+                            busy_time, preemptions, dispatches)
+
+
+def simulate_stream(processes: Iterable[Process], scheduler: SchedulerBase,
+                    cpus: int = 1) -> dict:
+    """
+    Simula procesos que llegan de un iterable (p. ej. `workload.generate`) sin
+    guardarlos: cada uno se suelta al terminar. Deben venir ordenados por
+    llegada. Devuelve las mismas métricas que `SimulationResult.metrics`.
+    """
+    if cpus < 1:
+        raise ValueError("cpus debe ser >= 1.")
+    totals = {"processes": 0, "turnaround": 0, "waiting": 0, "max_waiting": 0,
+              "response": 0, "first_arrival": None, "end_time": 0}
+
+    def checked(stream):
+        last_arrival = None
+        for process in stream:
+            if process.burst_time <= 0:
+                raise ValueError(f"Ráfaga de P{process.pid} debe ser positiva.")
+            if last_arrival is not None and process.arrival_time < last_arrival:
+                raise ValueError(f"P{process.pid} llega antes que el proceso anterior; "
+                                 f"el flujo debe venir ordenado por llegada.")
+            if last_arrival is None:
+                totals["first_arrival"] = process.arrival_time
+            last_arrival = process.arrival_time
+            reset_process(process)
+            yield process
+
+    def on_complete(process):
+        totals["processes"] += 1
+        totals["turnaround"] += process.turnaround_time
+        totals["waiting"] += process.waiting_time
+        totals["max_waiting"] = max(totals["max_waiting"], process.waiting_time)
+        totals["response"] += process.start_time - process.arrival_time
+        totals["end_time"] = max(totals["end_time"], process.completion_time)
+
+    busy_time, preemptions, dispatches = _run(checked(processes), scheduler, cpus,
+                                              None, None, on_complete)
+    count = totals["processes"]
+    if not count:
+        return {"processes": 0}
+    makespan = totals["end_time"] - totals["first_arrival"]
+    return {
+        "scheduler": str(scheduler),
+        "cpus": cpus,
+        "processes": count,
+        "end_time": totals["end_time"],
+        "makespan": makespan,
+        "avg_turnaround": totals["turnaround"] / count,
+        "avg_waiting": totals["waiting"] / count,
+        "max_waiting": totals["max_waiting"],
+        "avg_response": totals["response"] / count,
+        "throughput": count / makespan if makespan else float(count),
+        "cpu_utilization": busy_time / (cpus * makespan) if makespan else 1.0,
+        "preemptions": preemptions,
+        "dispatches": dispatches,
+    }
+
+
+def _run(arrivals: Iterator[Process], scheduler: SchedulerBase, cpus: int,
+         timeline, events, on_complete=None) -> tuple:
+    """
+    Bucle de eventos sobre `arrivals` (ordenados por llegada, se consumen de a
+    uno). Llena `timeline`/`events` si no son None y llama a `on_complete` con
+    cada proceso terminado. Devuelve `(busy_time, preemptions, dispatches)`.
+    """
+    ready = scheduler.new_ready_queue()
+    quantum = scheduler.quantum if isinstance(scheduler, SchedulerRR) else None
+    preemptive = getattr(scheduler, 'preemptive', False)
+    key = scheduler.key
+
+    free_cpus = list(range(cpus))  # Heap: se asigna primero el CPU de menor número
+    running = {}                   # cpu -> [proceso, inicio del tramo, restante al inicio, ficha]
+    stops = []                     # Heap (fin de ráfaga o quantum, cpu, ficha)
+    tokens = 0                     # Invalida los fines de tramos desalojados
+    last_segment = {}              # cpu -> índice en timeline de su último tramo
+    busy_time = 0
+    preemptions = dispatches = 0
+
+    def stop(cpu, now):
+        """Cierra el tramo de `cpu` en `now` y devuelve el proceso (con su restante al día)."""
+        nonlocal busy_time
+        process, start, remaining, _token = running.pop(cpu)
+        process.remaining_burst_time = remaining - (now - start)
+        busy_time += now - start
+        if timeline is not None and now > start:
+            index = last_segment.get(cpu)
+            if index is not None and timeline[index][0] == process.pid and timeline[index][3] == start:
+                # Sigue el mismo proceso en el mismo CPU (p. ej. quantum con la cola vacía)
+                timeline[index] = (process.pid, cpu, timeline[index][2], now)
+            else:
+                last_segment[cpu] = len(timeline)
+                timeline.append((process.pid, cpu, start, now))
+        heapq.heappush(free_cpus, cpu)
+        return process
+
+    def dispatch(process, now):
+        nonlocal tokens, dispatches
+        cpu = heapq.heappop(free_cpus)
+        tokens += 1
+        dispatches += 1
+        remaining = process.remaining_burst_time
+        running[cpu] = [process, now, remaining, tokens]
+        process.state = "Running"
+        if process.start_time == -1:
+            process.start_time = now
+        run_for = remaining if quantum is None else min(quantum, remaining)
+        heapq.heappush(stops, (now + run_for, cpu, tokens))
+        if events is not None:
+            events.append((now, EVENT_DISPATCH, process.pid, cpu))
+
+    upcoming = next(arrivals, None)  # Próxima llegada, aún fuera de la cola
+    now = upcoming.arrival_time if upcoming is not None else 0
+    while True:
+        # 1. Fin de ráfaga o de quantum
+        while stops and stops[0][0] <= now:
+            _end, cpu, token = heapq.heappop(stops)
+            slot = running.get(cpu)
+            if slot is None or slot[3] != token:
+                continue  # El tramo ya se cerró por un desalojo
+            process = stop(cpu, now)
+            if process.remaining_burst_time <= 0:
+                process.remaining_burst_time = 0
+                process.state = "Terminated"
+                process.completion_time = now
+                process.turnaround_time = now - process.arrival_time
+                process.waiting_time = process.turnaround_time - process.burst_time
+                if on_complete is not None:
+                    on_complete(process)
+                kind = EVENT_COMPLETE
+            else:
+                process.state = "Ready"
+                ready.push(process)
+                preemptions += 1
+                kind = EVENT_QUANTUM
+            if events is not None:
+                events.append((now, kind, process.pid, cpu))
+
+        # 2. Llegadas
+        while upcoming is not None and upcoming.arrival_time <= now:
+            upcoming.state = "Ready"
+            ready.push(upcoming)
+            if events is not None:
+                events.append((now, EVENT_ARRIVAL, upcoming.pid, None))
+            upcoming = next(arrivals, None)
+
+        # 3. Despacho en los CPUs libres
+        while free_cpus and ready:
+            process = scheduler.schedule(ready, now, [s[0] for s in running.values()],
+                                         len(free_cpus))
+            if process is None:
+                break
+            dispatch(process, now)
+
+        # 4. Desalojo: mientras el mejor de la cola supere al peor en ejecución
+        if preemptive and ready and not free_cpus:
+            while True:
+                for slot in running.values():
+                    slot[0].remaining_burst_time = slot[2] - (now - slot[1])
+                worst_cpu = max(running, key=lambda c: (key(running[c][0]), c))
+                if not key(ready.peek()) < key(running[worst_cpu][0]):
+                    break
+                process = stop(worst_cpu, now)
+                process.state = "Ready"
+                ready.push(process)
+                preemptions += 1
+                if events is not None:
+                    events.append((now, EVENT_PREEMPT, process.pid, worst_cpu))
+                dispatch(scheduler.schedule(ready, now, [s[0] for s in running.values()], 1), now)
+
+        # 5. Próximo evento
+        while stops and running.get(stops[0][1], (None, None, None, None))[3] != stops[0][2]:
+            heapq.heappop(stops)
+        candidates = []
+        if stops:
+            candidates.append(stops[0][0])
+        if upcoming is not None:
+            candidates.append(upcoming.arrival_time)
+        if not candidates:
+            break
+        now = min(candidates)
+
+    return busy_time, preemptions, dispatches
@@ -0,0 +1,282 @@
+# src/sketches.py
+
+"""
+Resúmenes aproximados del corpus con memoria fija: Count-Min y Space-Saving.
+
+Para estadísticas de todo un lote (nombres y lugares más frecuentes, total de
+palabras) no hace falta juntar los conjuntos exactos de cada archivo:
+
+- `CountMinSketch`: tabla de `depth` filas x `width` contadores. Estima la
+  frecuencia de cualquier término por exceso; con `width = ⌈e/ε⌉` y
+  `depth = ⌈ln(1/δ)⌉` el error es a lo sumo ε·N con probabilidad 1-δ (N = total
+  de apariciones sumadas).
+- `SpaceSaving`: `capacity` contadores para los términos más frecuentes. Cada
+  conteo es una cota superior y `conteo - error` una cota inferior; el error es
+  a lo sumo N/capacity.
+
+Ambos se combinan sumando (`merge`), así que cada tarea de un worker arma su
+resumen parcial (`CorpusSummary`), lo envía serializado (`to_dict`, apto para
+marshal/JSON) y el servidor los une sin volver a ver los términos.
+
+En `CorpusSummary` se cuenta en cuántos archivos aparece cada término (los
+extractores ya devuelven valores sin repetir por archivo).
+"""
+
+import hashlib
+import heapq
+import math
+
+SUMMARY_FIELDS = ('nombres', 'lugares')
+DEFAULT_TOP_K = 10
+DEFAULT_EPSILON = 0.001
+DEFAULT_DELTA = 0.01
+MAX_TOP_K = 1000
+MIN_EPSILON = 0.0001
+MIN_DELTA = 1e-6
+
+
+class CountMinSketch:
+    """Contadores en una tabla plana de `depth * width`; los índices salen de un hash blake2b."""
+    def __init__(self, width: int, depth: int):
+        if width < 1 or depth < 1:
+            raise ValueError("width y depth deben ser >= 1.")
+        self.width = width
+        self.depth = depth
+        self.table = [0] * (width * depth)
+        self.total = 0
+
+    @classmethod
+    def from_error(cls, epsilon: float, delta: float) -> 'CountMinSketch':
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)))
+
+    def _cells(self, item: str) -> list:
+        # Doble hash: h1 + i*h2 da `depth` índices casi independientes con un solo digest
+        digest = hashlib.blake2b(item.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, item: str, count: int = 1):
+        table = self.table
+        for cell in self._cells(item):
+            table[cell] += count
+        self.total += count
+
+    def estimate(self, item: str) -> int:
+        table = self.table
+        return min(table[cell] for cell in self._cells(item))
+
+    def merge(self, other: 'CountMinSketch'):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Solo se combinan sketches de igual tamaño.")
+        self.merge_cells(((i, c) for i, c in enumerate(other.table) if c), other.total)
+
+    def merge_cells(self, cells, total: int):
+        table = self.table
+        for cell, count in cells:
+            table[cell] += count
+        self.total += total
+
+    def cells(self) -> list:
+        """Celdas no nulas `[índice, conteo]`: un resumen parcial casi vacío viaja chico."""
+        return [[i, c] for i, c in enumerate(self.table) if c]
+
+
+class SpaceSaving:
+    """
+    Top-K aproximado con `capacity` contadores (término -> [conteo, error]).
+
+    El mínimo se busca en un heap con entradas perezosas: cada incremento
+    agrega una entrada y las viejas se descartan al sacarlas. El heap se
+    reconstruye cuando supera `4 * capacity` entradas, así la memoria sigue fija.
+    """
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity debe ser >= 1.")
+        self.capacity = capacity
+        self.counters = {}
+        self.total = 0
+        self._heap = []
+
+    def add(self, item: str, count: int = 1):
+        self.total += count
+        counters = self.counters
+        entry = counters.get(item)
+        if entry is not None:
+            entry[0] += count
+        elif len(counters) < self.capacity:
+            entry = counters[item] = [count, 0]
+        else:
+            floor = self._pop_min()
+            entry = counters[item] = [floor + count, floor]
+        heapq.heappush(self._heap, (entry[0], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def _pop_min(self) -> int:
+        """Quita el término de menor conteo y devuelve su conteo."""
+        heap, counters = self._heap, self.counters
+        while True:
+            count, item = heapq.heappop(heap)
+            entry = counters.get(item)
+            if entry is not None and entry[0] == count:
+                del counters[item]
+                return count
+
+    def _rebuild_heap(self):
+        self._heap = [(entry[0], item) for item, entry in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    def min_count(self) -> int:
+        """Cota de lo que pudo tener un término ausente (0 si nunca se descartó nada)."""
+        if len(self.counters) < self.capacity:
+            return 0
+        heap, counters = self._heap, self.counters
+        while True:
+            count, item = heap[0]
+            entry = counters.get(item)
+            if entry is not None and entry[0] == count:
+                return count
+            heapq.heappop(heap)
+
+    def merge(self, other: 'SpaceSaving'):
+        self.merge_counters(other.counters, other.total, other.min_count())
+
+    def merge_counters(self, counters: dict, total: int, other_floor: int):
+        """
+        Unión de dos resúmenes (Agarwal et al., "Mergeable Summaries"): un término
+        ausente en uno suma el mínimo de ese resumen como conteo y como error.
+        Si el otro nunca descartó nada (`other_floor` 0), solo se recorren sus términos.
+        """
+        own_floor = self.min_count()
+        mine = self.counters
+        if other_floor:
+            for item, entry in mine.items():
+                if item not in counters:
+                    entry[0] += other_floor
+                    entry[1] += other_floor
+        for item, (count, error) in counters.items():
+            entry = mine.get(item)
+            if entry is None:
+                mine[item] = [own_floor + count, own_floor + error]
+            else:
+                entry[0] += count
+                entry[1] += error
+        self.total += total
+        if len(mine) > self.capacity:
+            self.counters = dict(heapq.nlargest(self.capacity, mine.items(),
+                                                key=lambda kv: kv[1][0]))
+            self._rebuild_heap()
+        elif other_floor:
+            self._rebuild_heap()
+        else:
+            for item in counters:
+                heapq.heappush(self._heap, (mine[item][0], item))
+            if len(self._heap) > 4 * self.capacity:
+                self._rebuild_heap()
+
+    def top(self, k: int) -> list:
+        """`(término, conteo, error)` de los k mayores (empates por término)."""
+        ranked = sorted(self.counters.items(), key=lambda kv: (-kv[1][0], kv[0]))
+        return [(item, entry[0], entry[1]) for item, entry in ranked[:k]]
+
+
+def resolve_summary_config(config):
+    """
+    Valida la opción 'summary' de SET_CONFIG. Devuelve None (desactivado) o un
+    dict con top_k, epsilon, delta, per_file y terms; ValueError si es inválida.
+    """
+    if config is None or config is False:
+        return None
+    if config is True:
+        config = {}
+    if not isinstance(config, dict):
+        raise ValueError("'summary' debe ser true/false o un objeto.")
+    top_k = config.get('top_k', DEFAULT_TOP_K)
+    epsilon = config.get('epsilon', DEFAULT_EPSILON)
+    delta = config.get('delta', DEFAULT_DELTA)
+    per_file = config.get('per_file', True)
+    terms = config.get('terms', [])
+    if not isinstance(top_k, int) or isinstance(top_k, bool) or not 1 <= top_k <= MAX_TOP_K:
+        raise ValueError(f"'top_k' debe ser un entero entre 1 y {MAX_TOP_K}.")
+    if not isinstance(epsilon, (int, float)) or not MIN_EPSILON <= epsilon < 1:
+        raise ValueError(f"'epsilon' debe estar entre {MIN_EPSILON} y 1.")
+    if not isinstance(delta, (int, float)) or not MIN_DELTA <= delta < 1:
+        raise ValueError(f"'delta' debe estar entre {MIN_DELTA} y 1.")
+    if not isinstance(per_file, bool):
+        raise ValueError("'per_file' debe ser true o false.")
+    if not isinstance(terms, list) or not all(isinstance(t, str) for t in terms):
+        raise ValueError("'terms' debe ser una lista de textos.")
+    return {'top_k': top_k, 'epsilon': float(epsilon), 'delta': float(delta),
+            'per_file': per_file, 'terms': terms}
+
+
+class CorpusSummary:
+    """Resumen de un lote: archivos, palabras y, por campo, Space-Saving + un Count-Min compartido."""
+    def __init__(self, top_k: int = DEFAULT_TOP_K, epsilon: float = DEFAULT_EPSILON,
+                 delta: float = DEFAULT_DELTA):
+        self.top_k = top_k
+        self.epsilon = epsilon
+        self.delta = delta
+        self.files = 0
+        self.words = 0
+        # Un solo Count-Min para todos los campos: la clave lleva el campo delante
+        self.sketch = CountMinSketch.from_error(epsilon, delta)
+        capacity = max(top_k, math.ceil(1 / epsilon))
+        self.heavy = {field: SpaceSaving(capacity) for field in SUMMARY_FIELDS}
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'CorpusSummary':
+        return cls(config['top_k'], config['epsilon'], config['delta'])
+
+    def add_file(self, values: dict, words: int = 0):
+        """Suma un archivo: `values` es campo -> valores extraídos (sin repetir)."""
+        self.files += 1
+        self.words += words
+        for field, heavy in self.heavy.items():
+            for term in values.get(field, ()):
+                heavy.add(term)
+                self.sketch.add(f"{field}\0{term}")
+
+    def to_dict(self) -> dict:
+        return {
+            "files": self.files, "words": self.words,
+            "sketch": self.sketch.cells(), "sketch_total": self.sketch.total,
+            "heavy": {field: [heavy.counters, heavy.total, heavy.min_count()]
+                      for field, heavy in self.heavy.items()},
+        }
+
+    def merge_dict(self, partial: dict):
+        """Une un resumen parcial de `to_dict` (creado con los mismos parámetros)."""
+        self.files += partial["files"]
+        self.words += partial["words"]
+        self.sketch.merge_cells(partial["sketch"], partial["sketch_total"])
+        for field, (counters, total, floor) in partial["heavy"].items():
+            self.heavy[field].merge_counters(counters, total, floor)
+
+    def estimate(self, field: str, term: str) -> int:
+        return self.sketch.estimate(f"{field}\0{term}")
+
+    def report(self, terms=()) -> dict:
+        """
+        Resumen para el cliente. Cada término del top trae `count` (cota superior:
+        el menor entre Space-Saving y Count-Min) y `min` (cota inferior garantizada).
+        """
+        report = {"files": self.files, "words": self.words, "top_k": self.top_k,
+                  "epsilon": self.epsilon, "delta": self.delta,
+                  "sketch": {"width": self.sketch.width, "depth": self.sketch.depth}}
+        for field, heavy in self.heavy.items():
+            report[field] = {
+                "total": heavy.total,
+                "max_error": math.floor(self.epsilon * heavy.total),
+                "top": [{"term": term, "count": min(count, self.estimate(field, term)),
+                         "min": count - error}
+                        for term, count, error in heavy.top(self.top_k)],
+            }
+        if terms:
+            report["frequencies"] = {
+                field: {term: self.estimate(field, term) for term in terms}
+                for field in SUMMARY_FIELDS
+            }
+        return report
@@ -0,0 +1,353 @@
+# src/sweep.py
+
+"""
+Barrido de parámetros: todos los schedulers x quantums de RR x cantidad de CPUs
+x cargas de trabajo, repartido en un pool de procesos.
+
+Cada combinación se simula con `sim_engine.simulate` (sin línea de tiempo ni
+eventos; FCFS, SJF y Priority_NP en 1 CPU van por `vector_sim`, con los mismos
+resultados). Las filas se escriben en un CSV o JSONL (según la extensión) a
+medida que terminan, así que un barrido interrumpido se retoma salteando las
+combinaciones que ya están en el archivo. Al final se imprime un ranking con
+el turnaround y la espera (promedio y p95) de cada configuración, promediados
+sobre las cargas.
+
+Cargas de trabajo:
+    archivo.csv     Columnas `arrival,burst` y opcionalmente `pid,priority`.
+    archivo.wkl     Archivo de reproducción de `workload.write_workload`.
+    random:N:SEED   N procesos aleatorios reproducibles (llegadas en [0, 2N),
+                    ráfagas en [1, 10], prioridades en [0, 4]).
+
+Uso:
+    python -m src.sweep --workload random:200:1 --workload random:200:2 \\
+        --quanta 1,2,4 --cpus 1,2,4 --output sweep.csv
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import json
+import math
+import os
+import random
+import sys
+import time
+from typing import List
+
+from .process import Process
+from .scheduler import AVAILABLE_SCHEDULERS
+from .sim_engine import make_scheduler, simulate
+from . import vector_sim
+from .workload import WORKLOAD_SUFFIX, read_workload
+
+DEFAULT_QUANTA = (1, 2, 4, 8)
+DEFAULT_CPUS = (1, 2, 4)
+RANK_METRICS = ('avg_turnaround', 'p95_turnaround', 'avg_waiting', 'p95_waiting')
+RESULT_FIELDS = (
+    'run_id', 'workload', 'scheduler', 'quantum', 'cpus', 'processes',
+    'avg_turnaround', 'p95_turnaround', 'avg_waiting', 'p95_waiting', 'max_waiting',
+    'avg_response', 'makespan', 'throughput', 'cpu_utilization', 'preemptions', 'seconds',
+)
+NUMERIC_FIELDS = frozenset(RESULT_FIELDS) - {'run_id', 'workload', 'scheduler'}
+
+_workload_cache = {}  # spec -> [(pid, arrival, burst, priority)], uno por proceso del pool
+
+
+# --- Cargas de trabajo ---
+def load_workload(spec: str) -> list:
+    """Tuplas `(pid, arrival, burst, priority)` de la carga `spec` (ver docstring del módulo)."""
+    cached = _workload_cache.get(spec)
+    if cached is not None:
+        return cached
+    if spec.startswith('random:'):
+        try:
+            _prefix, count, seed = spec.split(':')
+            count, seed = int(count), int(seed)
+        except ValueError:
+            raise ValueError(f"Carga '{spec}' inválida: se espera 'random:N:SEED'.") from None
+        rng = random.Random(seed)
+        rows = [(pid, rng.randrange(2 * count), rng.randint(1, 10), rng.randint(0, 4))
+                for pid in range(1, count + 1)]
+    elif spec.endswith(WORKLOAD_SUFFIX):
+        rows = [(p.pid, p.arrival_time, p.burst_time, p.priority) for p in read_workload(spec)]
+    else:
+        with open(spec, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            missing = {'arrival', 'burst'} - set(reader.fieldnames or ())
+            if missing:
+                raise ValueError(f"'{spec}' no tiene las columnas: {', '.join(sorted(missing))}.")
+            rows = [(int(row.get('pid') or index), int(row['arrival']), int(row['burst']),
+                     int(row.get('priority') or 0))
+                    for index, row in enumerate(reader, start=1)]
+    if not rows:
+        raise ValueError(f"La carga '{spec}' no tiene procesos.")
+    _workload_cache[spec] = rows
+    return rows
+
+
+def workload_processes(spec: str) -> List[Process]:
+    return [Process(pid, spec, arrival, burst, priority)
+            for pid, arrival, burst, priority in load_workload(spec)]
+
+
+# --- Métricas ---
+def percentile(values: list, q: float):
+    """Percentil `q` (0-100) por rango más cercano: siempre es uno de los valores."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(arrival: list, burst: list, start: list, completion: list, cpus: int) -> dict:
+    """Métricas de una corrida a partir de los tiempos de cada proceso."""
+    count = len(arrival)
+    turnaround = [c - a for c, a in zip(completion, arrival)]
+    waiting = [t - b for t, b in zip(turnaround, burst)]
+    makespan = max(completion) - min(arrival)
+    return {
+        'processes': count,
+        'avg_turnaround': sum(turnaround) / count,
+        'p95_turnaround': percentile(turnaround, 95),
+        'avg_waiting': sum(waiting) / count,
+        'p95_waiting': percentile(waiting, 95),
+        'max_waiting': max(waiting),
+        'avg_response': sum(s - a for s, a in zip(start, arrival)) / count,
+        'makespan': makespan,
+        'throughput': count / makespan if makespan else float(count),
+        'cpu_utilization': sum(burst) / (cpus * makespan) if makespan else 1.0,
+    }
+
+
+# --- Grilla y corridas ---
+def run_id(workload: str, scheduler: str, quantum, cpus: int) -> str:
+    return f"{workload}|{scheduler}|q{quantum if quantum is not None else '-'}|c{cpus}"
+
+
+def build_grid(workloads, schedulers=None, quanta=DEFAULT_QUANTA, cpus=DEFAULT_CPUS) -> list:
+    """Combinaciones a simular; el quantum solo varía para RR."""
+    schedulers = list(schedulers or AVAILABLE_SCHEDULERS)
+    unknown = [name for name in schedulers if name not in AVAILABLE_SCHEDULERS]
+    if unknown:
+        raise ValueError(f"Scheduler(s) desconocido(s): {', '.join(unknown)}; "
+                         f"válidos: {', '.join(AVAILABLE_SCHEDULERS)}.")
+    if any(q < 1 for q in quanta) or any(c < 1 for c in cpus):
+        raise ValueError("Los quantums y las cantidades de CPUs deben ser >= 1.")
+    grid = []
+    for workload in workloads:
+        for scheduler in schedulers:
+            for quantum in (quanta if scheduler == 'RR' else (None,)):
+                for cpu_count in cpus:
+                    grid.append({'run_id': run_id(workload, scheduler, quantum, cpu_count),
+                                 'workload': workload, 'scheduler': scheduler,
+                                 'quantum': quantum, 'cpus': cpu_count})
+    return grid
+
+
+def run_config(config: dict) -> dict:
+    """Simula una combinación de la grilla y devuelve su fila de resultados (corre en el pool)."""
+    started = time.perf_counter()
+    rows = load_workload(config['workload'])
+    scheduler, cpus = config['scheduler'], config['cpus']
+    if cpus == 1 and scheduler in vector_sim.VECTOR_SCHEDULERS:
+        arrival = [row[1] for row in rows]
+        burst = [row[2] for row in rows]
+        result = vector_sim.simulate_arrays(arrival, burst, [row[3] for row in rows], scheduler)
+        start, completion = result['start'], result['completion']
+        if vector_sim.np is not None:
+            start, completion = start.tolist(), completion.tolist()
+        preemptions = 0
+    else:
+        processes = workload_processes(config['workload'])
+        simulation = simulate(processes, make_scheduler(scheduler, config['quantum'] or 2), cpus,
+                              record_timeline=False, record_events=False)
+        arrival = [p.arrival_time for p in processes]
+        burst = [p.burst_time for p in processes]
+        start = [p.start_time for p in processes]
+        completion = [p.completion_time for p in processes]
+        preemptions = simulation.preemptions
+    row = dict(config)
+    row.update(summarize(arrival, burst, start, completion, cpus))
+    row['preemptions'] = preemptions
+    row['seconds'] = round(time.perf_counter() - started, 6)
+    return row
+
+
+# --- Archivo de resultados ---
+def _is_jsonl(path: str) -> bool:
+    return path.endswith(('.jsonl', '.ndjson'))
+
+
+def _parse_csv_row(row: dict) -> dict:
+    parsed = {}
+    for field in RESULT_FIELDS:
+        value = row[field]
+        if field in NUMERIC_FIELDS:
+            value = None if value == '' else float(value)
+            if value is not None and value.is_integer() and field in ('quantum', 'cpus', 'processes',
+                                                                       'preemptions'):
+                value = int(value)
+        parsed[field] = value
+    return parsed
+
+
+def read_results(path: str) -> list:
+    """
+    Filas ya escritas en `path`. Una última línea incompleta (barrido cortado a
+    mitad de escritura) se recorta del archivo para poder seguir agregando.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+    rows = []
+    with open(path, newline='', encoding='utf-8') as f:
+        if _is_jsonl(path):
+            for line in f:
+                if line.strip():
+                    rows.append(json.loads(line))
+        else:
+            for row in csv.DictReader(f):
+                try:
+                    rows.append(_parse_csv_row(row))
+                except (KeyError, TypeError, ValueError):
+                    continue  # Fila de otro formato: se vuelve a simular
+    return rows
+
+
+class ResultWriter:
+    """Agrega filas a un CSV o JSONL y vacía el buffer tras cada una."""
+    def __init__(self, path: str, append: bool):
+        self.jsonl = _is_jsonl(path)
+        write_header = not (append and os.path.exists(path) and os.path.getsize(path))
+        self._file = open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+        if not self.jsonl:
+            self._writer = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS)
+            if write_header:
+                self._writer.writeheader()
+
+    def write(self, row: dict):
+        if self.jsonl:
+            self._file.write(json.dumps({field: row[field] for field in RESULT_FIELDS}) + '\n')
+        else:
+            self._writer.writerow({field: row[field] for field in RESULT_FIELDS})
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def run_sweep(grid: list, output: str, jobs: int = None, resume: bool = True,
+              progress=None) -> list:
+    """
+    Corre las combinaciones de `grid` en un pool de `jobs` procesos y escribe cada
+    fila en `output` apenas termina. Con `resume`, saltea las que ya están en el
+    archivo. Devuelve todas las filas de la grilla (previas y nuevas).
+
+    `progress(fila, hechas, total)` se llama tras cada combinación terminada.
+    """
+    for config in grid:
+        load_workload(config['workload'])  # Valida las cargas antes de abrir el pool
+    wanted = {config['run_id'] for config in grid}
+    previous = [row for row in read_results(output) if row['run_id'] in wanted] if resume else []
+    done = {row['run_id'] for row in previous}
+    pending = [config for config in grid if config['run_id'] not in done]
+    rows = list(previous)
+
+    writer = ResultWriter(output, append=resume)
+    try:
+        if pending:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+                futures = [pool.submit(run_config, config) for config in pending]
+                for future in concurrent.futures.as_completed(futures):
+                    row = future.result()
+                    writer.write(row)
+                    rows.append(row)
+                    if progress is not None:
+                        progress(row, len(rows), len(grid))
+    finally:
+        writer.close()
+    return rows
+
+
+# --- Ranking ---
+def rank(rows: list, by: str = 'avg_turnaround') -> list:
+    """
+    Una entrada por (scheduler, quantum, cpus) con las métricas de `RANK_METRICS`
+    promediadas sobre las cargas, ordenadas por `by` (menor es mejor).
+    """
+    if by not in RANK_METRICS:
+        raise ValueError(f"Métrica '{by}' inválida; válidas: {', '.join(RANK_METRICS)}.")
+    groups = {}
+    for row in rows:
+        groups.setdefault((row['scheduler'], row['quantum'], row['cpus']), []).append(row)
+    ranking = []
+    for (scheduler, quantum, cpus), group in groups.items():
+        entry = {'scheduler': scheduler, 'quantum': quantum, 'cpus': cpus, 'workloads': len(group)}
+        for metric in RANK_METRICS:
+            entry[metric] = sum(row[metric] for row in group) / len(group)
+        ranking.append(entry)
+    ranking.sort(key=lambda e: (e[by], e['scheduler'], e['quantum'] or 0, e['cpus']))
+    return ranking
+
+
+def format_ranking(ranking: list) -> str:
+    header = (f"{'#':>3}  {'Scheduler':<12} {'Q':>3} {'CPUs':>4} {'Cargas':>6}  "
+              f"{'Turn. prom':>10} {'Turn. p95':>10} {'Esp. prom':>10} {'Esp. p95':>10}")
+    lines = [header, '-' * len(header)]
+    for position, entry in enumerate(ranking, start=1):
+        quantum = entry['quantum'] if entry['quantum'] is not None else '-'
+        lines.append(
+            f"{position:>3}  {entry['scheduler']:<12} {quantum:>3} {entry['cpus']:>4} "
+            f"{entry['workloads']:>6}  {entry['avg_turnaround']:>10.2f} {entry['p95_turnaround']:>10.2f} "
+            f"{entry['avg_waiting']:>10.2f} {entry['p95_waiting']:>10.2f}"
+        )
+    return '\n'.join(lines)
+
+
+def _int_list(text: str) -> list:
+    return [int(value) for value in text.split(',') if value.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Barrido de schedulers, quantums y CPUs.")
+    parser.add_argument("--workload", action="append", required=True,
+                        help="Archivo CSV, archivo de reproducción .wkl o 'random:N:SEED' "
+                             "(se puede repetir).")
+    parser.add_argument("--schedulers", default=','.join(AVAILABLE_SCHEDULERS),
+                        help="Lista separada por comas (def. todos).")
+    parser.add_argument("--quanta", type=_int_list, default=list(DEFAULT_QUANTA),
+                        help="Quantums de RR (def. 1,2,4,8).")
+    parser.add_argument("--cpus", type=_int_list, default=list(DEFAULT_CPUS),
+                        help="Cantidades de CPUs (def. 1,2,4).")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Procesos del pool (def. os.cpu_count()).")
+    parser.add_argument("--output", default="sweep_results.csv",
+                        help="Archivo .csv o .jsonl de resultados (def. sweep_results.csv).")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Sobrescribe el archivo en vez de retomar el barrido.")
+    parser.add_argument("--rank-by", choices=RANK_METRICS, default='avg_turnaround')
+    args = parser.parse_args(argv)
+
+    try:
+        grid = build_grid(args.workload, [s.strip() for s in args.schedulers.split(',') if s.strip()],
+                          args.quanta, args.cpus)
+        started = time.perf_counter()
+
+        def progress(row, done, total):
+            print(f"[{done}/{total}] {row['run_id']}: turnaround {row['avg_turnaround']:.2f}, "
+                  f"espera {row['avg_waiting']:.2f}", flush=True)
+
+        rows = run_sweep(grid, args.output, args.jobs, resume=not args.no_resume,
+                         progress=progress)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"{len(grid)} combinaciones en {time.perf_counter() - started:.1f}s; "
+          f"resultados en '{args.output}'.\n")
+    print(format_ranking(rank(rows, args.rank_by)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
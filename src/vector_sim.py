@@ -0,0 +1,204 @@
+# src/vector_sim.py
+
+"""
+Simulación vectorizada (NumPy) de FCFS, SJF y Priority_NP en un solo CPU.
+
+Con un CPU y sin preempción, cada proceso arranca cuando llega o cuando
+termina el anterior, lo que ocurra después. En orden de llegada eso es
+`fin_i = S_i + max_{j<=i}(llegada_j - S_{j-1})` (S = suma acumulada de
+ráfagas), que NumPy calcula de una vez con `cumsum` y `maximum.accumulate`.
+
+Para SJF y Priority_NP el orden no es solo un sort: un proceso de ráfaga corta
+que llega tarde no puede pasar antes de que llegue. Pero los períodos ocupados
+(tramos sin CPU ocioso) son los mismos para cualquier política que no deja el
+CPU libre con procesos en espera, así que salen del cálculo de FCFS. Dentro de
+cada período se prueba el orden por clave; si todos los procesos ya llegaron
+cuando les toca empezar, ese orden es exactamente el del scheduler. Solo los
+períodos donde no se cumple se recorren con un heap, proceso por proceso.
+
+Los resultados coinciden con `sim_engine.simulate` y con
+`handle_process_completion_sim` del cliente: turnaround = fin - llegada y
+espera = turnaround - ráfaga. Los empates se resuelven como en `scheduler.py`:
+por clave, luego por llegada y luego por posición en la lista.
+
+NumPy es opcional: sin él, `simulate_arrays` usa el recorrido con heap en
+Python puro y devuelve listas.
+"""
+
+import heapq
+from typing import List
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+from .process import Process
+
+VECTOR_SCHEDULERS = ('FCFS', 'SJF', 'Priority_NP')
+
+
+def _schedule_exact(arrival: list, burst: list, rank: list, start: list):
+    """
+    Recorre con un heap los procesos (ordenados por llegada) y escribe en
+    `start[i]` el inicio de cada uno. `rank[i]` es lo que se compara en la cola:
+    `(clave, i)` o, si la clave es entera, el entero `clave * n + i`. Como `i`
+    sigue el orden de llegada, desempata por llegada y luego por lista.
+    """
+    ready = []
+    push, pop = heapq.heappush, heapq.heappop
+    n = len(arrival)
+    now = arrival[0] if n else 0
+    i = 0
+    for _ in range(n):
+        if not ready and arrival[i] > now:
+            now = arrival[i]  # CPU ocioso hasta la próxima llegada
+        while i < n and arrival[i] <= now:
+            push(ready, rank[i])
+            i += 1
+        j = pop(ready)
+        j = j[1] if type(j) is tuple else j % n
+        start[j] = now
+        now += burst[j]
+
+
+def _ranks(key) -> list:
+    """`rank` para `_schedule_exact`: un entero por proceso si la clave es entera y cabe en int64."""
+    n = key.size
+    if np.issubdtype(key.dtype, np.integer):
+        low, high = int(key.min()), int(key.max())
+        if (high - low + 1) * n < 2 ** 63:
+            return ((key.astype(np.int64) - low) * n + np.arange(n)).tolist()
+    return list(zip(key.tolist(), range(n)))
+
+
+def _check_inputs(arrival, burst, priority, scheduler: str):
+    if scheduler not in VECTOR_SCHEDULERS:
+        raise ValueError(f"Scheduler '{scheduler}' no vectorizable; válidos: "
+                         f"{', '.join(VECTOR_SCHEDULERS)}.")
+    if len(arrival) != len(burst):
+        raise ValueError("arrival y burst deben tener el mismo largo.")
+    if scheduler == 'Priority_NP':
+        if priority is None:
+            raise ValueError("Priority_NP necesita 'priority'.")
+        if len(priority) != len(arrival):
+            raise ValueError("priority debe tener el mismo largo que arrival.")
+
+
+def _simulate_lists(arrival, burst, priority, scheduler: str) -> dict:
+    """Misma simulación sin NumPy: heap en Python puro, resultados en listas."""
+    arrival, burst = list(arrival), list(burst)
+    if any(b <= 0 for b in burst):
+        raise ValueError("Las ráfagas deben ser positivas.")
+    n = len(arrival)
+    order = sorted(range(n), key=arrival.__getitem__)
+    a = [arrival[i] for i in order]
+    b = [burst[i] for i in order]
+    if scheduler == 'SJF':
+        key = b
+    elif scheduler == 'Priority_NP':
+        key = [priority[i] for i in order]
+    else:
+        key = [0] * n
+    start_sorted = [0] * n
+    _schedule_exact(a, b, list(zip(key, range(n))), start_sorted)
+    start = [0] * n
+    for position, i in enumerate(order):
+        start[i] = start_sorted[position]
+    completion = [s + d for s, d in zip(start, burst)]
+    turnaround = [c - a for c, a in zip(completion, arrival)]
+    waiting = [t - d for t, d in zip(turnaround, burst)]
+    return {"start": start, "completion": completion,
+            "turnaround": turnaround, "waiting": waiting}
+
+
+def simulate_arrays(arrival, burst, priority=None, scheduler: str = 'FCFS') -> dict:
+    """
+    Simula la carga dada por arreglos paralelos (uno por proceso, en el orden
+    de la lista) con FCFS, SJF o Priority_NP en un CPU.
+
+    Returns:
+        dict con los arreglos `start`, `completion`, `turnaround` y `waiting`,
+        en el mismo orden que la entrada (listas si NumPy no está instalado).
+    """
+    _check_inputs(arrival, burst, priority, scheduler)
+    if np is None:
+        return _simulate_lists(arrival, burst, priority, scheduler)
+
+    arrival = np.asarray(arrival)
+    burst = np.asarray(burst)
+    dtype = np.result_type(arrival, burst)
+    n = len(arrival)
+    if n == 0:
+        empty = np.empty(0, dtype=dtype)
+        return {"start": empty, "completion": empty.copy(),
+                "turnaround": empty.copy(), "waiting": empty.copy()}
+    if (burst <= 0).any():
+        raise ValueError("Las ráfagas deben ser positivas.")
+
+    order = np.argsort(arrival, kind='stable')  # Empates de llegada: orden de la lista
+    a = arrival[order].astype(dtype, copy=False)
+    b = burst[order].astype(dtype, copy=False)
+    done = np.cumsum(b)
+    before = done - b
+    fcfs_completion = done + np.maximum.accumulate(a - before)
+
+    if scheduler == 'FCFS':
+        start_sorted = fcfs_completion - b
+    else:
+        key = b if scheduler == 'SJF' else np.asarray(priority)[order]
+        # Período ocupado nuevo cuando un proceso llega con el CPU ya libre
+        new_period = np.empty(n, dtype=bool)
+        new_period[0] = True
+        new_period[1:] = a[1:] > fcfs_completion[:-1]
+        period = np.cumsum(new_period) - 1
+        firsts = np.flatnonzero(new_period)
+
+        # Orden candidato: por período y, dentro, por clave, llegada y posición
+        candidate = np.lexsort((np.arange(n), a, key, period))
+        candidate_burst = b[candidate]
+        candidate_period = period[candidate]
+        offset = np.cumsum(candidate_burst) - candidate_burst
+        candidate_start = (a[firsts][candidate_period] + offset
+                           - offset[firsts][candidate_period])
+        # Los períodos se mantienen contiguos y del mismo tamaño en el orden candidato,
+        # así que `firsts` también marca dónde empieza cada uno en `offset`.
+        start_sorted = np.empty(n, dtype=dtype)
+        start_sorted[candidate] = candidate_start
+
+        late = candidate_period[a[candidate] > candidate_start]
+        if late.size:
+            # Los procesos de los períodos que fallaron, juntos y en orden de llegada:
+            # un solo recorrido con heap (el CPU queda ocioso entre un período y otro)
+            redo = np.flatnonzero(np.isin(period, np.unique(late)))
+            exact = [0] * redo.size
+            _schedule_exact(a[redo].tolist(), b[redo].tolist(), _ranks(key[redo]), exact)
+            start_sorted[redo] = exact
+
+    start = np.empty(n, dtype=dtype)
+    start[order] = start_sorted
+    completion = start + burst
+    turnaround = completion - arrival
+    waiting = turnaround - burst
+    return {"start": start, "completion": completion,
+            "turnaround": turnaround, "waiting": waiting}
+
+
+def simulate_processes(processes: List[Process], scheduler: str = 'FCFS') -> dict:
+    """
+    `simulate_arrays` sobre objetos `Process`: deja en cada uno los tiempos
+    (inicio, fin, turnaround, espera) y el estado "Terminated", como la GUI.
+    """
+    result = simulate_arrays([p.arrival_time for p in processes],
+                             [p.burst_time for p in processes],
+                             [p.priority for p in processes], scheduler)
+    columns = [result[name].tolist() if np is not None else result[name]
+               for name in ("start", "completion", "turnaround", "waiting")]
+    for process, start, completion, turnaround, waiting in zip(processes, *columns):
+        process.start_time = start
+        process.completion_time = completion
+        process.turnaround_time = turnaround
+        process.waiting_time = waiting
+        process.remaining_burst_time = 0
+        process.state = "Terminated"
+    return result
@@ -0,0 +1,381 @@
+# src/worker_pools.py
+
+"""
+Pools de workers persistentes ("calientes") para el procesamiento de archivos.
+
+En lugar de crear un ThreadPoolExecutor/ProcessPoolExecutor por cada lote y
+destruirlo al terminar, el servidor mantiene un pool por modo ('threads' o
+'forks') dimensionado a la mayor demanda que ha visto: el `count` más grande
+pedido, sin pasar de `max_workers` (por defecto `os.cpu_count()`). Si llega un
+`count` mayor, el pool crece sumando un executor con los workers que faltan;
+los que ya estaban siguen calientes. Cada lote toma un `PoolLease`, que limita
+cuántas tareas suyas pueden estar en vuelo a la vez (sus "slots"), así un
+cliente configurado con 2 workers nunca ocupa más de 2 aunque el pool tenga 8.
+Varios lotes a la vez comparten los workers del pool en lugar de agrandarlo. Un
+hilo de mantenimiento cierra los pools que llevan más de `idle_timeout`
+segundos sin uso.
+
+`imap_unordered` acepta un tiempo límite por tarea. Una tarea vencida se
+abandona (el lote sigue con las demás) y su pool se recicla: el pool se retira
+sin matar nada y las tareas nuevas van a uno recién creado. El worker trabado
+termina solo cuando pueda, y las tareas que otros lotes tenían en vuelo en el
+pool retirado terminan normalmente. Si un pool 'forks' se rompe de verdad (un
+worker murió), sus tareas se reenvían `BROKEN_POOL_RETRIES` veces; después se
+entregan como `TaskFailed` y el lote sigue con las demás.
+"""
+
+import os
+import threading
+import time
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+
+EXECUTOR_CLASSES = {
+    'threads': concurrent.futures.ThreadPoolExecutor,
+    'forks': concurrent.futures.ProcessPoolExecutor,
+}
+BROKEN_POOL_RETRIES = 1  # Reenvíos de una tarea cuyo pool 'forks' murió
+
+
+class TaskTimedOut:
+    """Lo que `imap_unordered` entrega en lugar del resultado de una tarea vencida."""
+    def __init__(self, item, seconds: float):
+        self.item = item
+        self.seconds = seconds
+
+    def __repr__(self):
+        return f"TaskTimedOut({self.seconds:.0f}s)"
+
+
+class TaskFailed:
+    """Lo que `imap_unordered` entrega si el pool de la tarea murió más de `BROKEN_POOL_RETRIES` veces."""
+    def __init__(self, item, error: BaseException):
+        self.item = item
+        self.error = error
+
+    def __repr__(self):
+        return f"TaskFailed({self.error!r})"
+
+
+class _PoolEntry:
+    """
+    El pool de un modo junto con sus contadores de uso.
+
+    Un pool es uno o más executors: crecer agrega uno con los workers que
+    faltan, sin tocar los que ya estaban.
+    """
+    def __init__(self, mode: str, max_workers: int):
+        self.mode = mode
+        self.max_workers = 0
+        self.executors = []  # [executor, workers, tareas en vuelo]
+        self.grow(max_workers)
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.leases = 0            # Lotes que tienen el pool reservado ahora mismo
+        self.reserved_slots = 0    # Suma de los slots de esos lotes
+        self.in_flight = 0         # Tareas enviadas y aún no terminadas
+        self.tasks_completed = 0
+        self.recycled = 0          # Veces que se reemplazó por una tarea vencida (acumulado)
+
+    def grow(self, size: int):
+        """Lleva el pool a `size` workers agregando un executor con los que faltan."""
+        extra = size - self.max_workers
+        if extra > 0:
+            self.executors.append([EXECUTOR_CLASSES[self.mode](max_workers=extra), extra, 0])
+            self.max_workers = size
+
+    def least_loaded(self) -> list:
+        """El executor con menos tareas en vuelo por worker."""
+        return min(self.executors, key=lambda slot: slot[2] / slot[1])
+
+    def shutdown(self, **kwargs):
+        for executor, _workers, _in_flight in self.executors:
+            executor.shutdown(**kwargs)
+
+
+class PoolLease:
+    """
+    Reserva de `slots` workers de un pool para un lote.
+
+    `submit` bloquea mientras el lote ya tenga `slots` tareas en vuelo; el slot
+    se libera cuando la tarea termina (con éxito o con error).
+    """
+    def __init__(self, manager, mode: str, slots: int):
+        self.manager = manager
+        self.mode = mode
+        self.slots = slots
+        self._slot_semaphore = threading.BoundedSemaphore(slots)
+        self._holding = set()  # Futures que ocupan un slot
+        self._holding_lock = threading.Lock()
+        self._released = False
+
+    def submit(self, fn, *args) -> concurrent.futures.Future:
+        """Envía `fn(*args)` al pool respetando los slots del lote."""
+        self._slot_semaphore.acquire()
+        try:
+            future = self.manager._submit(self.mode, fn, *args)
+        except BaseException:
+            self._slot_semaphore.release()
+            raise
+        with self._holding_lock:
+            self._holding.add(future)
+        future.add_done_callback(self._release_slot)
+        return future
+
+    def _release_slot(self, future):
+        """Libera el slot de `future` una sola vez: al terminar o al abandonarla por vencida."""
+        with self._holding_lock:
+            if future not in self._holding:
+                return
+            self._holding.discard(future)
+        self._slot_semaphore.release()
+
+    def map(self, fn, iterable) -> list:
+        """Equivalente a `list(executor.map(fn, iterable))` limitado a los slots del lote."""
+        futures = [self.submit(fn, item) for item in iterable]
+        return [f.result() for f in futures]
+
+    def imap_unordered(self, fn, iterable, on_abandoned=None, timeout=None):
+        """
+        Genera `(índice, resultado)` en el orden en que terminan las tareas.
+
+        Solo hay `slots` tareas en vuelo a la vez: la siguiente se envía cuando
+        termina alguna, así el lote nunca retiene todos sus resultados en memoria.
+        Si el consumidor abandona el generador, `on_abandoned(resultado)` recibe
+        los resultados que ya no se van a entregar (p. ej. para liberar recursos).
+
+        `timeout(item)` da el tiempo límite en segundos de cada tarea (o None).
+        Si una tarea lo supera, se entrega `(índice, TaskTimedOut)`, se libera su
+        slot y se recicla el pool (ver `WorkerPoolManager.recycle`). Una tarea
+        cuyo pool sigue roto tras los reenvíos se entrega como `(índice, TaskFailed)`.
+        """
+        items = enumerate(iterable)
+        pending = {}  # future -> (índice, item, reenvíos, vencimiento)
+
+        def send(index, item, retries):
+            seconds = timeout(item) if timeout is not None else None
+            deadline = time.monotonic() + seconds if seconds else None
+            pending[self.submit(fn, item)] = (index, item, retries, deadline)
+
+        def fill():
+            while len(pending) < self.slots:
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    return
+                send(index, item, 0)
+
+        def abandon(future):
+            if not future.cancel() and on_abandoned is not None:
+                future.add_done_callback(
+                    lambda f: on_abandoned(f.result())
+                    if not f.cancelled() and f.exception() is None else None
+                )
+
+        fill()
+        try:
+            while pending:
+                deadlines = [entry[3] for entry in pending.values() if entry[3] is not None]
+                wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                done, _ = concurrent.futures.wait(
+                    pending, timeout=wait_for, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    index, item, retries, _deadline = pending.pop(future)
+                    error = future.exception()
+                    if isinstance(error, BrokenProcessPool):
+                        if retries < BROKEN_POOL_RETRIES:
+                            # Un worker del pool murió: reintentar en el pool nuevo
+                            send(index, item, retries + 1)
+                        else:
+                            # No es un error de la tarea: se entrega como fallida y el lote sigue
+                            yield index, TaskFailed(item, error)
+                        continue
+                    yield index, future.result()
+                now = time.monotonic()
+                expired = [f for f, entry in pending.items()
+                           if entry[3] is not None and entry[3] <= now and not f.done()]
+                timed_out = []
+                for future in expired:
+                    index, item, _retries, _deadline = pending.pop(future)
+                    abandon(future)
+                    self._release_slot(future)
+                    timed_out.append((index, item))
+                if timed_out:
+                    self.manager.recycle(self.mode)  # Una vez, aunque hayan vencido varias
+                for index, item in timed_out:
+                    yield index, TaskTimedOut(item, timeout(item))
+                fill()
+        finally:
+            # Si el consumidor abandona el generador no se esperan las tareas restantes
+            for future in pending:
+                abandon(future)
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.manager._release(self.mode, self.slots)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class WorkerPoolManager:
+    """Mantiene un pool por modo, lo agranda bajo demanda y recorta los inactivos."""
+    def __init__(self, idle_timeout: float = 300.0, max_workers: int = None):
+        self.idle_timeout = idle_timeout
+        self.max_workers = max_workers or os.cpu_count() or 1  # Tope de workers por pool
+        self._lock = threading.Lock()
+        self._pools: dict[str, _PoolEntry] = {}
+        self._pools_created = {mode: 0 for mode in EXECUTOR_CLASSES}
+        self._reaper_thread = None
+
+    def lease(self, mode: str, count: int) -> PoolLease:
+        """
+        Reserva `count` slots del pool de `mode`, creándolo o agrandándolo si hace falta.
+
+        El pool crece hasta `count` (con tope `max_workers`), no hasta la suma
+        de los lotes en curso: si los lotes piden más que eso, esperan turno.
+
+        Raises:
+            ValueError: Si `mode` no es 'threads' ni 'forks'.
+        """
+        if mode not in EXECUTOR_CLASSES:
+            raise ValueError(f"Modo de proc. inválido: {mode}")
+        count = max(1, int(count))
+        size = min(count, self.max_workers)
+        with self._lock:
+            entry = self._pools.get(mode)
+            if entry is None:
+                self._replace_pool(mode, size)
+                entry = self._pools[mode]
+            else:
+                entry.grow(size)
+            entry.leases += 1
+            entry.reserved_slots += count
+            entry.last_used = time.time()
+        return PoolLease(self, mode, count)
+
+    def _replace_pool(self, mode: str, size: int):
+        """Crea un pool nuevo para `mode` y retira el anterior (con `_lock` adquirido)."""
+        old_entry = self._pools.get(mode)
+        new_entry = _PoolEntry(mode, size)
+        if old_entry is not None:
+            # Los lotes activos conservan sus leases; sus siguientes envíos ya
+            # van al pool nuevo y las tareas pendientes del viejo terminan solas.
+            new_entry.leases = old_entry.leases
+            new_entry.reserved_slots = old_entry.reserved_slots
+            new_entry.in_flight = old_entry.in_flight
+            new_entry.recycled = old_entry.recycled
+            old_entry.shutdown(wait=False)
+        self._pools[mode] = new_entry
+        self._pools_created[mode] += 1
+
+    def recycle(self, mode: str):
+        """
+        Reemplaza el pool de `mode` por uno nuevo del mismo tamaño (tras una tarea vencida).
+
+        El pool viejo se cierra sin esperar y sin matar procesos: el pool es
+        compartido y matar un worker de un ProcessPoolExecutor rompe el pool
+        entero, con las tareas de otros lotes adentro. Esas tareas terminan en
+        el pool retirado; el worker trabado, cuando pueda, como en 'threads'.
+        """
+        with self._lock:
+            entry = self._pools.get(mode)
+            if entry is None:
+                return
+            self._replace_pool(mode, entry.max_workers)
+            self._pools[mode].recycled += 1
+
+    def _submit(self, mode: str, fn, *args) -> concurrent.futures.Future:
+        with self._lock:
+            entry = self._pools[mode]
+            entry.in_flight += 1
+            entry.last_used = time.time()
+            slot = entry.least_loaded()
+            try:
+                future = slot[0].submit(fn, *args)
+            except BrokenProcessPool:
+                # Un worker murió: seguir con un pool nuevo
+                self._replace_pool(mode, entry.max_workers)
+                entry = self._pools[mode]
+                slot = entry.least_loaded()
+                future = slot[0].submit(fn, *args)
+            slot[2] += 1
+        future.add_done_callback(lambda _f: self._task_done(mode, slot))
+        return future
+
+    def _task_done(self, mode: str, slot: list):
+        with self._lock:
+            slot[2] -= 1
+            entry = self._pools.get(mode)
+            if entry is not None:
+                entry.in_flight = max(0, entry.in_flight - 1)
+                entry.tasks_completed += 1
+                entry.last_used = time.time()
+
+    def _release(self, mode: str, slots: int):
+        with self._lock:
+            entry = self._pools.get(mode)
+            if entry is not None:
+                entry.leases = max(0, entry.leases - 1)
+                entry.reserved_slots = max(0, entry.reserved_slots - slots)
+                entry.last_used = time.time()
+
+    def trim_idle(self) -> list:
+        """Cierra los pools sin leases ni tareas que superaron `idle_timeout`. Devuelve sus modos."""
+        now = time.time()
+        trimmed = []
+        with self._lock:
+            for mode, entry in list(self._pools.items()):
+                if (entry.leases == 0 and entry.in_flight == 0 and
+                        now - entry.last_used >= self.idle_timeout):
+                    entry.shutdown(wait=False)
+                    del self._pools[mode]
+                    trimmed.append(mode)
+        return trimmed
+
+    def start_reaper(self, on_trim=None):
+        """Lanza el hilo que recorta periódicamente los pools inactivos."""
+        if self._reaper_thread is not None:
+            return
+
+        def reaper_loop():
+            interval = max(1.0, self.idle_timeout / 4)
+            while True:
+                time.sleep(interval)
+                trimmed = self.trim_idle()
+                if trimmed and on_trim:
+                    on_trim(trimmed)
+
+        self._reaper_thread = threading.Thread(target=reaper_loop, daemon=True)
+        self._reaper_thread.start()
+
+    def stats(self) -> list:
+        """Instantánea de cada pool vivo (para el comando `status`)."""
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "mode": mode,
+                    "workers": entry.max_workers,
+                    "leases": entry.leases,
+                    "in_flight": entry.in_flight,
+                    "tasks_completed": entry.tasks_completed,
+                    "age_seconds": now - entry.created_at,
+                    "idle_seconds": now - entry.last_used,
+                    "pools_created": self._pools_created[mode],
+                    "recycled": entry.recycled,
+                }
+                for mode, entry in self._pools.items()
+            ]
+
+    def shutdown(self):
+        with self._lock:
+            for entry in self._pools.values():
+                entry.shutdown(wait=False, cancel_futures=True)
+            self._pools.clear()
@@ -0,0 +1,293 @@
+# src/workload.py
+
+"""
+Generador de cargas de trabajo sintéticas para la simulación de scheduling.
+
+`generate(...)` devuelve un iterador perezoso de objetos `Process`: cada
+proceso se crea recién cuando se pide, así que se pueden pasar millones a
+`sim_engine.simulate_stream` sin tenerlos en memoria. Con la misma semilla la
+secuencia es siempre la misma.
+
+Modelos:
+    Llegadas:     poisson (tiempos entre llegadas exponenciales con tasa `rate`)
+                  bursty  (ráfagas de llegadas: grupos de tamaño geométrico,
+                           media `group_size`, que llegan juntos; misma tasa media)
+    Ráfagas:      exponential (media `mean_burst`)
+                  pareto      (cola pesada, forma `pareto_alpha`, media `mean_burst`)
+                  bimodal     (`short_burst` o, con probabilidad `long_fraction`,
+                               `long_burst`)
+    Prioridades:  uniforme en [0, `priority_levels`) o con pesos `priority_weights`.
+
+Los tiempos son enteros (ticks), como en la GUI: las llegadas se truncan del
+reloj continuo y las ráfagas se redondean con mínimo 1.
+
+Reproducción (`write_workload` / `read_workload`): archivo binario con un
+encabezado JSON (parámetros del generador, si se conocen) y un registro por
+proceso con varints de (delta de llegada, ráfaga, prioridad, delta de pid).
+Una carga generada ocupa unos 4-6 bytes por proceso.
+
+Uso:
+    python -m src.workload --count 1000000 --seed 7 --burst pareto --output carga.wkl
+    python -m src.workload --count 1000000 --seed 7 --simulate SJF --cpus 2
+"""
+
+import argparse
+import itertools
+import json
+import random
+import sys
+import time
+from typing import Iterable, Iterator
+
+from .process import Process
+from .sim_engine import make_scheduler, simulate_stream
+
+ARRIVAL_MODELS = ('poisson', 'bursty')
+BURST_MODELS = ('exponential', 'pareto', 'bimodal')
+WORKLOAD_MAGIC = b'WKLD1\n'
+WORKLOAD_SUFFIX = '.wkl'
+WRITE_CHUNK_BYTES = 1 << 16
+
+DEFAULT_PARAMS = {
+    'arrival': 'poisson', 'rate': 0.2, 'group_size': 5.0,
+    'burst': 'exponential', 'mean_burst': 4.0, 'pareto_alpha': 1.5,
+    'short_burst': 2, 'long_burst': 20, 'long_fraction': 0.1,
+    'priority_levels': 5, 'priority_weights': None,
+}
+
+
+def workload_params(**overrides) -> dict:
+    """Parámetros completos (los de `DEFAULT_PARAMS` más `overrides`), validados."""
+    unknown = set(overrides) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Parámetro(s) desconocido(s): {', '.join(sorted(unknown))}.")
+    params = dict(DEFAULT_PARAMS, **overrides)
+    if params['arrival'] not in ARRIVAL_MODELS:
+        raise ValueError(f"Llegadas '{params['arrival']}' inválidas; válidas: {', '.join(ARRIVAL_MODELS)}.")
+    if params['burst'] not in BURST_MODELS:
+        raise ValueError(f"Ráfagas '{params['burst']}' inválidas; válidas: {', '.join(BURST_MODELS)}.")
+    if params['rate'] <= 0 or params['mean_burst'] <= 0:
+        raise ValueError("'rate' y 'mean_burst' deben ser positivos.")
+    if params['group_size'] < 1:
+        raise ValueError("'group_size' debe ser >= 1.")
+    if params['pareto_alpha'] <= 1:
+        raise ValueError("'pareto_alpha' debe ser > 1 (si no, la media es infinita).")
+    if not (params['short_burst'] >= 1 and params['long_burst'] >= 1
+            and 0 <= params['long_fraction'] <= 1):
+        raise ValueError("Bimodal: las ráfagas deben ser >= 1 y 'long_fraction' estar entre 0 y 1.")
+    weights = params['priority_weights']
+    if weights is not None:
+        if not weights or any(w < 0 for w in weights) or not sum(weights):
+            raise ValueError("'priority_weights' debe tener pesos >= 0 y no todos nulos.")
+    elif params['priority_levels'] < 1:
+        raise ValueError("'priority_levels' debe ser >= 1.")
+    return params
+
+
+def _arrival_times(rng: random.Random, params: dict) -> Iterator[int]:
+    clock = 0.0
+    if params['arrival'] == 'poisson':
+        rate = params['rate']
+        while True:
+            yield int(clock)
+            clock += rng.expovariate(rate)
+    else:
+        # Grupos geométricos con media `group_size`; llegan a tasa rate/group_size
+        group_rate = params['rate'] / params['group_size']
+        stop_probability = 1 / params['group_size']
+        while True:
+            yield int(clock)
+            while rng.random() >= stop_probability:
+                yield int(clock)
+            clock += rng.expovariate(group_rate)
+
+
+def _burst_sampler(rng: random.Random, params: dict):
+    mean = params['mean_burst']
+    if params['burst'] == 'exponential':
+        return lambda: max(1, round(rng.expovariate(1 / mean)))
+    if params['burst'] == 'pareto':
+        alpha = params['pareto_alpha']
+        scale = mean * (alpha - 1) / alpha  # Mínimo x_m tal que la media sea `mean`
+        return lambda: max(1, round(scale * rng.paretovariate(alpha)))
+    short, long, fraction = params['short_burst'], params['long_burst'], params['long_fraction']
+    return lambda: long if rng.random() < fraction else short
+
+
+def _priority_sampler(rng: random.Random, params: dict):
+    weights = params['priority_weights']
+    if weights is None:
+        levels = params['priority_levels']
+        return lambda: rng.randrange(levels)
+    cumulative = list(itertools.accumulate(weights))
+    levels = range(len(weights))
+    return lambda: rng.choices(levels, cum_weights=cumulative)[0]
+
+
+def generate(count: int = None, seed: int = 0, **params) -> Iterator[Process]:
+    """
+    Procesos sintéticos con pids 1, 2, ... en orden de llegada; `count=None`
+    genera sin fin. Los demás argumentos son los de `DEFAULT_PARAMS`.
+    """
+    params = workload_params(**params)
+    rng = random.Random(seed)
+    arrivals = _arrival_times(rng, params)
+    burst = _burst_sampler(rng, params)
+    priority = _priority_sampler(rng, params)
+    pids = itertools.count(1) if count is None else range(1, count + 1)
+    for pid in pids:
+        yield Process(pid, f"gen_{pid}", next(arrivals), burst(), priority())
+
+
+# --- Archivo de reproducción ---
+def _write_varint(out: bytearray, value: int):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def write_workload(path: str, processes: Iterable[Process], params: dict = None) -> int:
+    """
+    Escribe `processes` (ordenados por llegada) en `path` a medida que llegan.
+    `params` se guarda en el encabezado como referencia. Devuelve cuántos escribió.
+    """
+    header = json.dumps({"params": params}).encode('utf-8') + b'\n'
+    count = 0
+    last_arrival = last_pid = 0
+    with open(path, 'wb') as f:
+        f.write(WORKLOAD_MAGIC + header)
+        buffer = bytearray()
+        for process in processes:
+            delta = process.arrival_time - last_arrival
+            if delta < 0:
+                raise ValueError(f"P{process.pid} llega antes que el proceso anterior; "
+                                 f"la carga debe venir ordenada por llegada.")
+            if process.burst_time <= 0:
+                raise ValueError(f"Ráfaga de P{process.pid} debe ser positiva.")
+            _write_varint(buffer, delta)
+            _write_varint(buffer, process.burst_time)
+            _write_varint(buffer, _zigzag(process.priority))
+            _write_varint(buffer, _zigzag(process.pid - last_pid - 1))
+            last_arrival, last_pid = process.arrival_time, process.pid
+            count += 1
+            if len(buffer) >= WRITE_CHUNK_BYTES:
+                f.write(buffer)
+                buffer.clear()
+        f.write(buffer)
+    return count
+
+
+def read_workload_header(path: str) -> dict:
+    with open(path, 'rb') as f:
+        return _read_header(f, path)
+
+
+def _read_header(f, path: str) -> dict:
+    if f.read(len(WORKLOAD_MAGIC)) != WORKLOAD_MAGIC:
+        raise ValueError(f"'{path}' no es un archivo de carga ({WORKLOAD_SUFFIX}).")
+    return json.loads(f.readline())
+
+
+def read_workload(path: str) -> Iterator[Process]:
+    """Procesos de un archivo de `write_workload`, leídos de a bloques y creados de a uno."""
+    with open(path, 'rb') as f:
+        _read_header(f, path)
+        fields = []
+        value = shift = 0
+        arrival = pid = 0
+        while True:
+            chunk = f.read(WRITE_CHUNK_BYTES)
+            if not chunk:
+                break
+            for byte in chunk:
+                value |= (byte & 0x7F) << shift
+                if byte & 0x80:
+                    shift += 7
+                    continue
+                fields.append(value)
+                value = shift = 0
+                if len(fields) == 4:
+                    delta, burst, priority, pid_delta = fields
+                    fields.clear()
+                    arrival += delta
+                    pid += _unzigzag(pid_delta) + 1
+                    yield Process(pid, f"gen_{pid}", arrival, burst, _unzigzag(priority))
+        if fields or shift:
+            raise ValueError(f"'{path}' termina con un registro incompleto.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generador de cargas de trabajo sintéticas.")
+    parser.add_argument("--count", type=int, default=1000, help="Procesos a generar (def. 1000).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--arrival", choices=ARRIVAL_MODELS, default=DEFAULT_PARAMS['arrival'])
+    parser.add_argument("--rate", type=float, default=DEFAULT_PARAMS['rate'],
+                        help="Llegadas por tick (def. 0.2).")
+    parser.add_argument("--group-size", type=float, default=DEFAULT_PARAMS['group_size'],
+                        help="Tamaño medio de grupo con --arrival bursty (def. 5).")
+    parser.add_argument("--burst", choices=BURST_MODELS, default=DEFAULT_PARAMS['burst'])
+    parser.add_argument("--mean-burst", type=float, default=DEFAULT_PARAMS['mean_burst'])
+    parser.add_argument("--pareto-alpha", type=float, default=DEFAULT_PARAMS['pareto_alpha'])
+    parser.add_argument("--short-burst", type=int, default=DEFAULT_PARAMS['short_burst'])
+    parser.add_argument("--long-burst", type=int, default=DEFAULT_PARAMS['long_burst'])
+    parser.add_argument("--long-fraction", type=float, default=DEFAULT_PARAMS['long_fraction'])
+    parser.add_argument("--priority-levels", type=int, default=DEFAULT_PARAMS['priority_levels'])
+    parser.add_argument("--priority-weights", default=None,
+                        help="Pesos separados por comas, uno por nivel (p. ej. 1,2,4).")
+    parser.add_argument("--output", help=f"Archivo de reproducción ({WORKLOAD_SUFFIX}).")
+    parser.add_argument("--replay", help="Usar un archivo de reproducción en vez de generar.")
+    parser.add_argument("--simulate", metavar="SCHEDULER",
+                        help="Simular la carga con este scheduler (sim_engine.simulate_stream).")
+    parser.add_argument("--cpus", type=int, default=1)
+    parser.add_argument("--quantum", type=int, default=2)
+    args = parser.parse_args(argv)
+    if not args.output and not args.simulate:
+        parser.error("Indicá --output, --simulate o ambos.")
+
+    try:
+        if args.replay:
+            params = read_workload_header(args.replay)["params"]
+            processes = read_workload(args.replay)
+        else:
+            weights = ([float(w) for w in args.priority_weights.split(',')]
+                       if args.priority_weights else None)
+            model = workload_params(
+                arrival=args.arrival, rate=args.rate, group_size=args.group_size,
+                burst=args.burst, mean_burst=args.mean_burst, pareto_alpha=args.pareto_alpha,
+                short_burst=args.short_burst, long_burst=args.long_burst,
+                long_fraction=args.long_fraction, priority_levels=args.priority_levels,
+                priority_weights=weights)
+            params = dict(model, count=args.count, seed=args.seed)
+            processes = generate(args.count, args.seed, **model)
+
+        started = time.perf_counter()
+        if args.output:
+            count = write_workload(args.output, processes, params)
+            print(f"{count} procesos escritos en '{args.output}'.")
+            processes = read_workload(args.output)  # Para --simulate: se reproduce lo escrito
+        metrics = None
+        if args.simulate:
+            metrics = simulate_stream(processes, make_scheduler(args.simulate, args.quantum),
+                                      args.cpus)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    if metrics is not None:
+        for name, value in metrics.items():
+            print(f"  {name:<16} {value:.3f}" if isinstance(value, float) else f"  {name:<16} {value}")
+    print(f"Listo en {time.perf_counter() - started:.2f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())